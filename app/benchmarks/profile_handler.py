@@ -0,0 +1,329 @@
+"""
+profile_handler.py
+
+Profiles `lambda_handler` offline. Recorded NewsAPI and OpenAI responses are
+replayed by local stand-ins, and SES is answered by its stand-in, so
+production-shaped inputs can be profiled without live keys or the network.
+
+The handler runs under either cProfile or a sampling profiler, both with
+tracemalloc. The report lists the hot spots per function and the allocations
+by module near the memory peak. The sampling profiler also writes its stacks
+in the folded format read by flamegraph.pl and speedscope; cProfile writes a
+pstats file instead.
+
+Usage (from the `app` directory):
+
+    python -m benchmarks.profile_handler --recording recording.json
+    python -m benchmarks.profile_handler --assets bitcoin,ethereum --top-k 100 --mode cprofile
+"""
+
+import argparse
+import cProfile
+import fnmatch
+import functools
+import os
+import pstats
+import re
+import sys
+import sysconfig
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.run import configure
+from benchmarks.standins import ReplayNewsAPIStandIn, ReplayOpenAIStandIn, SESStandIn, load_recording
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STDLIB_DIR = sysconfig.get_paths()["stdlib"]
+
+# Source files of the pipeline, as opposed to the stand-ins, the profiler and tests
+PIPELINE_FILES = (os.path.join(APP_DIR, "src", "*"), os.path.join(APP_DIR, "lambda_function.py"))
+# Frames kept per allocation, enough to reach a pipeline frame from library code
+TRACE_FRAMES = 64
+
+# Numbering of pool threads, e.g. "ThreadPoolExecutor-3_0", dropped so runs merge
+_THREAD_NUMBER = re.compile(r"[-_]\d+")
+
+###########
+# Classes #
+###########
+
+class Sampler:
+    """
+    Background thread sampling the stacks of the pipeline's threads and
+    snapshotting the traced allocations as the memory peak grows.
+
+    Samples are wall-clock: a thread waiting on a socket or a lock is
+    counted where it waits.
+
+    Args:
+        interval (float): The time between two samples, in seconds.
+        stacks (bool): Whether to sample the stacks.
+        memory (bool): Whether to snapshot the allocations near the peak.
+                       tracemalloc must be tracing.
+    """
+
+    # Growth of the traced memory that triggers a new peak snapshot
+    PEAK_GROWTH = 1.1
+
+    def __init__(self, interval: float = 0.005, stacks: bool = True, memory: bool = True):
+        self.interval = interval
+        self.sample_stacks = stacks
+        self.memory = memory
+        self.stacks: Counter = Counter()
+        self.peak = 0
+        self.peak_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "Sampler":
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self.sample_stacks:
+                self._sample_stacks()
+            if self.memory:
+                self._sample_memory()
+
+    def _sample_stacks(self) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            stack = pipeline_stack(frame)
+            # Idle pool threads and the stand-ins are not part of the pipeline
+            if stack is not None:
+                thread = _THREAD_NUMBER.sub("", names.get(thread_id, "thread"))
+                self.stacks[";".join([thread] + stack)] += 1
+
+    def _sample_memory(self) -> None:
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.peak * self.PEAK_GROWTH:
+            self.peak = current
+            self.peak_snapshot = tracemalloc.take_snapshot()
+
+
+class ThreadProfiler:
+    """
+    cProfile across the calling thread and the threads it starts.
+
+    Before Python 3.12, a cProfile profiler only follows the thread that
+    enables it, so one is enabled in every new thread too. Threads started
+    before `start`, such as a hedging pool, are then not profiled, so it is
+    started before the warm-up runs and cleared after them.
+    """
+
+    def __init__(self):
+        self.profilers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _enable(self, *args) -> None:
+        profiler = cProfile.Profile()
+        with self._lock:
+            self.profilers.append(profiler)
+        # Replaces this hook in the thread
+        profiler.enable()
+
+    def start(self) -> None:
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._enable)
+        self._enable()
+
+    def clear(self) -> None:
+        """Drops the statistics collected so far, e.g. by the warm-up runs."""
+        with self._lock:
+            for profiler in self.profilers:
+                profiler.clear()
+
+    def stop(self) -> pstats.Stats:
+        """Stops profiling and returns the statistics of every thread."""
+        threading.setprofile(None)
+        self.profilers[0].disable()
+        stats = pstats.Stats()
+        for profiler in self.profilers:
+            profiler.create_stats()
+            # Idle threads, the stand-ins and the sampler are not part of the pipeline
+            if any(_is_pipeline_file(filename) for filename, _, _ in profiler.stats):
+                stats.add(profiler)
+        return stats
+
+###########
+# Methods #
+###########
+
+@functools.lru_cache(maxsize=None)
+def module_name(filename: str) -> str:
+    """
+    Returns the module of a source file, e.g. `src.services.llm`,
+    `concurrent.futures.thread`, or the package `openai` of installed code.
+    """
+    parts = filename.replace(os.sep, "/").split("/")
+    if "site-packages" in parts:
+        package = parts[parts.index("site-packages") + 1:]
+        return os.path.splitext(package[0])[0] if package else filename
+    for root in (APP_DIR, STDLIB_DIR):
+        if filename.startswith(root + os.sep):
+            return os.path.splitext(os.path.relpath(filename, root))[0].replace(os.sep, ".")
+    return os.path.splitext(os.path.basename(filename))[0]
+
+@functools.lru_cache(maxsize=None)
+def _is_pipeline_file(filename: str) -> bool:
+    return any(fnmatch.fnmatch(filename, pattern) for pattern in PIPELINE_FILES)
+
+def pipeline_stack(frame) -> Optional[List[str]]:
+    """
+    Returns the `module:function` labels of a stack, outermost first, or
+    None if no frame belongs to the pipeline.
+    """
+    labels = []
+    in_pipeline = False
+    while frame is not None:
+        code = frame.f_code
+        in_pipeline = in_pipeline or _is_pipeline_file(code.co_filename)
+        labels.append(f"{module_name(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return labels[::-1] if in_pipeline else None
+
+def stack_hot_spots(stacks: Dict[str, int], limit: int = 25) -> List[Tuple[str, int, int]]:
+    """
+    Returns the `(function, self samples, total samples)` of the functions
+    with the most self samples.
+
+    Args:
+        stacks (dict): The number of samples of each folded stack, rooted at
+                       the thread name.
+        limit (int): The number of functions returned.
+    """
+    self_samples, total_samples = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]
+        if not frames:
+            continue
+        self_samples[frames[-1]] += count
+        # Recursive functions count once per sample
+        for label in set(frames):
+            total_samples[label] += count
+    rows = [(label, self_samples[label], total) for label, total in total_samples.items()]
+    rows.sort(key=lambda row: (-row[1], -row[2], row[0]))
+    return rows[:limit]
+
+def pipeline_allocations(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+    """
+    Keeps the allocations made under a pipeline frame, leaving out the
+    stand-ins and the profiler, which run in the same process.
+    """
+    return snapshot.filter_traces([tracemalloc.Filter(True, pattern, all_frames=True) for pattern in PIPELINE_FILES])
+
+def allocations_by_module(snapshot: tracemalloc.Snapshot, limit: int = 25) -> List[Tuple[str, int, int]]:
+    """Returns the `(module, bytes, blocks)` allocated by the largest modules in a snapshot."""
+    sizes, blocks = Counter(), Counter()
+    for stat in snapshot.statistics("filename"):
+        module = module_name(stat.traceback[0].filename)
+        sizes[module] += stat.size
+        blocks[module] += stat.count
+    return [(module, size, blocks[module]) for module, size in sizes.most_common(limit)]
+
+def write_folded(stacks: Dict[str, int], path: str) -> None:
+    """Writes stacks in the folded format, one `frame;frame count` line per stack."""
+    with open(path, "w", encoding="utf-8") as file:
+        for stack, count in sorted(stacks.items()):
+            file.write(f"{stack} {count}\n")
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile lambda_handler against recorded responses.")
+    parser.add_argument("--recording", help="JSON file of recorded NewsAPI and OpenAI responses.")
+    parser.add_argument("--assets", help="Comma-separated assets. Defaults to the recorded queries.")
+    parser.add_argument("--top-k", type=int, default=20, help="Articles analyzed per asset.")
+    parser.add_argument("--iterations", type=int, default=3, help="Profiled handler runs.")
+    parser.add_argument("--warmup", type=int, default=1, help="Unprofiled runs first, e.g. to create the clients.")
+    parser.add_argument("--mode", choices=("sample", "cprofile"), default="sample")
+    parser.add_argument("--interval-ms", type=float, default=5, help="Time between two samples.")
+    parser.add_argument("--no-memory", action="store_true", help="Do not trace allocations.")
+    parser.add_argument("--warm-cache", action="store_true", help="Keep the LLM response cache between runs.")
+    parser.add_argument("--limit", type=int, default=25, help="Rows of each table.")
+    parser.add_argument("--sort", default="tottime", help="pstats sort key of the cprofile table.")
+    parser.add_argument("--stacks", default="handler.folded", help="Output of the sampled stacks.")
+    parser.add_argument("--pstats", default="handler.prof", help="Output of the cprofile statistics.")
+    args = parser.parse_args(argv)
+
+    recording = load_recording(args.recording) if args.recording else {"news": {}, "openai": []}
+    if args.assets:
+        assets = [asset.strip() for asset in args.assets.split(",") if asset.strip()]
+    else:
+        assets = list(recording["news"]) or ["bitcoin"]
+    event = {"assets": assets, "top_k": args.top_k}
+    memory = not args.no_memory
+
+    news = ReplayNewsAPIStandIn(recording["news"], total_results=1000)
+    openai = ReplayOpenAIStandIn(recording["openai"])
+    ses = SESStandIn()
+    with news, openai, ses:
+        configure(news, openai, ses)
+        from lambda_function import lambda_handler
+        from src.services.llm import response_cache
+
+        profiler = ThreadProfiler() if args.mode == "cprofile" else None
+        if profiler is not None:
+            profiler.start()
+        for _ in range(args.warmup):
+            lambda_handler(event, None)
+        if profiler is not None:
+            profiler.clear()
+
+        if memory:
+            tracemalloc.start(TRACE_FRAMES)
+        sampler = Sampler(args.interval_ms / 1000, stacks=args.mode == "sample", memory=memory).start()
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            if not args.warm_cache:
+                response_cache.clear()
+            result = lambda_handler(event, None)
+        elapsed = time.perf_counter() - start
+        stats = profiler.stop() if profiler is not None else None
+        sampler.stop()
+        peak = tracemalloc.get_traced_memory()[1] if memory else 0
+        tracemalloc.stop()
+
+    failed = sum(1 for r in result.get("results", [result]) if r.get("statusCode") != 200)
+    print(
+        f"{args.iterations} run(s) of {len(assets)} asset(s), top_k={args.top_k}: "
+        f"{elapsed / max(1, args.iterations) * 1000:.1f} ms per run, {failed} failed asset(s), "
+        f"{news.requests} NewsAPI and {openai.requests} OpenAI request(s)"
+    )
+
+    if stats is not None:
+        print(f"\nHot spots (cProfile, by {args.sort})")
+        stats.sort_stats(args.sort).print_stats(args.limit)
+        stats.dump_stats(args.pstats)
+        print(f"Statistics saved to {args.pstats}")
+    else:
+        total = sum(sampler.stacks.values())
+        print(f"\nHot spots ({total} wall-clock samples every {args.interval_ms:g} ms)")
+        print(f"{'function':<60}{'self %':>10}{'total %':>10}")
+        for label, self_samples, total_samples in stack_hot_spots(sampler.stacks, args.limit):
+            print(f"{label[:59]:<60}{self_samples / total * 100:>10.1f}{total_samples / total * 100:>10.1f}")
+        write_folded(sampler.stacks, args.stacks)
+        print(f"Folded stacks saved to {args.stacks}")
+
+    if memory and sampler.peak_snapshot is not None:
+        snapshot = pipeline_allocations(sampler.peak_snapshot)
+        held = sum(stat.size for stat in snapshot.statistics("filename"))
+        print(f"\nAllocations by module near the peak (pipeline: {held / 2 ** 20:.2f} MB, "
+              f"traced peak of the process: {peak / 2 ** 20:.2f} MB)")
+        print(f"{'module':<60}{'MB':>10}{'blocks':>10}")
+        for module, size, blocks in allocations_by_module(snapshot, args.limit):
+            print(f"{module[:59]:<60}{size / 2 ** 20:>10.3f}{blocks:>10}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
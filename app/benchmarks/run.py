@@ -0,0 +1,167 @@
+"""
+run.py
+
+End-to-end benchmark of `lambda_handler` against the local stand-ins for
+NewsAPI, OpenAI and SES. Reports p50/p95/p99 latency, throughput and peak
+memory for each combination of asset count and `top_k`, and compares them
+with a saved baseline to catch regressions.
+
+Usage (from the `app` directory):
+
+    python -m benchmarks.run --assets 1,10,40 --top-k 1,20,100 --save-baseline
+    python -m benchmarks.run --assets 1,10,40 --top-k 1,20,100 --check
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+from benchmarks.standins import NewsAPIStandIn, OpenAIStandIn, SESStandIn, StandInProfile
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+###########
+# Methods #
+###########
+
+def percentile(values: List[float], percent: float) -> float:
+    """Returns the given percentile of the values, by nearest rank."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def configure(news: NewsAPIStandIn, openai: OpenAIStandIn, ses: SESStandIn) -> None:
+    """Points the pipeline at the stand-ins. Must run before the first client is created."""
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+    from src.utils.config import CONFIG
+    CONFIG.update({
+        "NEWS_API_URL": news.url,
+        "NEWS_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": openai.url,
+        "OPENAI_API_KEY": "benchmark",
+        "SES_ENDPOINT_URL": ses.url,
+        "SENDER_EMAIL": "alerts@example.com",
+        "ALERT_EMAILS": [f"user{i}@example.com" for i in range(10)],
+        "SES_MAX_SEND_RATE": 1000.0,
+        "SEEN_INDEX_BACKEND": "none",
+        "SENTIMENT_BACKEND": "none",
+        "METRICS_ENABLED": False,
+    })
+
+def run_scenario(assets: int, top_k: int, iterations: int, warm_cache: bool) -> Dict[str, float]:
+    """Runs the handler `iterations` times and returns the scenario's metrics."""
+    from lambda_function import lambda_handler
+    from src.services.llm import response_cache
+
+    event = {"assets": [f"coin{i}" for i in range(assets)], "top_k": top_k}
+    latencies = []
+    failures = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not warm_cache:
+            response_cache.clear()
+        call_start = time.perf_counter()
+        result = lambda_handler(event, None)
+        latencies.append(time.perf_counter() - call_start)
+        failures += sum(1 for r in result.get("results", []) if r["statusCode"] != 200)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "assets_per_s": assets * iterations / elapsed,
+        "peak_mb": peak / 2 ** 20,
+        "failed_assets": failures,
+    }
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Returns a description of every metric that regressed beyond the tolerance."""
+    regressions = []
+    for scenario, metrics in results.items():
+        reference = baseline.get(scenario)
+        if reference is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "peak_mb"):
+            if metrics[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{scenario} {metric}: {reference[metric]:.2f} -> {metrics[metric]:.2f}")
+        if metrics["assets_per_s"] < reference["assets_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{scenario} assets_per_s: {reference['assets_per_s']:.2f} -> {metrics['assets_per_s']:.2f}"
+            )
+    return regressions
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark lambda_handler against local stand-ins.")
+    parser.add_argument("--assets", default="1,10", help="Comma-separated asset counts.")
+    parser.add_argument("--top-k", default="1,20", help="Comma-separated top_k values.")
+    parser.add_argument("--iterations", type=int, default=20, help="Handler runs per scenario.")
+    parser.add_argument("--news-latency-ms", type=float, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--ses-latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of stand-in requests that fail.")
+    parser.add_argument("--content-chars", type=int, default=200, help="Characters of content per article.")
+    parser.add_argument("--warm-cache", action="store_true", help="Keep the LLM response cache between runs.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Path of the baseline file.")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the new baseline.")
+    parser.add_argument("--check", action="store_true", help="Fail when a metric regresses past the tolerance.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression.")
+    args = parser.parse_args(argv)
+
+    def profile(latency_ms: float) -> StandInProfile:
+        return StandInProfile(latency=latency_ms / 1000, jitter=args.jitter_ms / 1000, error_rate=args.error_rate)
+
+    news = NewsAPIStandIn(profile(args.news_latency_ms), total_results=1000, content_chars=args.content_chars)
+    openai = OpenAIStandIn(profile(args.llm_latency_ms))
+    ses = SESStandIn(profile(args.ses_latency_ms))
+
+    results = {}
+    with news, openai, ses:
+        configure(news, openai, ses)
+
+        # The first run pays for the lazy imports and clients
+        from lambda_function import lambda_handler
+        start = time.perf_counter()
+        lambda_handler({"assets": ["warmup"], "top_k": 1}, None)
+        print(f"Cold start: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        print(f"{'scenario':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'assets/s':>10}{'peak MB':>10}{'failed':>8}")
+        for assets in (int(value) for value in args.assets.split(",")):
+            for top_k in (int(value) for value in args.top_k.split(",")):
+                scenario = f"assets={assets},top_k={top_k}"
+                metrics = run_scenario(assets, top_k, args.iterations, args.warm_cache)
+                results[scenario] = metrics
+                print(
+                    f"{scenario:<22}{metrics['p50_ms']:>10.1f}{metrics['p95_ms']:>10.1f}{metrics['p99_ms']:>10.1f}"
+                    f"{metrics['assets_per_s']:>10.1f}{metrics['peak_mb']:>10.2f}{metrics['failed_assets']:>8}"
+                )
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+            return 1
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
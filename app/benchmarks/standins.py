@@ -0,0 +1,329 @@
+"""
+standins.py
+
+This module provides local stand-in HTTP servers for NewsAPI, the OpenAI chat
+completions endpoint and Amazon SES, with configurable latency, error rate
+and payload size, so the whole pipeline can be exercised without the network.
+The replay stand-ins serve recorded responses instead of generated ones.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+###########
+# Classes #
+###########
+
+@dataclass
+class StandInProfile:
+    """Data class to represent the behavior of a stand-in server."""
+    latency: float = 0.0      # Seconds added to every response
+    jitter: float = 0.0       # Random extra latency, in seconds
+    error_rate: float = 0.0   # Share of requests answered with a 5xx error
+
+
+class StandInServer:
+    """Base class of the stand-in servers, served from a background thread."""
+
+    def __init__(self, profile: StandInProfile = None, seed: int = 0):
+        self.profile = profile or StandInProfile()
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stand_in._dispatch(self, None)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                stand_in._dispatch(self, self.rfile.read(length))
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _dispatch(self, handler: BaseHTTPRequestHandler, body: bytes) -> None:
+        with self._lock:
+            self.requests += 1
+            delay = self.profile.latency + self._random.uniform(0, self.profile.jitter)
+            failed = self._random.random() < self.profile.error_rate
+            if failed:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            status, content_type, payload = self.error_response()
+        else:
+            status, content_type, payload = self.handle(handler.path, body)
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def handle(self, path: str, body: bytes) -> tuple:
+        """Returns the `(status, content_type, payload)` of a successful request."""
+        raise NotImplementedError
+
+    def error_response(self) -> tuple:
+        return 503, "application/json", json.dumps({"status": "error", "message": "Service unavailable"})
+
+
+class NewsAPIStandIn(StandInServer):
+    """Stand-in for NewsAPI's /v2/everything endpoint."""
+
+    def __init__(self, profile: StandInProfile = None, total_results: int = 100, content_chars: int = 200, seed: int = 0):
+        super().__init__(profile, seed)
+        self.total_results = total_results
+        self.content_chars = content_chars
+
+    @property
+    def url(self) -> str:
+        return f"{super().url}/v2/everything"
+
+    def handle(self, path: str, body: bytes) -> tuple:
+        params = {key: values[0] for key, values in parse_qs(urlparse(path).query).items()}
+        query = params.get("q", "crypto")
+        page = int(params.get("page", 1))
+        page_size = int(params.get("pageSize", 100))
+        start = (page - 1) * page_size
+        articles = [self.article(query, i) for i in range(start, min(start + page_size, self.total_results))]
+        return 200, "application/json", json.dumps({
+            "status": "ok",
+            "totalResults": self.total_results,
+            "articles": articles,
+        })
+
+    def article(self, query: str, i: int) -> dict:
+        words = ["market", "traders", "exchange", "rally", "outflows", "regulators", "fund", "price", "volume"]
+        rng = random.Random(f"{query}-{i}")
+        text = " ".join(rng.choice(words) for _ in range(self.content_chars // 7))
+        return {
+            "source": {"id": None, "name": f"Source {i % 7}"},
+            "author": "Stand-in",
+            "title": f"{query} story {i}: {' '.join(rng.choice(words) for _ in range(6))}",
+            "description": f"{query} {' '.join(rng.choice(words) for _ in range(20))}",
+            "url": f"https://news.example.com/{query}/{i}",
+            "urlToImage": None,
+            "publishedAt": "2025-01-10T12:00:00Z",
+            "content": text[:self.content_chars],
+        }
+
+
+class OpenAIStandIn(StandInServer):
+    """Stand-in for OpenAI's /v1/chat/completions endpoint, including streaming."""
+
+    def __init__(self, profile: StandInProfile = None, drop_rate: float = 0.2, reasoning_chars: int = 400, seed: int = 0):
+        super().__init__(profile, seed)
+        self.drop_rate = drop_rate
+        self.reasoning_chars = reasoning_chars
+
+    @property
+    def url(self) -> str:
+        return f"{super().url}/v1"
+
+    def handle(self, path: str, body: bytes) -> tuple:
+        request = json.loads(body or b"{}")
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        content = self.answer(request, prompt)
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        if request.get("stream"):
+            events = []
+            for start in range(0, len(content), 16):
+                events.append({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": request.get("model"),
+                    "choices": [{"index": 0, "delta": {"content": content[start:start + 16]}, "finish_reason": None}],
+                })
+            if request.get("stream_options", {}).get("include_usage"):
+                events.append({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": request.get("model"), "choices": [], "usage": usage,
+                })
+            payload = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+            return 200, "text/event-stream", payload
+
+        return 200, "application/json", json.dumps({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def answer(self, request: dict, prompt: str) -> str:
+        """Returns the message content answering a chat completion request."""
+        # Deterministic verdict per prompt, so runs are comparable
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        value_will_drop = digest[0] / 255 < self.drop_rate
+        if request.get("response_format", {}).get("type") == "json_schema":
+            # Structured answers follow the schema's order and cite articles by number
+            return json.dumps({
+                "ValueWillDrop": value_will_drop,
+                "Confidence": 0.9,
+                "Citations": [1],
+                "Reasoning": "Article [1] suggests the sentiment.",
+            })
+        return json.dumps({
+            "Reasoning": ("The news suggests " + "x" * self.reasoning_chars)[:self.reasoning_chars],
+            "ValueWillDrop": value_will_drop,
+        })
+
+    def error_response(self) -> tuple:
+        return 500, "application/json", json.dumps({"error": {"message": "Stand-in error", "type": "server_error"}})
+
+
+class SESStandIn(StandInServer):
+    """Stand-in for the SES query API (SendEmail)."""
+
+    def __init__(self, profile: StandInProfile = None, seed: int = 0):
+        super().__init__(profile, seed)
+        self.messages = []
+
+    def handle(self, path: str, body: bytes) -> tuple:
+        form = parse_qs((body or b"").decode("utf-8"))
+        with self._lock:
+            self.messages.append(form)
+        message_id = uuid.uuid4().hex
+        return 200, "text/xml", (
+            '<SendEmailResponse xmlns="http://ses.amazonaws.com/doc/2010-12-01/">'
+            f"<SendEmailResult><MessageId>{message_id}</MessageId></SendEmailResult>"
+            f"<ResponseMetadata><RequestId>{uuid.uuid4()}</RequestId></ResponseMetadata>"
+            "</SendEmailResponse>"
+        )
+
+    def error_response(self) -> tuple:
+        return 500, "text/xml", (
+            '<ErrorResponse xmlns="http://ses.amazonaws.com/doc/2010-12-01/">'
+            "<Error><Type>Receiver</Type><Code>ServiceUnavailable</Code><Message>Stand-in error</Message></Error>"
+            f"<RequestId>{uuid.uuid4()}</RequestId></ErrorResponse>"
+        )
+
+
+class ReplayNewsAPIStandIn(NewsAPIStandIn):
+    """
+    NewsAPI stand-in serving recorded responses.
+
+    Args:
+        pages (dict): The recorded /v2/everything responses of each query,
+                      lower-cased, in page order. Queries that were not
+                      recorded are answered with generated articles.
+    """
+
+    def __init__(self, pages: Dict[str, List[dict]], profile: StandInProfile = None, **kwargs):
+        super().__init__(profile, **kwargs)
+        self.pages = {query.lower(): responses for query, responses in pages.items()}
+
+    def handle(self, path: str, body: bytes) -> tuple:
+        params = {key: values[0] for key, values in parse_qs(urlparse(path).query).items()}
+        responses = self.pages.get(params.get("q", "").lower())
+        if not responses:
+            return super().handle(path, body)
+        page = int(params.get("page", 1))
+        if page <= len(responses):
+            return 200, "application/json", json.dumps(responses[page - 1])
+        # Past the recorded pages, as NewsAPI does past the last page
+        return 200, "application/json", json.dumps({
+            "status": "ok",
+            "totalResults": responses[0].get("totalResults", 0),
+            "articles": [],
+        })
+
+
+class ReplayOpenAIStandIn(OpenAIStandIn):
+    """
+    OpenAI stand-in answering with recorded message contents, in turn.
+
+    Args:
+        answers (list): The recorded message contents. Without any, answers
+                        are generated.
+    """
+
+    def __init__(self, answers: List[str], profile: StandInProfile = None, **kwargs):
+        super().__init__(profile, **kwargs)
+        self.answers = list(answers)
+        self._next = 0
+
+    def answer(self, request: dict, prompt: str) -> str:
+        if not self.answers:
+            return super().answer(request, prompt)
+        with self._lock:
+            content = self.answers[self._next % len(self.answers)]
+            self._next += 1
+        return content
+
+###########
+# Methods #
+###########
+
+def load_recording(path: str) -> dict:
+    """
+    Loads recorded responses for the replay stand-ins.
+
+    The file is a JSON object with the NewsAPI responses of each query under
+    `news`, e.g. `{"bitcoin": [<page 1>, <page 2>]}`, and the OpenAI answers
+    under `openai`, either as message contents or as whole chat completion
+    responses. SES responses carry no data, so they are not recorded.
+
+    Returns:
+        dict: The `news` pages and the `openai` message contents.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        recording = json.load(file)
+    answers = []
+    for answer in recording.get("openai", []):
+        if isinstance(answer, dict):
+            answer = answer["choices"][0]["message"]["content"]
+        answers.append(answer)
+    return {"news": recording.get("news", {}), "openai": answers}
@@ -1,39 +1,299 @@
-from src.utils.config import CONFIG
+from src.utils.config import CONFIG, CONFIG_LOAD_SECONDS
+from src.utils.metrics import Metrics, get_metrics, start_invocation
+from src.utils.resilience import set_deadline
+from src.utils.ratelimit import asset_priority, rate_limit_priority
 from src.services.news import fetch_articles
 from src.services.llm import analyze_news_with_llm
-from src.services.email import send_email_alert
+from src.services.email import DigestDeliveryError, send_email_alert, send_digest
+from src.services.seen import get_seen_index
+from src.services.sentiment import drop_probability, get_sentiment_tracker
+from src.services.relevance import filter_articles
+from src.services.dedup import deduplicate_articles
+from src.services.enrich import enrich_articles
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Collection, List, Optional
 
-def lambda_handler(event: dict, context: dict) -> dict:
-    """Main function for AWS Lambda."""
+# Whether the next invocation is the first one of this container
+_cold_start = True
+
+def get_price_move(crypto_name: str) -> Optional[float]:
+    """Returns the actual price move of an asset from the local price store, if known."""
+    # NumPy is only imported when a price is needed
+    from src.services.prices import recent_price_move
     try:
-        # Fetch news articles
-        today = datetime.now()
+        return recent_price_move(crypto_name, lookback_hours=CONFIG.get("PRICE_LOOKBACK_HOURS", 24))
+    except Exception as e:
+        print(f"Price error: {e}")
+        return None
+
+def analyze_asset(crypto_name: str, date: datetime, top_k: int = 1, send_alert: bool = True) -> dict:
+    """Runs the fetch -> analyze -> email pipeline for a single asset.
+
+    NewsAPI and OpenAI calls wait for the shared rate limits, where assets
+    with a higher `ASSET_PRIORITIES` entry are served first.
+
+    Args:
+        crypto_name (str): The name of the cryptocurrency to analyze.
+        date (datetime): The date used to filter the news articles.
+        top_k (int): The maximum number of articles to analyze.
+        send_alert (bool): Whether to email an alert for this asset on its own.
+
+    Returns:
+        dict: The pipeline result for the asset.
+    """
+    with rate_limit_priority(asset_priority(crypto_name)):
+        return _analyze_asset(crypto_name, date, top_k, send_alert)
+
+def _analyze_asset(crypto_name: str, date: datetime, top_k: int, send_alert: bool) -> dict:
+    metrics = get_metrics()
+
+    # Fetch news articles
+    with metrics.span("fetch"):
         news_articles = fetch_articles(
-            query=CONFIG.get("CRYPTO_NAME"),
-            date=today,
-            top_k=1
+            query=crypto_name,
+            date=date,
+            top_k=top_k
         )
+    metrics.count("articles_fetched", len(news_articles))
+    if not news_articles:
+        return {"statusCode": 200, "body": "No news articles available."}
+
+    with metrics.span("filter"):
+        # Drop the articles that are clearly not relevant before spending tokens
+        relevant = filter_articles(
+            news_articles,
+            query=crypto_name,
+            min_relevance=CONFIG.get("RELEVANCE_THRESHOLD", 0.3)
+        )
+        news_articles = relevant.articles
         if not news_articles:
-            return {"statusCode": 200, "body": "No news articles available."}
+            return {"statusCode": 200, "body": "No relevant news articles available.", "articles_dropped": relevant.dropped}
+
+        # Merge near-duplicate copies of the same story
+        news_articles = deduplicate_articles(news_articles, max_distance=CONFIG.get("DEDUP_MAX_DISTANCE", 3))
+
+        # Skip the articles that were already analyzed on a previous run
+        seen_index = get_seen_index()
+        if seen_index is not None:
+            news_articles = seen_index.filter_new(news_articles, namespace=crypto_name)
+            if not news_articles:
+                return {"statusCode": 200, "body": "No new news articles available.", "articles_dropped": relevant.dropped}
 
-        # Analyze news articles
-        analysis = analyze_news_with_llm(
-            news_articles=news_articles,
-            crypto_name=CONFIG.get("CRYPTO_NAME")
+    # Replace the truncated NewsAPI content with the full text of the pages
+    analyzed_articles = news_articles
+    if CONFIG.get("ENRICH_CONTENT", False):
+        with metrics.span("enrich"):
+            analyzed_articles = enrich_articles(news_articles)
+
+    # Analyze news articles
+    analysis = analyze_news_with_llm(
+        news_articles=analyzed_articles,
+        crypto_name=crypto_name
+    )
+    metrics.count("articles_analyzed", len(news_articles))
+
+    # With a sentiment tracker, only a crossing of the rolling drop score alerts.
+    # The crossing is claimed before sending, so concurrent runs alert once.
+    result = {"statusCode": 200}
+    tracker = get_sentiment_tracker()
+    revert = None
+    if tracker is not None:
+        result["sentiment"], revert = tracker.apply(
+            crypto_name,
+            drop_probability(analysis),
+            weight=sum(article.source_count for article in news_articles)
         )
+        result["alert"] = result["sentiment"]["alert"]
+    else:
+        result["alert"] = bool(analysis.get("ValueWillDrop", False))
+
+    def commit(delivered: bool = True) -> None:
+        # A failed alert releases its claim and leaves the articles unseen, so it fires again
+        if delivered:
+            if seen_index is not None:
+                seen_index.mark_seen(news_articles, namespace=crypto_name)
+        elif revert is not None:
+            revert()
 
-        # Send email alert if a market drop is detected
+    # Send email alert if a market drop is detected
+    if not result["alert"]:
         if analysis.get("ValueWillDrop", False):
-            send_email_alert(
-                justification=analysis.get("Reasoning", "No reasoning provided."),
-                crypto_name=CONFIG.get("CRYPTO_NAME")
-            )
-            return {"statusCode": 200, "body": "Alert email sent.", "analysis": analysis}
+            body = "Market drop detected, already alerted or below the sentiment threshold."
+        else:
+            body = "No market drop detected."
+        commit()
+    else:
+        result["price_move"] = get_price_move(crypto_name)
+        if send_alert:
+            try:
+                with metrics.span("email"):
+                    response = send_email_alert(
+                        justification=analysis.get("Reasoning", "No reasoning provided."),
+                        crypto_name=crypto_name,
+                        articles_analyzed=len(news_articles),
+                        price_move=result["price_move"]
+                    )
+                # Missing credentials are reported without an exception
+                if response is None:
+                    raise RuntimeError("The alert email could not be sent.")
+            except Exception:
+                commit(delivered=False)
+                raise
+            commit()
+            body = "Alert email sent."
         else:
-            return {"statusCode": 200, "body": "No market drop detected.", "analysis": analysis}
+            # Committed by `commit_results` once the digest is sent or has failed
+            result["commit"] = commit
+            body = "Market drop detected."
+    return {
+        **result,
+        "body": body,
+        "analysis": analysis,
+        "articles_analyzed": len(news_articles),
+        "articles_dropped": relevant.dropped
+    }
+
+def commit_results(results: List[dict], delivered: bool, undelivered: Collection[str] = ()) -> None:
+    """Settles the alerts of a run once their digest is sent or has failed.
+
+    Delivered alerts mark their articles as seen. Undelivered ones release
+    their sentiment state, so that they fire again on the next run, to every
+    recipient: the recipients who already received them get them twice. The
+    pending commits are removed from the results either way.
+
+    Args:
+        results (list): The per-asset results of `analyze_assets`.
+        delivered (bool): Whether the digest was sent.
+        undelivered (collection): The assets whose digest was not sent to
+                                  every recipient, e.g. from `DigestDeliveryError`.
+    """
+    for result in results:
+        commit = result.pop("commit", None)
+        if commit is not None:
+            commit(delivered and result["asset"] not in undelivered)
+
+def analyze_assets(crypto_names: List[str], date: datetime, top_k: int = 1, max_workers: int = 8) -> List[dict]:
+    """Runs the pipeline for several assets concurrently.
+
+    Each asset is processed independently, so a slow or failing asset does not
+    hold up or fail the others. No email is sent per asset: the alerts are
+    meant to be grouped into a digest with `send_alert_digest`, and settled
+    with `commit_results` once it is sent or has failed.
+
+    Args:
+        crypto_names (list): The names of the cryptocurrencies to analyze.
+        date (datetime): The date used to filter the news articles.
+        top_k (int): The maximum number of articles to analyze per asset.
+        max_workers (int): The maximum number of assets processed at once.
+
+    Returns:
+        list: One result per asset, in the same order as `crypto_names`.
+    """
+    def run(crypto_name: str) -> dict:
+        try:
+            result = analyze_asset(crypto_name, date, top_k, send_alert=False)
+        except Exception as e:
+            result = {"statusCode": 500, "body": str(e)}
+        return {"asset": crypto_name, **result}
+
+    if not crypto_names:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(crypto_names)))) as executor:
+        return list(executor.map(run, crypto_names))
+
+def send_alert_digest(results: List[dict]) -> int:
+    """Emails one digest per recipient with every market drop of a run.
+
+    Args:
+        results (list): The per-asset results of `analyze_assets`.
+
+    Returns:
+        int: The number of assets included in the digest.
+    """
+    alerts = [
+        {
+            "asset": result["asset"],
+            "reasoning": result["analysis"].get("Reasoning", "No reasoning provided."),
+            "articles_analyzed": result.get("articles_analyzed"),
+            "price_move": result.get("price_move"),
+        }
+        for result in results
+        if result.get("alert", False)
+    ]
+    recipients = CONFIG.get("ALERT_EMAILS") or [CONFIG.get("ALERT_EMAIL")]
+    if alerts:
+        with get_metrics().span("email"):
+            send_digest(alerts, {recipient: None for recipient in recipients if recipient})
+    return len(alerts)
+
+def finish_invocation(response: dict, metrics: Metrics) -> dict:
+    """Adds the metrics of the invocation to its response and emits them.
+
+    Args:
+        response (dict): The response of the handler.
+        metrics (Metrics): The metrics of the invocation.
+
+    Returns:
+        dict: The response, with a "metrics" summary.
+    """
+    if CONFIG.get("METRICS_ENABLED", True):
+        metrics.emit(CONFIG.get("METRICS_NAMESPACE", "CryptoNews"), {"Service": "CryptoNews"})
+    return {**response, "metrics": metrics.to_dict()}
+
+def lambda_handler(event: dict, context: dict) -> dict:
+    """Main function for AWS Lambda."""
+    global _cold_start
+    metrics = start_invocation()
+    if _cold_start:
+        # The configuration is loaded once per container, at import time
+        metrics.add_time("config", CONFIG_LOAD_SECONDS)
+        metrics.count("cold_starts")
+        _cold_start = False
+
+    event = event or {}
+    set_deadline(context, safety_margin=CONFIG.get("DEADLINE_SAFETY_MARGIN", 2))
+    today = datetime.now()
+    top_k = event.get("top_k", 1)
+
+    # Multi-asset mode, driven by the event or the CRYPTO_NAMES configuration
+    crypto_names = event.get("assets") or CONFIG.get("CRYPTO_NAMES")
+    if crypto_names:
+        results = analyze_assets(
+            crypto_names=crypto_names,
+            date=today,
+            top_k=top_k,
+            max_workers=event.get("max_concurrency", CONFIG.get("MAX_CONCURRENCY", 8))
+        )
+        failed = sum(1 for result in results if result["statusCode"] != 200)
+        try:
+            alerted = send_alert_digest(results)
+        except DigestDeliveryError as e:
+            # Only the alerts that missed a recipient fire again
+            commit_results(results, delivered=True, undelivered=e.undelivered)
+            return finish_invocation(
+                {"statusCode": 500, "body": f"Failed to send the alert digest: {e}", "results": results},
+                metrics
+            )
+        except Exception as e:
+            commit_results(results, delivered=False)
+            return finish_invocation(
+                {"statusCode": 500, "body": f"Failed to send the alert digest: {e}", "results": results},
+                metrics
+            )
+        commit_results(results, delivered=True)
+        return finish_invocation({
+            "statusCode": 200,
+            "body": f"Analyzed {len(results) - failed} of {len(results)} assets, {alerted} alert(s) sent.",
+            "results": results
+        }, metrics)
+
+    try:
+        response = analyze_asset(CONFIG.get("CRYPTO_NAME"), today, top_k)
     except Exception as e:
-        return {"statusCode": 500, "body": str(e)}
+        response = {"statusCode": 500, "body": str(e)}
+    return finish_invocation(response, metrics)
 
 if __name__ == "__main__":
-    print(lambda_handler(None, None))
\ No newline at end of file
+    print(lambda_handler(None, None))
@@ -0,0 +1,247 @@
+"""
+backfill.py
+
+This module provides a historical backfill mode. The (assets x dates) grid is
+analyzed on a thread pool under a rate limit, every finished cell is
+checkpointed to a JSONL file so an interrupted run resumes where it stopped,
+and the results are written to a columnar file for analysis.
+
+Unlike the Lambda path, the backfill skips the seen-article index and never
+sends emails.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.utils.config import CONFIG
+from src.utils.ratelimit import TokenBucket, asset_priority, rate_limit_priority
+from src.services.news import fetch_article_batch
+from src.services.relevance import filter_articles
+from src.services.dedup import deduplicate_articles
+from src.services.enrich import enrich_articles
+from src.services.llm import analyze_news_with_llm
+
+# Columns of the backfill results, in output order
+COLUMNS = (
+    "asset",
+    "date",
+    "status",
+    "value_will_drop",
+    "reasoning",
+    "tier",
+    "tiers",
+    "articles_fetched",
+    "articles_dropped",
+    "articles_analyzed",
+    "elapsed_s",
+    "error",
+)
+
+###########
+# Classes #
+###########
+
+class BackfillCheckpoint:
+    """
+    Append-only JSONL file of the finished cells of a backfill.
+
+    Only successful cells are checkpointed, so failed cells are retried when
+    the backfill is resumed.
+
+    Args:
+        path (str): The path of the checkpoint file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.results: Dict[Tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r+b') as file:
+                data = file.read()
+                # A line cut short by an interruption is dropped, so that the
+                # next row is not appended onto it
+                if data and not data.endswith(b"\n"):
+                    data = data[:data.rfind(b"\n") + 1]
+                    file.truncate(len(data))
+            for line in data.decode('utf-8', errors='replace').splitlines():
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                self.results[(row["asset"], row["date"])] = row
+
+    def __contains__(self, cell: Tuple[str, str]) -> bool:
+        return cell in self.results
+
+    def record(self, row: dict) -> None:
+        """Appends a finished cell to the checkpoint file."""
+        line = json.dumps(row) + "\n"
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+            self.results[(row["asset"], row["date"])] = row
+
+###########
+# Methods #
+###########
+
+def date_range(start: datetime, end: datetime) -> List[datetime]:
+    """Returns every date from `start` to `end`, both included."""
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+def analyze_cell(crypto_name: str, date: datetime, top_k: int = 10) -> dict:
+    """
+    Runs the fetch -> filter -> analyze pipeline for one (asset, date) cell.
+
+    Args:
+        crypto_name (str): The name of the cryptocurrency to analyze.
+        date (datetime): The date of the articles.
+        top_k (int): The maximum number of articles to analyze.
+
+    Returns:
+        dict: The result row of the cell, with the `COLUMNS` keys.
+    """
+    row = dict.fromkeys(COLUMNS)
+    row.update(asset=crypto_name, date=date.strftime('%Y-%m-%d'), articles_fetched=0)
+    start = time.perf_counter()
+    try:
+        # Articles are held as a columnar batch through filtering and dedup
+        news_articles = fetch_article_batch(query=crypto_name, date=date, top_k=top_k)
+        row["articles_fetched"] = len(news_articles)
+        relevant = filter_articles(
+            news_articles,
+            query=crypto_name,
+            min_relevance=CONFIG.get("RELEVANCE_THRESHOLD", 0.3)
+        )
+        row["articles_dropped"] = relevant.dropped
+        news_articles = deduplicate_articles(relevant.articles, max_distance=CONFIG.get("DEDUP_MAX_DISTANCE", 3))
+        row["articles_analyzed"] = len(news_articles)
+
+        if news_articles:
+            if CONFIG.get("ENRICH_CONTENT", False):
+                news_articles = enrich_articles(news_articles)
+            analysis = analyze_news_with_llm(news_articles=news_articles, crypto_name=crypto_name)
+            row["value_will_drop"] = bool(analysis.get("ValueWillDrop", False))
+            row["reasoning"] = analysis.get("Reasoning")
+            # With `LLM_CASCADE`, the verdict of every tier is kept for evaluation
+            row["tier"] = analysis.get("Tier")
+            row["tiers"] = analysis.get("Tiers")
+            row["status"] = "ok"
+        else:
+            row["status"] = "empty"
+    except Exception as e:
+        row["status"] = "error"
+        row["error"] = str(e)
+    row["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return row
+
+def run_backfill(
+    assets: List[str],
+    dates: List[datetime],
+    checkpoint: BackfillCheckpoint,
+    top_k: int = 10,
+    max_workers: int = 4,
+    rate: Optional[float] = 1.0,
+) -> List[dict]:
+    """
+    Analyzes every (asset, date) cell that is not in the checkpoint yet.
+
+    Args:
+        assets (list): The names of the cryptocurrencies to analyze.
+        dates (list): The dates to analyze.
+        checkpoint (BackfillCheckpoint): The checkpoint of the finished cells.
+        top_k (int): The maximum number of articles to analyze per cell.
+        max_workers (int): The maximum number of cells analyzed at once.
+        rate (float): The maximum number of cells started per second, or None
+                      for no limit.
+
+    Returns:
+        list: The result rows of every cell of the grid, asset by asset and in
+              date order, including the ones read from the checkpoint.
+    """
+    cells = [(asset, date) for asset in assets for date in dates]
+    pending = [(asset, date) for asset, date in cells if (asset, date.strftime('%Y-%m-%d')) not in checkpoint]
+    bucket = TokenBucket(rate) if rate else None
+
+    def run(cell: Tuple[str, datetime]) -> dict:
+        if bucket is not None:
+            bucket.acquire()
+        # Rate-limited calls of high-priority assets are served first
+        with rate_limit_priority(asset_priority(cell[0])):
+            row = analyze_cell(cell[0], cell[1], top_k)
+        if row["status"] != "error":
+            checkpoint.record(row)
+        return row
+
+    fresh = {}
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as executor:
+            for row in executor.map(run, pending):
+                fresh[(row["asset"], row["date"])] = row
+
+    rows = []
+    for asset, date in cells:
+        key = (asset, date.strftime('%Y-%m-%d'))
+        rows.append(fresh.get(key) or checkpoint.results[key])
+    return rows
+
+def to_columns(rows: Iterable[dict]) -> Dict[str, list]:
+    """Transposes result rows into one list of values per column."""
+    columns = {column: [] for column in COLUMNS}
+    for row in rows:
+        for column in COLUMNS:
+            columns[column].append(row.get(column))
+    return columns
+
+def write_columns(rows: Iterable[dict], path: str) -> None:
+    """
+    Writes the result rows to a columnar file.
+
+    A `.parquet` path is written with pyarrow, which must then be installed.
+    Any other path is written as a JSON object mapping each column to its
+    list of values, which e.g. `pandas.DataFrame(json.load(file))` reads back.
+
+    Args:
+        rows (iterable): The result rows.
+        path (str): The path of the output file.
+    """
+    columns = to_columns(rows)
+    if path.endswith(".parquet"):
+        import pyarrow
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(pyarrow.table(columns), path)
+        return
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(columns, file)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the analysis of many assets over a date range.")
+    parser.add_argument("--assets", required=True, help="Comma-separated list of assets.")
+    parser.add_argument("--start", required=True, help="First date (YYYY-MM-DD).")
+    parser.add_argument("--end", required=True, help="Last date (YYYY-MM-DD).")
+    parser.add_argument("--top-k", type=int, default=10, help="Articles per (asset, date).")
+    parser.add_argument("--workers", type=int, default=4, help="Cells analyzed at once.")
+    parser.add_argument("--rate", type=float, default=1.0, help="Cells started per second (0 for no limit).")
+    parser.add_argument("--checkpoint", default="/tmp/crypto_news_backfill.checkpoint.jsonl", help="Path of the checkpoint file.")
+    parser.add_argument("--output", default="/tmp/crypto_news_backfill.json", help="Path of the output file (.json or .parquet).")
+    args = parser.parse_args()
+
+    rows = run_backfill(
+        assets=[asset.strip() for asset in args.assets.split(',') if asset.strip()],
+        dates=date_range(datetime.strptime(args.start, '%Y-%m-%d'), datetime.strptime(args.end, '%Y-%m-%d')),
+        checkpoint=BackfillCheckpoint(args.checkpoint),
+        top_k=args.top_k,
+        max_workers=args.workers,
+        rate=args.rate or None,
+    )
+    write_columns(rows, args.output)
+    failed = sum(1 for row in rows if row["status"] == "error")
+    print(f"Backfilled {len(rows) - failed} of {len(rows)} cells, results written to {args.output}.")
@@ -0,0 +1,258 @@
+"""
+batch.py
+
+This module provides an offline batch-analysis mode. Prompts produced by
+`build_prompts`, as for online analyses, are written to a JSONL request file
+for `LLM_MODEL`, sent through the OpenAI Batch API (or a local stand-in),
+and the results are matched back to their (asset, date, article set) by
+custom id. Article sets split into several chunk prompts get one request per
+chunk, whose verdicts are combined with `combine_verdicts`.
+"""
+
+import argparse
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Tuple
+from src.services.news import Article, fetch_articles
+from src.utils.config import CONFIG
+from src.services.llm import MODEL, SYSTEM_MESSAGE, build_prompts, combine_verdicts, parse_response
+
+# Endpoint used for every batch request
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Separates the custom id of an article set from the chunk of a request
+CHUNK_SEPARATOR = "#"
+
+###########
+# Classes #
+###########
+
+class OpenAIBatchClient:
+    """Sends batch files through the OpenAI Batch API."""
+
+    def __init__(self, llm_client, poll_interval: float = 30.0):
+        self.llm_client = llm_client
+        self.poll_interval = poll_interval
+
+    def submit(self, input_path: str) -> str:
+        """Uploads the request file and creates a batch, returning its id."""
+        with open(input_path, 'rb') as file:
+            input_file = self.llm_client.files.create(file=file, purpose="batch")
+        batch = self.llm_client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+        )
+        return batch.id
+
+    def results(self, batch_id: str) -> List[str]:
+        """Waits for the batch to finish and returns its output JSONL lines."""
+        while True:
+            batch = self.llm_client.batches.retrieve(batch_id)
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise RuntimeError(f"Batch {batch_id} ended with status '{batch.status}'.")
+            time.sleep(self.poll_interval)
+
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines.extend(self.llm_client.files.content(file_id).text.splitlines())
+        return lines
+
+
+class LocalBatchClient:
+    """
+    File-based stand-in for the OpenAI Batch API, used for testing.
+
+    Each request is answered by `responder`, which receives the request body
+    and returns the completion text. Results are written to `output_path` in
+    the same format as the OpenAI batch output file.
+    """
+
+    def __init__(self, responder: Callable[[dict], str], output_path: str):
+        self.responder = responder
+        self.output_path = output_path
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, 'r', encoding='utf-8') as input_file, \
+                open(self.output_path, 'w', encoding='utf-8') as output_file:
+            for i, line in enumerate(input_file):
+                request = json.loads(line)
+                result = {"id": f"batch_req_{i}", "custom_id": request["custom_id"], "error": None}
+                try:
+                    content = self.responder(request["body"])
+                    result["response"] = {
+                        "status_code": 200,
+                        "body": {"choices": [{"message": {"role": "assistant", "content": content}}]},
+                    }
+                except Exception as e:
+                    result["response"] = None
+                    result["error"] = {"code": "local_error", "message": str(e)}
+                output_file.write(json.dumps(result) + "\n")
+        return self.output_path
+
+    def results(self, batch_id: str) -> List[str]:
+        with open(batch_id, 'r', encoding='utf-8') as file:
+            return file.read().splitlines()
+
+###########
+# Methods #
+###########
+
+def make_custom_id(crypto_name: str, date: datetime, news_articles: List[Article]) -> str:
+    """
+    Build the custom id of a batch request from its asset, date and article set.
+
+    Args:
+        crypto_name (str): The name of the cryptocurrency.
+        date (datetime): The date of the articles.
+        news_articles (list): The analyzed articles.
+
+    Returns:
+        str: The custom id, e.g. `bitcoin|2025-01-10|<hash>`.
+    """
+    digest = hashlib.sha256()
+    for article in news_articles:
+        digest.update(f"{article.url or article.title}\0".encode('utf-8'))
+    return f"{crypto_name}|{date.strftime('%Y-%m-%d')}|{digest.hexdigest()[:16]}"
+
+def build_batch_request(custom_id: str, prompt: str) -> dict:
+    """
+    Build a single line of the batch request file.
+
+    Args:
+        custom_id (str): The id used to match the result back.
+        prompt (str): A prompt produced by `build_prompts`.
+
+    Returns:
+        dict: The batch request, for `LLM_MODEL`.
+    """
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": CONFIG.get('LLM_MODEL') or MODEL,
+            "messages": [
+                {"role": "system", "content": SYSTEM_MESSAGE},
+                {"role": "user", "content": prompt},
+            ],
+        },
+    }
+
+def write_batch_file(jobs: Iterable[Tuple[str, datetime, List[Article]]], path: str) -> List[str]:
+    """
+    Write one JSONL request line per (asset, date, article set), or per chunk
+    of the article sets that do not fit in `PROMPT_TOKEN_BUDGET`.
+
+    Chunk requests have the custom id of their set, followed by
+    `#<chunk>:<number of articles>`.
+
+    Args:
+        jobs (iterable): `(crypto_name, date, news_articles)` tuples.
+        path (str): The path of the request file.
+
+    Returns:
+        list: The custom ids, in file order.
+    """
+    custom_ids = []
+    with open(path, 'w', encoding='utf-8') as file:
+        for crypto_name, date, news_articles in jobs:
+            if not news_articles:
+                continue
+            custom_id = make_custom_id(crypto_name, date, news_articles)
+            prompts = build_prompts(news_articles, crypto_name)
+            for position, (prompt, articles) in enumerate(prompts):
+                chunk_id = custom_id if len(prompts) == 1 else f"{custom_id}{CHUNK_SEPARATOR}{position}:{articles}"
+                file.write(json.dumps(build_batch_request(chunk_id, prompt)) + "\n")
+                custom_ids.append(chunk_id)
+    return custom_ids
+
+def read_batch_results(lines: Iterable[str]) -> Dict[str, dict]:
+    """
+    Match batch output lines back to their custom ids.
+
+    Args:
+        lines (iterable): The lines of the batch output file.
+
+    Returns:
+        dict: The parsed verdict of each custom id, or `{"error": ...}` when the
+              request, or one of its chunks, failed or the response could not
+              be parsed.
+    """
+    results = {}
+    chunks: Dict[str, list] = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        custom_id = result["custom_id"]
+        response = result.get("response")
+        if result.get("error") or not response or response.get("status_code") != 200:
+            verdict = {"error": result.get("error") or response}
+        else:
+            content = response["body"]["choices"][0]["message"]["content"]
+            try:
+                verdict = parse_response(content)
+            except ValueError:
+                verdict = {"error": f"Invalid response: {content}"}
+
+        if CHUNK_SEPARATOR in custom_id:
+            custom_id, chunk = custom_id.rsplit(CHUNK_SEPARATOR, 1)
+            position, articles = chunk.split(":")
+            chunks.setdefault(custom_id, []).append((int(position), int(articles), verdict))
+        else:
+            results[custom_id] = verdict
+
+    for custom_id, parts in chunks.items():
+        parts.sort(key=lambda part: part[0])
+        errors = [verdict for _, _, verdict in parts if "error" in verdict]
+        if errors:
+            results[custom_id] = errors[0]
+        else:
+            results[custom_id] = combine_verdicts(
+                [verdict for _, _, verdict in parts], weights=[articles for _, articles, _ in parts]
+            )
+    return results
+
+def run_batch(jobs: Iterable[Tuple[str, datetime, List[Article]]], batch_client, input_path: str) -> Dict[str, dict]:
+    """
+    Write, submit and collect a batch of analyses.
+
+    Args:
+        jobs (iterable): `(crypto_name, date, news_articles)` tuples.
+        batch_client: An `OpenAIBatchClient` or `LocalBatchClient`.
+        input_path (str): The path of the request file.
+
+    Returns:
+        dict: The parsed verdict of each custom id.
+    """
+    custom_ids = write_batch_file(jobs, input_path)
+    if not custom_ids:
+        return {}
+    batch_id = batch_client.submit(input_path)
+    return read_batch_results(batch_client.results(batch_id))
+
+if __name__ == "__main__":
+    from src.services.llm import get_llm_client
+
+    parser = argparse.ArgumentParser(description="Analyze news for many assets and dates with the OpenAI Batch API.")
+    parser.add_argument("--assets", required=True, help="Comma-separated list of assets.")
+    parser.add_argument("--start", required=True, help="First date (YYYY-MM-DD).")
+    parser.add_argument("--end", required=True, help="Last date (YYYY-MM-DD).")
+    parser.add_argument("--top-k", type=int, default=10, help="Articles per (asset, date).")
+    parser.add_argument("--input", default="/tmp/crypto_news_batch.jsonl", help="Path of the request file.")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, '%Y-%m-%d')
+    days = (datetime.strptime(args.end, '%Y-%m-%d') - start).days + 1
+    jobs = (
+        (asset.strip(), date, fetch_articles(query=asset.strip(), date=date, top_k=args.top_k))
+        for asset in args.assets.split(',')
+        for date in (start + timedelta(days=offset) for offset in range(days))
+    )
+    print(json.dumps(run_batch(jobs, OpenAIBatchClient(get_llm_client()), args.input), indent=2))
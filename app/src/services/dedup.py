@@ -0,0 +1,174 @@
+"""
+dedup.py
+
+This module provides near-duplicate detection for news articles, so that the
+same wire story syndicated under several sources is sent to the LLM once.
+
+Articles are fingerprinted with 64-bit SimHash over word shingles. Candidate
+pairs are found by banding the fingerprints into buckets, so that only
+articles sharing a band are compared, instead of every pair.
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+from src.services.news import Article, ArticleBatch
+from typing import Dict, Iterator, List, Sequence, Union
+
+# Number of bits of a SimHash fingerprint
+FINGERPRINT_BITS = 64
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Width of each per-bit counter packed by `simhash`, which bounds the number
+# of features per fingerprint
+_COUNT_BITS = 16
+_COUNT_MASK = (1 << _COUNT_BITS) - 1
+_MAX_FEATURES = _COUNT_MASK
+
+# Spreads the 8 bits of a byte into 8 counter fields
+_SPREAD_BYTE = [
+    sum(((byte >> j) & 1) << (j * _COUNT_BITS) for j in range(8))
+    for byte in range(256)
+]
+
+###########
+# Methods #
+###########
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """
+    Split a text into overlapping word shingles.
+
+    Args:
+        text (str): The text to split.
+        size (int): The number of words per shingle.
+
+    Returns:
+        list: The shingles of the text.
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+def simhash(features: List[str]) -> int:
+    """
+    Compute the 64-bit SimHash fingerprint of a list of features.
+
+    Args:
+        features (list): The features, e.g. the shingles of a text.
+
+    Returns:
+        int: The fingerprint. Similar feature sets give fingerprints with a
+             small Hamming distance.
+    """
+    # Per-bit counts are packed into one big integer, with a 16-bit field per
+    # fingerprint bit, so each feature costs a single addition
+    counts = 0
+    for feature in features[:_MAX_FEATURES]:
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+        for k, byte in enumerate(digest):
+            counts += _SPREAD_BYTE[byte] << (k * 8 * _COUNT_BITS)
+
+    # A bit is set when it is set in more than half of the features
+    total = min(len(features), _MAX_FEATURES)
+    fingerprint = 0
+    for i in range(FINGERPRINT_BITS):
+        if 2 * ((counts >> (i * _COUNT_BITS)) & _COUNT_MASK) > total:
+            fingerprint |= 1 << i
+    return fingerprint
+
+def _fingerprint_text(title: str, description: str, content: str) -> int:
+    text = " ".join(field for field in (title, description, content) if field)
+    return simhash(shingles(text))
+
+def article_fingerprint(article: Article) -> int:
+    """Compute the SimHash fingerprint of an article's title, description and content."""
+    return _fingerprint_text(article.title, article.description, article.content)
+
+def _fingerprints(news_articles: Sequence[Article]) -> Iterator[int]:
+    # Batches are read column by column, without building Article objects
+    if isinstance(news_articles, ArticleBatch):
+        rows = zip(news_articles.titles, news_articles.descriptions, news_articles.contents)
+    else:
+        rows = ((article.title, article.description, article.content) for article in news_articles)
+    return (_fingerprint_text(*row) for row in rows)
+
+def cluster_articles(news_articles: Sequence[Article], max_distance: int = 3, bands: int = 4) -> List[List[int]]:
+    """
+    Group near-duplicate articles into clusters.
+
+    With `bands` bands and `max_distance < bands`, any two fingerprints within
+    `max_distance` bits share at least one identical band, so no near
+    duplicate is missed.
+
+    Args:
+        news_articles (list): The articles to cluster, as a list or an `ArticleBatch`.
+        max_distance (int): The maximum Hamming distance between duplicates.
+        bands (int): The number of bands the fingerprints are split into.
+
+    Returns:
+        list: The clusters, as lists of article indexes in their original order.
+    """
+    fingerprints = list(_fingerprints(news_articles))
+    band_bits = FINGERPRINT_BITS // bands
+    band_mask = (1 << band_bits) - 1
+
+    # Union-find over the article indexes
+    parents = list(range(len(news_articles)))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    buckets: Dict[tuple, List[int]] = defaultdict(list)
+    for i, fingerprint in enumerate(fingerprints):
+        for band in range(bands):
+            key = (band, (fingerprint >> (band * band_bits)) & band_mask)
+            for j in buckets[key]:
+                if find(i) != find(j) and bin(fingerprints[i] ^ fingerprints[j]).count('1') <= max_distance:
+                    parents[find(i)] = find(j)
+            buckets[key].append(i)
+
+    clusters: Dict[int, List[int]] = defaultdict(list)
+    for i in range(len(news_articles)):
+        clusters[find(i)].append(i)
+    return sorted(clusters.values(), key=lambda cluster: cluster[0])
+
+def deduplicate_articles(
+    news_articles: Union[List[Article], ArticleBatch],
+    max_distance: int = 3,
+    bands: int = 4,
+) -> Union[List[Article], ArticleBatch]:
+    """
+    Keep one representative per cluster of near-duplicate articles.
+
+    The representative is the first article of the cluster, i.e. the most
+    relevant one in NewsAPI's order, and its `source_count` is set to the
+    number of articles in the cluster.
+
+    Args:
+        news_articles (list): The articles to deduplicate, as a list or an
+                              `ArticleBatch`.
+        max_distance (int): The maximum Hamming distance between duplicates.
+        bands (int): The number of bands the fingerprints are split into.
+
+    Returns:
+        list: The representative articles, as a batch if a batch was given.
+    """
+    clusters = cluster_articles(news_articles, max_distance, bands)
+    if isinstance(news_articles, ArticleBatch):
+        counts = news_articles.source_counts
+        representatives = news_articles.select(cluster[0] for cluster in clusters)
+        representatives.source_counts = [sum(counts[i] for i in cluster) for cluster in clusters]
+        return representatives
+
+    representatives = []
+    for cluster in clusters:
+        article = news_articles[cluster[0]]
+        source_count = sum(news_articles[i].source_count for i in cluster)
+        representatives.append(article.replace(source_count=source_count) if len(cluster) > 1 else article)
+    return representatives
@@ -1,30 +1,84 @@
 """
 email.py
 
-This module provides functionality to send an email alert using Amazon SES.
+This module provides functionality to send email alerts using Amazon SES,
+either one alert per asset or one digest per recipient for a whole run.
 """
 
-import boto3
+import threading
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
+from concurrent.futures import ThreadPoolExecutor
 from src.utils.config import CONFIG
+from src.utils.ratelimit import TokenBucket
+from typing import Dict, FrozenSet, Iterable, List, Optional
 
-# Initialize SES client
-ses_client = boto3.client('ses', region_name='us-east-1')
+# Maximum number of recipients of a single SES SendEmail call
+MAX_RECIPIENTS_PER_EMAIL = 50
+
+# SES client, created on first use and reused across warm invocations
+_ses_client = None
+_ses_client_lock = threading.Lock()
+
+###########
+# Classes #
+###########
+
+class DigestDeliveryError(RuntimeError):
+    """Raised when some calls of a digest failed, after the others were sent.
+
+    Args:
+        message (str): The description of the failures.
+        undelivered (frozenset): The assets of the digests that were not sent
+                                 to every recipient.
+    """
+
+    def __init__(self, message: str, undelivered: FrozenSet[str]):
+        super().__init__(message)
+        self.undelivered = undelivered
 
 ###########
 # Methods #
 ###########
 
-def send_email_alert(justification: str, crypto_name: str) -> dict:
-    """Sends an alert email using Amazon SES with the model's justification."""
+def get_ses_client():
+    """Returns the SES client, creating it on first use.
+
+    `boto3` is only imported here, so runs that never send an email do not pay
+    for it at cold start.
+    """
+    global _ses_client
+    with _ses_client_lock:
+        if _ses_client is None:
+            import boto3
+            _ses_client = boto3.client('ses', region_name='us-east-1', endpoint_url=CONFIG.get('SES_ENDPOINT_URL'))
+    return _ses_client
+
+def format_price_move(price_move: Optional[float]) -> Optional[str]:
+    """Describes the actual price move of an asset, e.g. "-4.20% over the last 24h"."""
+    if price_move is None:
+        return None
+    return f"{price_move:+.2%} over the last {CONFIG.get('PRICE_LOOKBACK_HOURS', 24):g}h"
+
+def send_email_alert(
+    justification: str,
+    crypto_name: str,
+    articles_analyzed: Optional[int] = None,
+    price_move: Optional[float] = None,
+) -> dict:
+    """Sends an alert email using Amazon SES with the model's justification
+    and, if known, the actual price move of the asset."""
     subject = f"Alert: Potential {crypto_name} Market Drop Detected"
     body = (
         f"Based on the latest news, the sentiment analysis suggests a possible drop in {crypto_name} market value.\n"
         "Consider reviewing the news and market trends immediately.\n\n"
         f"Justification:\n{justification}"
     )
+    if articles_analyzed is not None:
+        body += f"\n\nNews articles analyzed: {articles_analyzed}"
+    if price_move is not None:
+        body += f"\nActual price move: {format_price_move(price_move)}"
     try:
-        response = ses_client.send_email(
+        response = get_ses_client().send_email(
             Source=CONFIG.get('ALERT_EMAIL'),
             Destination={'ToAddresses': [CONFIG.get('ALERT_EMAIL')]},
             Message={
@@ -36,3 +90,126 @@ def send_email_alert(justification: str, crypto_name: str) -> dict:
     except (NoCredentialsError, PartialCredentialsError) as e:
         print(f"Email error: {e}")
         return None
+
+##########
+# Digest #
+##########
+
+# Limits the SES send rate, shared by every digest sent from this container
+_send_rate_limiter = None
+_send_rate_limiter_lock = threading.Lock()
+
+def get_send_rate_limiter() -> TokenBucket:
+    """Returns the token bucket enforcing `SES_MAX_SEND_RATE` recipients per second.
+
+    The burst is one second of sending, as allowed by SES, so that a run
+    never sends faster than the account's maximum send rate.
+    """
+    global _send_rate_limiter
+    with _send_rate_limiter_lock:
+        if _send_rate_limiter is None:
+            rate = CONFIG.get('SES_MAX_SEND_RATE', 1)
+            _send_rate_limiter = TokenBucket(rate=rate, capacity=max(1, rate))
+    return _send_rate_limiter
+
+def build_digest(alerts: List[dict]) -> tuple:
+    """Builds the subject and body of a digest email.
+
+    Args:
+        alerts (list): The alerts, each with the `asset`, its `reasoning`,
+                       the number of `articles_analyzed` and, if known, its
+                       actual `price_move`.
+
+    Returns:
+        tuple: The subject and body of the email.
+    """
+    assets = ", ".join(alert['asset'] for alert in alerts)
+    subject = f"Alert: Potential Market Drop Detected for {assets}"
+    sections = [
+        f"Based on the latest news, the sentiment analysis suggests a possible drop in the market value of "
+        f"{len(alerts)} asset(s).\nConsider reviewing the news and market trends immediately.\n"
+    ]
+    for alert in alerts:
+        price_move = format_price_move(alert.get('price_move'))
+        sections.append(
+            f"== {alert['asset']} ==\n"
+            f"News articles analyzed: {alert.get('articles_analyzed', 'unknown')}\n"
+            + (f"Actual price move: {price_move}\n" if price_move else "")
+            + f"Justification:\n{alert.get('reasoning') or 'No reasoning provided.'}\n"
+        )
+    return subject, "\n".join(sections)
+
+def send_digest(alerts: List[dict], subscriptions: Dict[str, Optional[Iterable[str]]]) -> List[dict]:
+    """Sends one digest email per recipient with all of their alerts of a run.
+
+    Recipients receiving the same digest are batched into a single SES call
+    (as Bcc recipients), calls are made concurrently, and the total send rate
+    is kept under `SES_MAX_SEND_RATE` with a token bucket. A call has at most
+    as many recipients as the bucket allows in one second. A failed call does
+    not stop the others.
+
+    Args:
+        alerts (list): The alerts, each with the `asset`, its `reasoning` and
+                       the number of `articles_analyzed`.
+        subscriptions (dict): The assets each recipient subscribed to, or None
+                              for all assets.
+
+    Returns:
+        list: The SES responses.
+
+    Raises:
+        DigestDeliveryError: If any call failed, including on missing credentials.
+    """
+    # Group the recipients by the digest they receive
+    groups: Dict[tuple, List[str]] = {}
+    for recipient, assets in subscriptions.items():
+        wanted = None if assets is None else {asset.lower() for asset in assets}
+        key = tuple(i for i, alert in enumerate(alerts) if wanted is None or alert['asset'].lower() in wanted)
+        if key:
+            groups.setdefault(key, []).append(recipient)
+
+    limiter = get_send_rate_limiter()
+    # The sender is also a recipient, in the To field, and a call should fit in the burst
+    batch_size = max(1, min(MAX_RECIPIENTS_PER_EMAIL, int(limiter.capacity)) - 1)
+    messages = []
+    for key, recipients in groups.items():
+        subject, body = build_digest([alerts[i] for i in key])
+        for start in range(0, len(recipients), batch_size):
+            messages.append((key, subject, body, recipients[start:start + batch_size]))
+    if not messages:
+        return []
+
+    def send(message: tuple) -> Optional[dict]:
+        _, subject, body, recipients = message
+        # Below 2 recipients per second, a call waits for its recipients one burst at a time
+        remaining = len(recipients) + 1
+        while remaining > 0:
+            tokens = min(remaining, limiter.capacity)
+            limiter.acquire(tokens)
+            remaining -= tokens
+        sender = CONFIG.get('SENDER_EMAIL') or CONFIG.get('ALERT_EMAIL')
+        try:
+            return get_ses_client().send_email(
+                Source=sender,
+                Destination={'ToAddresses': [sender], 'BccAddresses': recipients},
+                Message={
+                    'Subject': {'Data': subject},
+                    'Body': {'Text': {'Data': body}}
+                }
+            )
+        except Exception as e:
+            print(f"Email error: {e}")
+            return None
+
+    max_workers = max(1, min(CONFIG.get('SES_MAX_CONCURRENCY', 4), len(messages)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        responses = list(executor.map(send, messages))
+
+    failed = [message for message, response in zip(messages, responses) if response is None]
+    if failed:
+        undelivered = frozenset(alerts[i]['asset'] for key, *_ in failed for i in key)
+        raise DigestDeliveryError(
+            f"{len(failed)} of {len(messages)} digest email(s) failed, for {', '.join(sorted(undelivered))}.",
+            undelivered
+        )
+    return responses
@@ -0,0 +1,310 @@
+"""
+enrich.py
+
+This module provides full-text enrichment of news articles. NewsAPI truncates
+`content` to about 200 characters, so the pages at `Article.url` are
+downloaded concurrently, with a limit per host, and their main text is
+extracted by a streaming HTML parser that stops once enough text is found or
+too many bytes were read. Extracted texts are cached by URL, on disk by
+default, so each page is downloaded once across runs.
+"""
+
+import codecs
+import hashlib
+import itertools
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import List, Optional, Union
+from urllib.parse import urlparse
+from src.utils.config import CONFIG
+from src.utils.metrics import get_metrics
+from src.utils.resilience import DeadlineExceeded, call_timeout
+from src.services.news import Article, ArticleBatch, http_session
+from src.services.llm import ResponseCache
+
+# Size of the chunks read from a page
+CHUNK_SIZE = 16 * 1024
+
+# Bytes at the start of a page searched for a `<meta charset>`, as in HTML5
+META_CHARSET_BYTES = 1024
+_META_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE)
+
+# Per-host semaphores, created on first use
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+# Cache of extracted texts, created on first use
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+###########
+# Classes #
+###########
+
+class MainTextExtractor(HTMLParser):
+    """
+    Streaming extractor of the main text of an HTML page.
+
+    The main text is made of the paragraphs of the page, preferring those
+    inside an `<article>` element, and skipping navigation, scripts and short
+    fragments such as bylines. Feeding can stop as soon as `done` is set.
+
+    Args:
+        max_chars (int): The number of characters after which the extraction
+                         is done.
+        min_paragraph_chars (int): The minimum length of a kept paragraph.
+    """
+
+    SKIPPED_TAGS = frozenset({"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "button"})
+    PARAGRAPH_TAGS = frozenset({"p", "blockquote"})
+
+    def __init__(self, max_chars: int = 4000, min_paragraph_chars: int = 40):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.min_paragraph_chars = min_paragraph_chars
+        self._skip_depth = 0
+        self._article_depth = 0
+        self._seen_article = False
+        self._paragraph = None
+        self._paragraph_in_article = False
+        self._article_paragraphs = []
+        self._article_chars = 0
+        self._paragraphs = []
+        self._chars = 0
+
+    @property
+    def done(self) -> bool:
+        """Whether enough text was extracted to stop reading the page."""
+        if self._article_chars >= self.max_chars:
+            return True
+        return not self._seen_article and self._chars >= self.max_chars
+
+    @property
+    def text(self) -> str:
+        """The extracted text, at most `max_chars` characters long."""
+        paragraphs = self._article_paragraphs or self._paragraphs
+        return "\n\n".join(paragraphs)[:self.max_chars]
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "article":
+            self._article_depth += 1
+            self._seen_article = True
+        elif tag in self.PARAGRAPH_TAGS:
+            # A new paragraph implicitly closes an unclosed one
+            self._end_paragraph()
+            if not self._skip_depth:
+                self._paragraph = []
+                self._paragraph_in_article = self._article_depth > 0
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "article":
+            self._end_paragraph()
+            self._article_depth = max(0, self._article_depth - 1)
+        elif tag in self.PARAGRAPH_TAGS:
+            self._end_paragraph()
+
+    def handle_data(self, data: str) -> None:
+        if self._paragraph is not None and not self._skip_depth:
+            self._paragraph.append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._end_paragraph()
+
+    def _end_paragraph(self) -> None:
+        if self._paragraph is None:
+            return
+        text = " ".join("".join(self._paragraph).split())
+        self._paragraph = None
+        if len(text) < self.min_paragraph_chars:
+            return
+        self._paragraphs.append(text)
+        self._chars += len(text)
+        if self._paragraph_in_article:
+            self._article_paragraphs.append(text)
+            self._article_chars += len(text)
+
+###########
+# Methods #
+###########
+
+def get_page_cache() -> ResponseCache:
+    """Returns the cache of extracted page texts, created on first use."""
+    global _page_cache
+    if _page_cache is None:
+        with _page_cache_lock:
+            if _page_cache is None:
+                _page_cache = ResponseCache(
+                    max_entries=CONFIG.get('ENRICH_CACHE_SIZE', 512),
+                    ttl=CONFIG.get('ENRICH_CACHE_TTL', 7 * 24 * 3600),
+                    directory=CONFIG.get('ENRICH_CACHE_DIR') or None,
+                )
+    return _page_cache
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc.lower()
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(max(1, CONFIG.get('ENRICH_PER_HOST', 2)))
+            _host_semaphores[host] = semaphore
+        return semaphore
+
+def extract_main_text(chunks, max_bytes: int, max_chars: int, encoding: Optional[str] = None) -> str:
+    """
+    Extracts the main text of an HTML page from its raw chunks.
+
+    Args:
+        chunks (iterable): The raw bytes of the page, chunk by chunk.
+        max_bytes (int): The maximum number of bytes read.
+        max_chars (int): The maximum length of the extracted text.
+        encoding (str): The encoding of the page, from its headers. Defaults
+                        to the `<meta charset>` of the page, or UTF-8.
+
+    Returns:
+        str: The extracted text, empty if none was found.
+    """
+    chunks = iter(chunks)
+    head = next(chunks, b"")
+    if encoding is None:
+        encoding = sniff_meta_charset(head[:max_bytes])
+    try:
+        decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    extractor = MainTextExtractor(max_chars=max_chars)
+    read = 0
+    for chunk in itertools.chain([head], chunks):
+        chunk = chunk[:max_bytes - read]
+        read += len(chunk)
+        extractor.feed(decoder.decode(chunk))
+        if extractor.done or read >= max_bytes:
+            break
+    extractor.close()
+    return extractor.text
+
+def sniff_meta_charset(head: bytes) -> Optional[str]:
+    """Returns the charset declared by a `<meta>` tag in the first 1024 bytes of a page, if any."""
+    match = _META_CHARSET_PATTERN.search(head[:META_CHARSET_BYTES])
+    return match.group(1).decode('ascii') if match else None
+
+def header_encoding(headers) -> Optional[str]:
+    """
+    Returns the charset declared in the `Content-Type` of a response, if any.
+
+    Unlike `response.encoding`, which falls back to ISO-8859-1 for every
+    `text/*` response without a charset, undeclared charsets are left to the
+    page.
+    """
+    for param in headers.get('Content-Type', '').split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset' and value.strip(' \'"'):
+            return value.strip(' \'"')
+    return None
+
+def download_page_text(url: str) -> str:
+    """
+    Downloads a page and extracts its main text, reading at most
+    `ENRICH_MAX_BYTES` bytes.
+
+    Raises:
+        requests.RequestException: If the page could not be downloaded.
+        DeadlineExceeded: If there is no time left before the Lambda deadline.
+    """
+    timeout = call_timeout(CONFIG.get('ENRICH_TIMEOUT', 5))
+    with _host_semaphore(url):
+        with http_session.get(url, stream=True, timeout=timeout, headers={'Accept': 'text/html'}) as response:
+            response.raise_for_status()
+            if 'html' not in response.headers.get('Content-Type', 'text/html'):
+                return ""
+            return extract_main_text(
+                response.iter_content(chunk_size=CHUNK_SIZE),
+                max_bytes=CONFIG.get('ENRICH_MAX_BYTES', 512 * 1024),
+                max_chars=CONFIG.get('ENRICH_MAX_CHARS', 4000),
+                encoding=header_encoding(response.headers),
+            )
+
+def fetch_full_text(url: str, use_cache: bool = True) -> Optional[str]:
+    """
+    Returns the main text of the page at `url`, from the cache if possible.
+
+    Args:
+        url (str): The URL of the article.
+        use_cache (bool): Whether to reuse and store the extracted text.
+
+    Returns:
+        str: The extracted text, possibly empty, or None if the page could not
+             be downloaded.
+    """
+    metrics = get_metrics()
+    cache = get_page_cache() if use_cache else None
+    key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    if cache is not None:
+        text = cache.get(key)
+        if text is not None:
+            metrics.count("page_cache_hits")
+            return text
+        metrics.count("page_cache_misses")
+
+    try:
+        text = download_page_text(url)
+    except DeadlineExceeded:
+        return None
+    except Exception as e:
+        # Enrichment is best effort: the NewsAPI content is kept
+        print(f"Failed to enrich {url}: {e}")
+        return None
+
+    # Pages without a main text are cached too, so they are not downloaded again
+    if cache is not None:
+        cache.set(key, text)
+    return text
+
+def enrich_articles(
+    news_articles: Union[List[Article], ArticleBatch],
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+) -> Union[List[Article], ArticleBatch]:
+    """
+    Replaces the truncated content of articles with the full text of their pages.
+
+    The articles are not modified: enriched copies are returned, so that the
+    seen-article index keeps hashing the content returned by NewsAPI.
+
+    Args:
+        news_articles (list): The articles to enrich, as a list or an `ArticleBatch`.
+        max_workers (int): The maximum number of pages downloaded at once.
+                           Defaults to `ENRICH_MAX_CONCURRENCY`.
+        use_cache (bool): Whether to reuse and store the extracted texts.
+
+    Returns:
+        list: The articles, as a batch if a batch was given, with the content
+              replaced wherever the page text is longer.
+    """
+    urls = news_articles.urls if isinstance(news_articles, ArticleBatch) else [a.url for a in news_articles]
+    contents = news_articles.contents if isinstance(news_articles, ArticleBatch) else [a.content for a in news_articles]
+    indexes = [i for i, url in enumerate(urls) if url]
+    if not indexes:
+        return news_articles
+
+    max_workers = max_workers or CONFIG.get('ENRICH_MAX_CONCURRENCY', 8)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(indexes)))) as executor:
+        texts = list(executor.map(lambda i: fetch_full_text(urls[i], use_cache), indexes))
+
+    enriched = {i: text for i, text in zip(indexes, texts) if text and len(text) > len(contents[i] or "")}
+    get_metrics().count("articles_enriched", len(enriched))
+    if isinstance(news_articles, ArticleBatch):
+        batch = news_articles.select(range(len(news_articles)))
+        batch.contents = [enriched.get(i, content) for i, content in enumerate(contents)]
+        return batch
+    return [
+        article.replace(content=enriched[i]) if i in enriched else article
+        for i, article in enumerate(news_articles)
+    ]
@@ -6,24 +6,476 @@ to determine if a specific cryptocurrency's price is likely to drop based on the
 sentiment of the articles.
 """
 
+import copy
+import hashlib
 import json
-from openai import OpenAI
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from src.utils.config import CONFIG
+from src.utils.metrics import get_metrics
+from src.utils.resilience import ResiliencePolicy, CircuitBreaker
+from src.utils.ratelimit import current_priority, rate_limit_priority, wait_for_capacity
 from src.services.news import Article
-from typing import List
+from src.services.relevance import query_terms, score_article
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
 
-# Instantiate the OpenAI client with the provided API key from configuration
-llm_client = OpenAI(api_key=CONFIG.get('OPENAI_API_KEY'))
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Default model and system message used for every analysis
+MODEL = "gpt-4o-mini"
+SYSTEM_MESSAGE = "You are a helpful cryptocurrency and market specialist assistant."
+
+# Shared decoder used by `parse_response`
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+
+# Strict schema of structured answers. The verdict comes first, so that a
+# streamed or truncated answer can be acted on, and articles are cited by
+# number. The length of the reasoning is set by `_structured_options`.
+RESPONSE_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "price_drop_verdict",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "ValueWillDrop": {"type": "boolean"},
+                "Confidence": {"type": "number"},
+                "Citations": {"type": "array", "items": {"type": "integer"}},
+                "Reasoning": {"type": "string"},
+            },
+            "required": ["ValueWillDrop", "Confidence", "Citations", "Reasoning"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Cascade tier answered by the keyword lexicons of `relevance`, without an LLM
+HEURISTIC_TIER = "heuristic"
+
+# Highest confidence of the heuristic tier, which only reads titles and descriptions
+HEURISTIC_MAX_CONFIDENCE = 0.9
+
+# Average number of characters per token, used to estimate prompt sizes
+CHARS_PER_TOKEN = 4
+
+# OpenAI client, created on first use and reused across warm invocations
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+###########
+# Classes #
+###########
+
+class TruncatedResponseError(ValueError):
+    """Raised when a structured answer was cut off at `LLM_MAX_COMPLETION_TOKENS`.
+
+    Args:
+        message (str): The description of the error.
+        text (str): The truncated answer.
+    """
+
+    def __init__(self, message: str, text: str):
+        super().__init__(message)
+        self.text = text
+
+
+class ResponseCache:
+    """
+    Cache of LLM responses with an in-memory LRU tier and an optional on-disk
+    tier, e.g. under /tmp so that warm Lambda containers can reuse it.
+
+    Args:
+        max_entries (int): The maximum number of responses kept in memory.
+        ttl (float): The number of seconds a response stays valid.
+        directory (str): The directory of the on-disk tier, or None to disable it.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(model: str, system_message: str, prompt: str) -> str:
+        """Returns the cache key of a request."""
+        digest = hashlib.sha256()
+        for part in (model, system_message, prompt):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached response for the key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is not None and now - entry[0] < self.ttl:
+                self._store(key, entry)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def set(self, key: str, response: str) -> None:
+        """Stores a response in the cache."""
+        entry = (time.time(), response)
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self) -> None:
+        """Removes every entry from the in-memory tier and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters of the cache."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def _store(self, key: str, entry: tuple) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            return data['created_at'], data['response']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key: str, entry: tuple) -> None:
+        if not self.directory:
+            return
+        tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'created_at': entry[0], 'response': entry[1]}, file)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Cache error: {e}")
+
+class IncrementalVerdictParser:
+    """
+    Incremental parser of a streamed `{"Reasoning", "ValueWillDrop"}` answer.
+
+    Chunks are scanned once as they arrive, tracking the JSON string and
+    nesting state, so top-level values (strings, booleans and numbers such as
+    `Confidence`) are decoded as soon as they are complete. A key quoted
+    inside a string, such as `"ValueWillDrop": true` in the reasoning, is
+    never mistaken for a value.
+    """
+
+    _LITERALS = {"true": True, "false": False}
+
+    def __init__(self):
+        self._chunks = []
+        self._text = ""
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._key = None
+        self._value_start = None
+        self.values = {}
+        self.complete = False
+
+    @property
+    def text(self) -> str:
+        """The text received so far."""
+        if self._chunks:
+            self._text += "".join(self._chunks)
+            self._chunks = []
+        return self._text
+
+    @property
+    def value_will_drop(self) -> Optional[bool]:
+        """The decoded `ValueWillDrop`, or None if it was not received yet."""
+        return self.values.get("ValueWillDrop")
+
+    def feed(self, chunk: str) -> None:
+        """Scan a new chunk of the answer."""
+        if not chunk or self.complete:
+            return
+        self._chunks.append(chunk)
+        text = self.text
+        for i in range(self._position, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._end_string(text, i)
+            elif char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0 and char == "}":
+                    self._end_literal(text, i)
+                    self.complete = True
+                    break
+            elif self._depth == 1:
+                if char == ":":
+                    self._key, self._last_string = self._last_string, None
+                    self._value_start = i + 1
+                elif char == ",":
+                    self._end_literal(text, i)
+                    self._key = None
+                elif self._key is not None and self._value_start is not None:
+                    literal = text[self._value_start:i + 1].strip()
+                    if literal in self._LITERALS:
+                        self.values[self._key] = self._LITERALS[literal]
+                        self._value_start = None
+        self._position = len(text)
+
+    def _end_string(self, text: str, end: int) -> None:
+        value = json.loads(text[self._string_start:end + 1])
+        if self._key is not None and self._value_start is not None:
+            self.values[self._key] = value
+            self._value_start = None
+        else:
+            self._last_string = value
+
+    def _end_literal(self, text: str, end: int) -> None:
+        # Numbers are only known to be complete once a delimiter follows them
+        if self._key is None or self._value_start is None:
+            return
+        try:
+            self.values[self._key] = json.loads(text[self._value_start:end])
+        except ValueError:
+            pass
+        self._value_start = None
+
+def is_retryable_error(error: Exception) -> bool:
+    """Returns whether an OpenAI error is transient and may be retried."""
+    from openai import APIConnectionError, InternalServerError, RateLimitError
+    return isinstance(error, (APIConnectionError, InternalServerError, RateLimitError))
+
+# Timeouts, retries, hedging and circuit breaker for OpenAI requests
+llm_policy = ResiliencePolicy(
+    name="OpenAI",
+    timeout=CONFIG.get('LLM_TIMEOUT', 30),
+    max_attempts=CONFIG.get('RETRY_MAX_ATTEMPTS', 3),
+    base_delay=CONFIG.get('RETRY_BASE_DELAY', 0.5),
+    max_delay=CONFIG.get('RETRY_MAX_DELAY', 8),
+    hedge_percentile=CONFIG.get('LLM_HEDGE_PERCENTILE', 0),
+    is_retryable=is_retryable_error,
+    breaker=CircuitBreaker(
+        "OpenAI",
+        failure_threshold=CONFIG.get('CIRCUIT_FAILURE_THRESHOLD', 5),
+        reset_timeout=CONFIG.get('CIRCUIT_RESET_TIMEOUT', 30),
+    ),
+)
+
+# Cache shared by every analysis in this container
+response_cache = ResponseCache(
+    max_entries=CONFIG.get('LLM_CACHE_SIZE', 256),
+    ttl=CONFIG.get('LLM_CACHE_TTL', 3600),
+    directory=CONFIG.get('LLM_CACHE_DIR'),
+)
 
 ###########
 # Methods #
 ###########
 
+def get_llm_client() -> "OpenAI":
+    """
+    Return the OpenAI client, instantiating it on first use with the API key
+    from configuration.
+
+    The `openai` package is only imported here, so runs that never reach the
+    LLM do not pay for it at cold start.
+
+    Returns:
+        OpenAI: The shared OpenAI client.
+    """
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            from openai import OpenAI
+            # Retries are handled by `llm_policy`
+            _llm_client = OpenAI(
+                api_key=CONFIG.get('OPENAI_API_KEY'),
+                base_url=CONFIG.get('OPENAI_BASE_URL'),
+                max_retries=0,
+            )
+    return _llm_client
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text, using the usual average of about
+    four characters per token for English text.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Truncate a text to the given number of tokens, marking the cut with an ellipsis."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max(0, max_chars - 3)].rstrip() + "..."
+
+def format_article(article: Article, max_tokens: Optional[int] = None, index: Optional[int] = None) -> str:
+    """
+    Format an article for the prompt, keeping it within a token budget.
+
+    The content is truncated first, then the description is dropped, then the
+    title is truncated, so that the most valuable fields are kept. Articles
+    merged from several sources list their source count, so the LLM can
+    weigh them accordingly.
+
+    Args:
+        article (Article): The article to format.
+        max_tokens (int): The maximum number of tokens of the formatted article.
+        index (int): The number the article is cited by, if any.
+
+    Returns:
+        str: The formatted article.
+    """
+    title = article.title or ""
+    description = article.description
+    content = article.content
+    prefix = "- " if index is None else f"[{index}] "
+
+    def render() -> str:
+        lines = [f"{prefix}Title: {title}\n"]
+        if article.source_count > 1:
+            lines.append(f"  Sources: {article.source_count}\n")
+        if description is not None:
+            lines.append(f"  Description: {description}\n")
+        if content is not None:
+            lines.append(f"  Content: {content}\n")
+        lines.append("\n")
+        return "".join(lines)
+
+    text = render()
+    if max_tokens is None or estimate_tokens(text) <= max_tokens:
+        return text
+
+    # Truncate the content to whatever is left of the budget
+    if content is not None:
+        content = None
+        remaining = max_tokens - estimate_tokens(render()) - 3
+        if remaining > 0:
+            content = _truncate(article.content, remaining)
+            text = render()
+            if estimate_tokens(text) <= max_tokens:
+                return text
+            content = None
+
+    # Drop the description, then truncate the title
+    description = None
+    text = render()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    title = _truncate(title, max(1, max_tokens - estimate_tokens(f"{prefix}Title: \n\n")))
+    return render()
+
+def _prompt_header(crypto_name: str, verdict_first: bool = False, confidence: bool = False) -> str:
+    """
+    Return the instructions that precede the articles in the prompt.
+
+    With `verdict_first`, the model is asked for `ValueWillDrop` before the
+    reasoning, so that a streamed answer can be acted on early. With
+    `confidence`, it is also asked how sure it is of the verdict, which the
+    model cascade uses to decide whether to escalate.
+    """
+    reasoning = "\"Reasoning\": \"[explanation with quotes]\""
+    verdict = "\"ValueWillDrop\": [true/false]"
+    if confidence:
+        verdict += ", \"Confidence\": [0.0 to 1.0]"
+    pattern = "{" + (f"{verdict}, {reasoning}" if verdict_first else f"{reasoning}, {verdict}") + "}"
+    instructions = (
+        "`Confidence` is how sure you are of the verdict, from 0.0 (a guess) "
+        "to 1.0 (certain).\n\n"
+    ) if confidence else ""
+    return (
+        f"Act as a cryptocurrency specialist and analyze the following news "
+        f"articles about {crypto_name} and determine if the market sentiment "
+        "indicates a price drop.\n\n"
+        "Then, answer using the exact following JSON pattern:\n\n```json\n"
+        f"{pattern}\n```\n\n"
+        f"{instructions}"
+        "DATA:\n\"\"\"\n"
+    )
+
+def _structured_prompt_header(crypto_name: str) -> str:
+    """
+    Return the instructions that precede the numbered articles of a
+    structured prompt, whose answer format is enforced by `RESPONSE_SCHEMA`.
+    """
+    return (
+        f"Act as a cryptocurrency specialist and analyze the following numbered "
+        f"news articles about {crypto_name} and determine if the market "
+        "sentiment indicates a price drop.\n\n"
+        "Answer with the verdict, your confidence in it from 0.0 (a guess) to "
+        "1.0 (certain), the numbers of the articles that support it, and a "
+        f"reasoning of at most {CONFIG.get('LLM_REASONING_MAX_CHARS', 300)} "
+        "characters that cites articles by number instead of quoting them.\n\n"
+        "DATA:\n\"\"\"\n"
+    )
+
+PROMPT_FOOTER = "\"\"\""
+
 def generate_prompt(news_articles: List[Article], crypto_name: str) -> str:
     """
     Generate a prompt for the LLM based on the provided news articles and 
     cryptocurrency name.
 
+    Each article is kept within the `PROMPT_ARTICLE_TOKENS` budget. Use
+    `build_prompts` to also bound the size of the whole prompt.
+
     Args:
         news_articles (list): A list of dictionaries, each containing 'title',
                               'description', and 'content' of a news article.
@@ -32,86 +484,602 @@ def generate_prompt(news_articles: List[Article], crypto_name: str) -> str:
     Returns:
         str: A well-structured prompt to be used by the LLM.
     """
-    prompt = (
-        f"Act as a cryptocurrency specialist and analyze the following news "
-        f"articles about {crypto_name} and determine if the market sentiment "
-        "indicates a price drop.\n\n"
-        "Then, answer using the exact following JSON pattern:\n\n```json\n"
-        "{\"Reasoning\": \"[explanation with quotes]\", \"ValueWillDrop\": [true/false]}\n```\n\n"
-        "DATA:\n\"\"\"\n"
-    )
+    max_article_tokens = CONFIG.get('PROMPT_ARTICLE_TOKENS')
+    parts = [_prompt_header(crypto_name)]
+    parts.extend(format_article(article, max_article_tokens) for article in news_articles)
+    parts.append(PROMPT_FOOTER)
+    return "".join(parts)
 
-    for article in news_articles:
-        prompt += (
-            f"- Title: {article.title}\n"
-            f"  Description: {article.description}\n"
-            f"  Content: {article.content}\n\n"
-        )
-    prompt += "\"\"\""
-    return prompt
+def build_prompts(
+    news_articles: List[Article],
+    crypto_name: str,
+    token_budget: Optional[int] = None,
+    max_article_tokens: Optional[int] = None,
+    verdict_first: bool = False,
+    confidence: bool = False,
+    structured: bool = False,
+) -> List[Tuple[str, int]]:
+    """
+    Split the articles into prompts that each fit within a token budget.
+
+    Args:
+        news_articles (list): The articles to analyze.
+        crypto_name (str): The name of the cryptocurrency to analyze.
+        token_budget (int): The maximum number of tokens of each prompt.
+        max_article_tokens (int): The maximum number of tokens of each article.
+        verdict_first (bool): Whether to ask for `ValueWillDrop` before the reasoning.
+        confidence (bool): Whether to ask for the `Confidence` of the verdict.
+        structured (bool): Whether to build prompts for structured answers,
+                           with articles numbered from 1 across the chunks.
 
-def call_model(prompt: str, llm_client: OpenAI) -> str:
+    Returns:
+        list: `(prompt, number_of_articles)` tuples, one per chunk.
+    """
+    token_budget = token_budget or CONFIG.get('PROMPT_TOKEN_BUDGET', 6000)
+    header = _structured_prompt_header(crypto_name) if structured else _prompt_header(crypto_name, verdict_first, confidence)
+    available = token_budget - estimate_tokens(header) - estimate_tokens(PROMPT_FOOTER)
+    max_article_tokens = min(max_article_tokens or CONFIG.get('PROMPT_ARTICLE_TOKENS') or available, available)
+    if max_article_tokens <= 0:
+        raise ValueError(f"A token budget of {token_budget} is too small for the prompt instructions.")
+
+    chunks = []
+    blocks, used = [], 0
+    for position, article in enumerate(news_articles):
+        block = format_article(article, max_article_tokens, index=position + 1 if structured else None)
+        cost = estimate_tokens(block)
+        if blocks and used + cost > available:
+            chunks.append(blocks)
+            blocks, used = [], 0
+        blocks.append(block)
+        used += cost
+    if blocks:
+        chunks.append(blocks)
+
+    return [(header + "".join(chunk) + PROMPT_FOOTER, len(chunk)) for chunk in chunks]
+
+def wait_for_model_capacity(prompt: str) -> None:
+    """Waits until the shared OpenAI request and token budgets allow sending a prompt."""
+    wait_for_capacity("llm_requests")
+    wait_for_capacity("llm_tokens", estimate_tokens(SYSTEM_MESSAGE) + estimate_tokens(prompt))
+
+def _structured_options() -> dict:
+    """
+    Returns the request options that enforce `RESPONSE_SCHEMA`, with the
+    reasoning limited to `LLM_REASONING_MAX_CHARS`, and bound the answer's
+    length.
+    """
+    response_format = copy.deepcopy(RESPONSE_SCHEMA)
+    reasoning = response_format["json_schema"]["schema"]["properties"]["Reasoning"]
+    reasoning["maxLength"] = CONFIG.get('LLM_REASONING_MAX_CHARS', 300)
+    return {"response_format": response_format, "max_tokens": CONFIG.get('LLM_MAX_COMPLETION_TOKENS', 300)}
+
+def _partial_verdict(parser: "IncrementalVerdictParser") -> Optional[dict]:
+    """Returns the verdict of an incomplete answer, or None if its `ValueWillDrop` was not received."""
+    if parser.value_will_drop is None:
+        return None
+    verdict = {
+        "Reasoning": parser.values.get("Reasoning", "No reasoning provided."),
+        "ValueWillDrop": parser.value_will_drop,
+    }
+    for key in ("Confidence", "Citations"):
+        if key in parser.values:
+            verdict[key] = parser.values[key]
+    return verdict
+
+def call_model(
+    prompt: str,
+    llm_client: Optional["OpenAI"] = None,
+    model: Optional[str] = None,
+    structured: bool = False,
+) -> str:
     """
     Call the LLM (OpenAI) with the given prompt to analyze its content.
 
     Args:
         prompt (str): The prompt to send to the LLM.
-        llm_client (OpenAI): The instantiated OpenAI client.
+        llm_client (OpenAI): The instantiated OpenAI client. Defaults to the
+                             shared client from `get_llm_client`.
+        model (str): The model to call. Defaults to `LLM_MODEL`.
+        structured (bool): Whether to request a structured answer that follows
+                           `RESPONSE_SCHEMA`.
 
     Returns:
         str: The raw string response from the LLM.
+
+    Raises:
+        ValueError: If the model refused to give a structured answer.
+        TruncatedResponseError: If the structured answer was cut off.
     """
-    completion = llm_client.chat.completions.create(
-        model="gpt-4o-mini",
-        store=True,
-        messages=[
-            {
-                "role": "system", 
-                "content": "You are a helpful cryptocurrency and market specialist assistant."
-            },
-            {
-                "role": "user", 
-                "content": prompt
-            }
-        ]
-    )
-    return completion.choices[0].message.content
+    llm_client = llm_client or get_llm_client()
+    model = model or CONFIG.get('LLM_MODEL') or MODEL
+    wait_for_model_capacity(prompt)
+    options = _structured_options() if structured else {}
+    metrics = get_metrics()
+    with metrics.span("model"):
+        completion = llm_policy.call(lambda timeout: llm_client.chat.completions.create(
+            model=model,
+            store=True,
+            timeout=timeout,
+            **options,
+            messages=[
+                {
+                    "role": "system", 
+                    "content": SYSTEM_MESSAGE
+                },
+                {
+                    "role": "user", 
+                    "content": prompt
+                }
+            ]
+        ))
+    metrics.count("llm_calls")
+    metrics.record_usage(getattr(completion, "usage", None))
+    message = completion.choices[0].message
+    refusal = getattr(message, "refusal", None)
+    if structured and isinstance(refusal, str):
+        raise ValueError(f"The model refused to answer: {refusal}")
+    if structured and getattr(completion.choices[0], "finish_reason", None) == "length":
+        raise TruncatedResponseError("The answer was cut off at the completion token limit.", message.content or "")
+    return message.content
+
+def call_model_stream(
+    prompt: str,
+    llm_client: Optional["OpenAI"] = None,
+    stop_on_verdict: str = "none",
+    model: Optional[str] = None,
+    wait_for: Tuple[str, ...] = (),
+    structured: bool = False,
+) -> IncrementalVerdictParser:
+    """
+    Call the LLM with the given prompt, parsing the answer as it is streamed.
+
+    Args:
+        prompt (str): The prompt to send to the LLM.
+        llm_client (OpenAI): The instantiated OpenAI client. Defaults to the
+                             shared client from `get_llm_client`.
+        stop_on_verdict (str): When to stop reading once `ValueWillDrop` is
+                               decoded: "none" (never), "negative" (only when
+                               no drop is predicted) or "any".
+        model (str): The model to call. Defaults to `LLM_MODEL`.
+        wait_for (tuple): Other keys that must be decoded before stopping,
+                          e.g. `Confidence`.
+        structured (bool): Whether to request a structured answer that follows
+                           `RESPONSE_SCHEMA`.
+
+    Returns:
+        IncrementalVerdictParser: The parser, holding the text and the values
+                                  received before the stream ended or stopped.
+    """
+    llm_client = llm_client or get_llm_client()
+    model = model or CONFIG.get('LLM_MODEL') or MODEL
+    wait_for_model_capacity(prompt)
+    metrics = get_metrics()
+    options = _structured_options() if structured else {}
+    parser = IncrementalVerdictParser()
+    with metrics.span("model"):
+        stream = llm_policy.call(lambda timeout: llm_client.chat.completions.create(
+            model=model,
+            store=True,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=timeout,
+            **options,
+            messages=[
+                {"role": "system", "content": SYSTEM_MESSAGE},
+                {"role": "user", "content": prompt}
+            ]
+        ), hedge=False)
+        try:
+            for chunk in stream:
+                # The usage is sent in a last chunk without choices, which is
+                # not received when the stream is stopped early
+                metrics.record_usage(getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                parser.feed(chunk.choices[0].delta.content)
+                verdict = parser.value_will_drop
+                if verdict is None or any(key not in parser.values for key in wait_for):
+                    continue
+                if stop_on_verdict == "any" or (stop_on_verdict == "negative" and not verdict):
+                    break
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+    metrics.count("llm_calls")
+    return parser
 
 def parse_response(response: str) -> dict:
     """
     Parse the response from the LLM into a JSON object.
 
+    The response must hold a single JSON object, optionally wrapped in a
+    Markdown code fence such as ```json ... ```.
+
     Args:
         response (str): The raw response string from the LLM.
 
     Returns:
         dict: A dictionary containing the parsed JSON data.
+
+    Raises:
+        ValueError: If the response is not a single JSON object.
     """
-    # Strip any JSON formatting artifacts like ```json and ```
-    cleaned_response = response.strip("```json\n").strip("```")
+    start = _WHITESPACE.match(response).end()
+    fenced = response.startswith("```", start)
+    if fenced:
+        # Skip the opening fence line, e.g. ```json
+        start = response.find("\n", start) + 1
+        if start == 0:
+            raise ValueError("Unterminated code fence in the response.")
+
+    json_object, end = _decoder.raw_decode(response, _WHITESPACE.match(response, start).end())
+    if not isinstance(json_object, dict):
+        raise ValueError("The response is not a JSON object.")
 
-    # Convert to a Python dictionary
-    json_object = json.loads(cleaned_response)
+    # Only whitespace and the closing fence may follow the object
+    rest = response[end:].strip()
+    if rest and not (fenced and rest == "```"):
+        raise ValueError(f"Unexpected text after the JSON object: {rest[:50]}")
     return json_object
 
-def analyze_news_with_llm(news_articles: List[Article], crypto_name: str) -> dict:
+def parse_structured_response(response: str) -> dict:
+    """
+    Parse a structured answer and check it against `RESPONSE_SCHEMA`.
+
+    Structured answers are a bare JSON object, so they are decoded in one
+    pass without looking for code fences. The reasoning is cut to
+    `LLM_REASONING_MAX_CHARS` and the confidence clamped to [0, 1].
+
+    Args:
+        response (str): The raw structured answer from the LLM.
+
+    Returns:
+        dict: The `{"ValueWillDrop", "Confidence", "Citations", "Reasoning"}` verdict.
+
+    Raises:
+        ValueError: If the answer does not follow the schema.
+    """
+    answer = json.loads(response)
+    if not isinstance(answer, dict):
+        raise ValueError("The response is not a JSON object.")
+
+    value_will_drop = answer.get("ValueWillDrop")
+    confidence = answer.get("Confidence")
+    citations = answer.get("Citations")
+    reasoning = answer.get("Reasoning")
+    if not isinstance(value_will_drop, bool):
+        raise ValueError("`ValueWillDrop` must be a boolean.")
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)):
+        raise ValueError("`Confidence` must be a number.")
+    if not isinstance(citations, list) or any(isinstance(c, bool) or not isinstance(c, int) for c in citations):
+        raise ValueError("`Citations` must be a list of article numbers.")
+    if not isinstance(reasoning, str):
+        raise ValueError("`Reasoning` must be a string.")
+
+    return {
+        "ValueWillDrop": value_will_drop,
+        "Confidence": min(1.0, max(0.0, float(confidence))),
+        "Citations": sorted(set(citations)),
+        "Reasoning": reasoning[:CONFIG.get('LLM_REASONING_MAX_CHARS', 300)],
+    }
+
+def verdict_confidence(verdict: dict) -> float:
+    """
+    Returns the `Confidence` of a verdict, clamped to [0, 1].
+
+    Verdicts without a numeric confidence, e.g. from a model that ignored the
+    instruction, are taken as certain, so they are only escalated on a drop.
+    """
+    confidence = verdict.get("Confidence")
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float, str)):
+        return 1.0
+    try:
+        return min(1.0, max(0.0, float(confidence)))
+    except ValueError:
+        return 1.0
+
+def combine_verdicts(verdicts: List[dict], weights: Optional[List[int]] = None, threshold: float = 0.5) -> dict:
+    """
+    Combine the verdicts of several chunk prompts into a single verdict.
+
+    Args:
+        verdicts (list): The parsed `{"Reasoning", "ValueWillDrop"}` verdicts.
+        weights (list): The weight of each verdict, e.g. its number of articles.
+        threshold (float): The weighted share of drop verdicts needed for a drop.
+
+    Returns:
+        dict: The combined `{"Reasoning", "ValueWillDrop"}` verdict, with the
+              weighted mean `Confidence` and every cited article if the
+              verdicts have them.
+    """
+    if len(verdicts) == 1:
+        return verdicts[0]
+    weights = weights or [1] * len(verdicts)
+
+    drop_weight = sum(weight for verdict, weight in zip(verdicts, weights) if verdict.get("ValueWillDrop", False))
+    value_will_drop = drop_weight / sum(weights) >= threshold
+
+    # Lead with the reasoning that agrees with the combined verdict
+    reasonings = [
+        verdict.get("Reasoning", "")
+        for verdict in sorted(verdicts, key=lambda v: bool(v.get("ValueWillDrop", False)) != value_will_drop)
+    ]
+    combined = {
+        "Reasoning": "\n\n".join(reasoning for reasoning in reasonings if reasoning),
+        "ValueWillDrop": value_will_drop,
+    }
+    if any("Confidence" in verdict for verdict in verdicts):
+        confidences = [verdict_confidence(verdict) * weight for verdict, weight in zip(verdicts, weights)]
+        combined["Confidence"] = sum(confidences) / sum(weights)
+    if any("Citations" in verdict for verdict in verdicts):
+        combined["Citations"] = sorted({c for verdict in verdicts for c in verdict.get("Citations", [])})
+    return combined
+
+def analyze_prompt(
+    prompt: str,
+    use_cache: bool = True,
+    stream: bool = False,
+    model: Optional[str] = None,
+    confidence: bool = False,
+    structured: bool = False,
+) -> dict:
+    """
+    Send a single prompt to the LLM, reusing a cached response if available.
+
+    Args:
+        prompt (str): The prompt to send.
+        use_cache (bool): Whether to reuse a cached response for the same prompt.
+        stream (bool): Whether to stream the answer, stopping early according
+                       to `LLM_STREAM_EARLY_EXIT`.
+        model (str): The model to call. Defaults to `LLM_MODEL`.
+        confidence (bool): Whether the prompt asks for a `Confidence`, which a
+                           streamed answer then waits for before stopping.
+        structured (bool): Whether to request a structured answer, parsed with
+                           `parse_structured_response`.
+
+    Returns:
+        dict: The parsed `{"Reasoning", "ValueWillDrop"}` verdict.
+    """
+    model = model or CONFIG.get('LLM_MODEL') or MODEL
+    cache_key = ResponseCache.make_key(model, SYSTEM_MESSAGE, prompt)
+    response = response_cache.get(cache_key) if use_cache else None
+    cached = response is not None
+    if use_cache:
+        get_metrics().count("llm_cache_hits" if cached else "llm_cache_misses")
+    if not cached and stream:
+        parser = call_model_stream(
+            prompt,
+            stop_on_verdict=CONFIG.get('LLM_STREAM_EARLY_EXIT', 'negative'),
+            model=model,
+            wait_for=("Confidence",) if confidence else (),
+            structured=structured,
+        )
+        if not parser.complete and parser.value_will_drop is not None:
+            # Stopped early: the partial answer is not cached
+            return _partial_verdict(parser)
+        response = parser.text
+    elif not cached:
+        try:
+            response = call_model(prompt, model=model, structured=structured)
+        except TruncatedResponseError as e:
+            # The verdict comes first, so it is usually complete: fall back to
+            # it, without caching the truncated answer
+            get_metrics().count("llm_truncated")
+            parser = IncrementalVerdictParser()
+            parser.feed(e.text)
+            verdict = _partial_verdict(parser)
+            if verdict is None:
+                raise ValueError("The response from the LLM was cut off before its verdict:\n\n" + e.text)
+            return verdict
+    try:
+        with get_metrics().span("parse"):
+            parsed_response = parse_structured_response(response) if structured else parse_response(response)
+    except ValueError:
+        raise ValueError("Failed to parse the response from the LLM. Response is invalid:\n\n" + response)
+
+    # Only cache responses that could be parsed
+    if use_cache and not cached:
+        response_cache.set(cache_key, response)
+    return parsed_response
+
+def analyze_with_model(
+    news_articles: List[Article],
+    crypto_name: str,
+    use_cache: bool = True,
+    model: Optional[str] = None,
+    confidence: bool = False,
+) -> dict:
+    """
+    Analyze the articles with a single model.
+
+    Article sets that do not fit in `PROMPT_TOKEN_BUDGET` are split into
+    chunk prompts that are analyzed in parallel, and their verdicts are
+    combined with `combine_verdicts`. With `LLM_STREAM`, answers are
+    streamed and the verdict is requested first. With
+    `LLM_STRUCTURED_OUTPUT`, answers follow `RESPONSE_SCHEMA` and cite the
+    articles by their position in `news_articles`, from 1.
+
+    Args:
+        news_articles (list): The articles to analyze.
+        crypto_name (str): The name of the cryptocurrency to analyze.
+        use_cache (bool): Whether to reuse a cached response for the same prompt.
+        model (str): The model to call. Defaults to `LLM_MODEL`.
+        confidence (bool): Whether to ask for the `Confidence` of the verdict.
+
+    Returns:
+        dict: The `{"Reasoning", "ValueWillDrop"}` verdict.
+    """
+    stream = CONFIG.get('LLM_STREAM', False)
+    structured = CONFIG.get('LLM_STRUCTURED_OUTPUT', False)
+    with get_metrics().span("prompt"):
+        prompts = build_prompts(
+            news_articles, crypto_name, verdict_first=stream, confidence=confidence, structured=structured
+        )
+
+    def analyze(prompt: str) -> dict:
+        return analyze_prompt(prompt, use_cache, stream, model=model, confidence=confidence, structured=structured)
+
+    if len(prompts) == 1:
+        verdict = analyze(prompts[0][0])
+    else:
+        verdict = _analyze_chunks(prompts, analyze)
+    if "Citations" in verdict:
+        # Drop citations of articles that do not exist
+        verdict["Citations"] = [c for c in verdict["Citations"] if 1 <= c <= len(news_articles)]
+    return verdict
+
+def _analyze_chunks(prompts: List[Tuple[str, int]], analyze: Callable[[str], dict]) -> dict:
+    """Analyzes chunk prompts in parallel and combines their verdicts."""
+    # Chunk threads keep the rate-limit priority of the asset
+    priority = current_priority()
+
+    def analyze_chunk(chunk: Tuple[str, int]) -> dict:
+        with rate_limit_priority(priority):
+            return analyze(chunk[0])
+
+    max_workers = max(1, min(CONFIG.get('LLM_MAX_CONCURRENCY', 4), len(prompts)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        verdicts = list(executor.map(analyze_chunk, prompts))
+    return combine_verdicts(verdicts, weights=[count for _, count in prompts])
+
+def heuristic_verdict(news_articles: List[Article], crypto_name: str) -> dict:
+    """
+    Answer from the polarity of the articles, without calling an LLM.
+
+    The verdict is a drop when at least half of the articles, weighted by
+    their number of sources, lean negative. The confidence grows with the
+    distance of that share from one half, up to `HEURISTIC_MAX_CONFIDENCE`,
+    so that days without any negative article are answered here.
+
+    Args:
+        news_articles (list): The articles to analyze.
+        crypto_name (str): The name of the cryptocurrency to analyze.
+
+    Returns:
+        dict: The `{"Reasoning", "ValueWillDrop", "Confidence"}` verdict.
+    """
+    terms = query_terms(crypto_name)
+    total = negative = 0
+    for article in news_articles:
+        weight = max(1, article.source_count)
+        total += weight
+        if score_article(article, terms).polarity < 0:
+            negative += weight
+    share = negative / total if total else 0.0
+    return {
+        "Reasoning": f"{negative} of {total} weighted articles about {crypto_name} lean negative.",
+        "ValueWillDrop": share >= 0.5,
+        "Confidence": HEURISTIC_MAX_CONFIDENCE * abs(2 * share - 1),
+    }
+
+def analyze_with_cascade(
+    news_articles: List[Article],
+    crypto_name: str,
+    tiers: List[str],
+    use_cache: bool = True,
+) -> dict:
+    """
+    Analyze the articles with a cascade of tiers, from cheapest to strongest.
+
+    Each tier is either `HEURISTIC_TIER` or a model name. A tier's verdict is
+    escalated to the next tier when its confidence is below
+    `LLM_CASCADE_MIN_CONFIDENCE`, when it predicts a drop and
+    `LLM_CASCADE_ESCALATE_DROPS` is set, or when the tier failed. The last
+    tier always answers.
+
+    Args:
+        news_articles (list): The articles to analyze.
+        crypto_name (str): The name of the cryptocurrency to analyze.
+        tiers (list): The tiers of the cascade, in order.
+        use_cache (bool): Whether to reuse a cached response for the same prompt.
+
+    Returns:
+        dict: The verdict of the answering tier, with its name as `Tier`, and
+              the verdict, confidence, escalation and duration of every tier
+              that ran as `Tiers`, so that tiers can be evaluated.
+    """
+    min_confidence = CONFIG.get('LLM_CASCADE_MIN_CONFIDENCE', 0.75)
+    escalate_drops = CONFIG.get('LLM_CASCADE_ESCALATE_DROPS', True)
+    metrics = get_metrics()
+    records = []
+    for position, tier in enumerate(tiers):
+        last = position == len(tiers) - 1
+        start = time.perf_counter()
+        record = {"Tier": tier}
+        try:
+            if tier == HEURISTIC_TIER:
+                verdict = heuristic_verdict(news_articles, crypto_name)
+            else:
+                verdict = analyze_with_model(news_articles, crypto_name, use_cache, model=tier, confidence=True)
+        except Exception as e:
+            if last:
+                raise
+            print(f"Cascade tier {tier} failed, escalating: {e}")
+            record.update(Error=str(e), Escalated=True)
+        else:
+            confidence = verdict_confidence(verdict)
+            value_will_drop = bool(verdict.get("ValueWillDrop", False))
+            escalated = not last and (confidence < min_confidence or (escalate_drops and value_will_drop))
+            record.update(ValueWillDrop=value_will_drop, Confidence=round(confidence, 3), Escalated=escalated)
+        record["ElapsedMs"] = round((time.perf_counter() - start) * 1000, 3)
+        records.append(record)
+        if not record["Escalated"]:
+            break
+        metrics.count("cascade_escalations")
+
+    metrics.count(f"cascade_answers_{tier}")
+    return {**verdict, "Tier": tier, "Tiers": records}
+
+def analyze_news_with_llm(news_articles: List[Article], crypto_name: str, use_cache: bool = True) -> dict:
     """
     Analyze the provided list of news articles using the LLM to determine if 
     the market sentiment indicates a price drop.
 
+    With `LLM_CASCADE`, the articles go through `analyze_with_cascade`, so
+    that clear cases are answered by a cheap tier; otherwise they are
+    analyzed by `LLM_MODEL` with `analyze_with_model`.
+
+    With `SIMILARITY_CACHE`, a recent verdict of a nearly identical article
+    set is returned instead, with its `Similarity` and `AgeSeconds`.
+
     Args:
         news_articles (list): A list of dictionaries, each containing 'title', 
                               'description', and 'content'.
         crypto_name (str): The name of the cryptocurrency to analyze.
+        use_cache (bool): Whether to reuse a cached response for the same prompt.
 
     Returns:
         dict: A dictionary containing the LLM's reasoning and whether the value 
               will drop (True/False).
     """
-    prompt = generate_prompt(news_articles, crypto_name)
-    response = call_model(prompt, llm_client)
-    try:
-        parsed_response = parse_response(response)
-    except json.JSONDecodeError:
-        raise ValueError("Failed to parse the response from the LLM. Response is invalid:\n\n" + response)
-    return parsed_response
+    index = vector = None
+    if use_cache and CONFIG.get('SIMILARITY_CACHE'):
+        # Imported here, so that NumPy is only loaded when the index is used
+        from src.services.similarity import get_similarity_index
+
+        metrics = get_metrics()
+        index = get_similarity_index()
+        vector = index.embed(news_articles)
+        match = index.search(
+            crypto_name,
+            vector,
+            threshold=CONFIG.get('SIMILARITY_THRESHOLD', 0.9),
+            max_age=CONFIG.get('SIMILARITY_MAX_AGE', 6 * 3600),
+        )
+        if match is not None:
+            metrics.count("similarity_hits")
+            # Citations number the articles of the stored set, not of this one
+            verdict = {key: value for key, value in match.verdict.items() if key != "Citations"}
+            return {**verdict, "Similarity": round(match.similarity, 4), "AgeSeconds": round(match.age)}
+        metrics.count("similarity_misses")
+
+    tiers = CONFIG.get('LLM_CASCADE') or []
+    if tiers:
+        verdict = analyze_with_cascade(news_articles, crypto_name, tiers, use_cache)
+    else:
+        verdict = analyze_with_model(news_articles, crypto_name, use_cache)
+
+    if index is not None:
+        index.add(crypto_name, vector, verdict)
+    return verdict
@@ -5,59 +5,364 @@ news.py
 This module provides functionality to fetch news articles using the News API.
 """
 
+import sys
 import requests
+from requests.adapters import HTTPAdapter
 from src.utils.config import CONFIG
+from src.utils.resilience import ResiliencePolicy, CircuitBreaker
+from src.utils.ratelimit import wait_for_capacity
 from datetime import datetime, timedelta
-from dataclasses import dataclass
-from typing import List
+from typing import Iterable, Iterator, List
 from typing import Optional
 
+# NewsAPI never returns more than 100 articles per page
+MAX_PAGE_SIZE = 100
+
+# Marks a field that has not been decoded yet
+_UNDECODED = object()
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Interns a string that repeats across articles, e.g. a source name."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parses a NewsAPI ISO 8601 timestamp, e.g. 2025-01-10T12:00:00Z."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
 ###########
 # Classes #
 ###########
 
-@dataclass
 class Article:
-    """Data class to represent an article."""
-    title: str
-    description: str
-    content: str
-    publishedAt: str
-    url: Optional[str] = None
-    source: Optional[dict] = None
-    author: Optional[str] = None
-    urlToImage: Optional[str] = None
+    """
+    A news article.
+
+    Articles are kept in `__slots__` rather than a per-instance `__dict__`, the
+    NewsAPI `source` dict is stored as its interned id and name, and the
+    publication date is only decoded into a datetime when `published_at` is
+    read. Use `from_api` to build an article from a NewsAPI payload, which
+    ignores the fields this class does not know.
+    """
+
+    __slots__ = (
+        "title",
+        "description",
+        "content",
+        "publishedAt",
+        "url",
+        "source_id",
+        "source_name",
+        "author",
+        "urlToImage",
+        "source_count",  # Number of near-duplicate copies merged into this article
+        "_published_at",
+    )
+
+    # Constructor arguments, in order
+    FIELDS = (
+        "title",
+        "description",
+        "content",
+        "publishedAt",
+        "url",
+        "source",
+        "author",
+        "urlToImage",
+        "source_count",
+    )
+
+    def __init__(
+        self,
+        title: str,
+        description: str,
+        content: str,
+        publishedAt: str,
+        url: Optional[str] = None,
+        source: Optional[dict] = None,
+        author: Optional[str] = None,
+        urlToImage: Optional[str] = None,
+        source_count: int = 1,
+    ):
+        self.title = title
+        self.description = description
+        self.content = content
+        self.publishedAt = _intern(publishedAt)
+        self.url = url
+        self.source_id = _intern(source.get("id")) if source else None
+        self.source_name = _intern(source.get("name")) if source else None
+        self.author = _intern(author)
+        self.urlToImage = urlToImage
+        self.source_count = source_count
+        self._published_at = _UNDECODED
+
+    @classmethod
+    def from_api(cls, payload: dict) -> "Article":
+        """Builds an article from a NewsAPI payload, ignoring unknown fields."""
+        return cls(
+            title=payload.get("title"),
+            description=payload.get("description"),
+            content=payload.get("content"),
+            publishedAt=payload.get("publishedAt"),
+            url=payload.get("url"),
+            source=payload.get("source"),
+            author=payload.get("author"),
+            urlToImage=payload.get("urlToImage"),
+        )
+
+    @property
+    def source(self) -> Optional[dict]:
+        """The NewsAPI `source` dict, rebuilt from the interned id and name."""
+        if self.source_id is None and self.source_name is None:
+            return None
+        return {"id": self.source_id, "name": self.source_name}
+
+    @property
+    def published_at(self) -> Optional[datetime]:
+        """The publication date, decoded from `publishedAt` on first access."""
+        if self._published_at is _UNDECODED:
+            self._published_at = _parse_timestamp(self.publishedAt)
+        return self._published_at
+
+    def update_content(self) -> bool:
+        """
+        Replaces the truncated NewsAPI content with the full text of the page
+        at `url`, see `src.services.enrich`.
+
+        Returns:
+            bool: Whether the content was replaced.
+        """
+        from src.services.enrich import fetch_full_text
+
+        text = fetch_full_text(self.url) if self.url else None
+        if not text or len(text) <= len(self.content or ""):
+            return False
+        self.content = text
+        return True
+
+    def replace(self, **changes) -> "Article":
+        """Returns a copy of the article with the given fields replaced."""
+        values = {field: getattr(self, field) for field in self.FIELDS}
+        values.update(changes)
+        return Article(**values)
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.FIELDS)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.FIELDS)
+        return f"Article({values})"
+
+
+class ArticleBatch:
+    """
+    Columnar container of articles for the bulk paths (filtering, dedup,
+    backfill).
+
+    Each field is stored as one list, so a batch holds no per-article object.
+    Indexing or iterating a batch materializes `Article` objects on the fly,
+    so a batch can be passed wherever a list of articles is read.
+    """
+
+    __slots__ = (
+        "titles",
+        "descriptions",
+        "contents",
+        "published",
+        "urls",
+        "source_ids",
+        "source_names",
+        "authors",
+        "image_urls",
+        "source_counts",
+    )
+
+    def __init__(self):
+        for column in self.__slots__:
+            setattr(self, column, [])
+
+    @classmethod
+    def from_articles(cls, articles: Iterable[Article]) -> "ArticleBatch":
+        """Builds a batch from articles, which may be streamed one at a time."""
+        batch = cls()
+        for article in articles:
+            batch.append(article)
+        return batch
+
+    def append(self, article: Article) -> None:
+        """Adds an article at the end of the batch."""
+        self.titles.append(article.title)
+        self.descriptions.append(article.description)
+        self.contents.append(article.content)
+        self.published.append(article.publishedAt)
+        self.urls.append(article.url)
+        self.source_ids.append(article.source_id)
+        self.source_names.append(article.source_name)
+        self.authors.append(article.author)
+        self.image_urls.append(article.urlToImage)
+        self.source_counts.append(article.source_count)
+
+    def select(self, indexes: Iterable[int]) -> "ArticleBatch":
+        """Returns a new batch with the articles at the given indexes, in that order."""
+        indexes = list(indexes)
+        batch = ArticleBatch()
+        for column in self.__slots__:
+            values = getattr(self, column)
+            setattr(batch, column, [values[i] for i in indexes])
+        return batch
+
+    def to_articles(self) -> List[Article]:
+        return list(self)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def __getitem__(self, index: int) -> Article:
+        article = Article(
+            title=self.titles[index],
+            description=self.descriptions[index],
+            content=self.contents[index],
+            publishedAt=self.published[index],
+            url=self.urls[index],
+            author=self.authors[index],
+            urlToImage=self.image_urls[index],
+            source_count=self.source_counts[index],
+        )
+        article.source_id = self.source_ids[index]
+        article.source_name = self.source_names[index]
+        return article
+
+    def __iter__(self) -> Iterator[Article]:
+        for index in range(len(self)):
+            yield self[index]
+
+###########
+# Session #
+###########
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    """Creates an HTTP session with keep-alive connection pooling and gzip.
+
+    Args:
+        pool_size (int): The maximum number of pooled connections per host.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+    })
+    return session
+
+# Module-level session, reused across warm Lambda invocations
+http_session = create_session()
+
+def is_retryable_error(error: Exception) -> bool:
+    """Returns whether a NewsAPI request error is transient and may be retried."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+# Timeouts, retries, hedging and circuit breaker for NewsAPI requests
+news_api_policy = ResiliencePolicy(
+    name="NewsAPI",
+    timeout=CONFIG.get('NEWS_API_TIMEOUT', 10),
+    max_attempts=CONFIG.get('RETRY_MAX_ATTEMPTS', 3),
+    base_delay=CONFIG.get('RETRY_BASE_DELAY', 0.5),
+    max_delay=CONFIG.get('RETRY_MAX_DELAY', 8),
+    hedge_percentile=CONFIG.get('NEWS_API_HEDGE_PERCENTILE', 95),
+    is_retryable=is_retryable_error,
+    breaker=CircuitBreaker(
+        "NewsAPI",
+        failure_threshold=CONFIG.get('CIRCUIT_FAILURE_THRESHOLD', 5),
+        reset_timeout=CONFIG.get('CIRCUIT_RESET_TIMEOUT', 30),
+    ),
+)
 
 ###########
 # Methods #
 ###########
 
-def fetch_articles(query: str, date: datetime = None, top_k: int = 10) -> List[Article]:
-    """Fetches articles about the provided query.
-    
+def iter_articles(query: str, date: datetime = None, top_k: int = 10, page_size: int = MAX_PAGE_SIZE) -> Iterator[Article]:
+    """Streams articles about the provided query, page by page.
+
+    Pages are requested lazily and no further pages are requested once
+    `top_k` articles have been yielded.
+
     Args:
         query (str): The query to search for.
         date (datetime): The date to filter the articles.
-        top_k (int): The maximum number of articles articles to return.
+        top_k (int): The maximum number of articles to yield.
+        page_size (int): The maximum number of articles requested per page.
     """
     params = {
         'q': query,
         'apiKey': CONFIG.get('NEWS_API_KEY'),
         'language': 'en',
         'sortBy': 'relevance',
+        'pageSize': max(1, min(page_size, top_k, MAX_PAGE_SIZE)),
     }
-    
+
     # Add date filter if provided
     if date:
         params['from'] = (date - timedelta(days=1)).strftime('%Y-%m-%d')  # Get articles from the previous day
         params['to'] = date.strftime('%Y-%m-%d')  # Get articles until the provided date
+
+    def get_page(page: int, timeout: float) -> dict:
+        response = http_session.get(url=CONFIG.get('NEWS_API_URL'), params={**params, 'page': page}, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    yielded = 0
+    page = 1
+    while yielded < top_k:
+        # Make the request to the News API, once the shared quota allows it
+        wait_for_capacity("news_requests")
+        data = news_api_policy.call(lambda timeout: get_page(page, timeout))
+
+        # Parse the response
+        articles = data.get('articles', [])
+        for article in articles[:top_k - yielded]:
+            yield Article.from_api(article)
+            yielded += 1
+
+        # Stop on the last page
+        total_results = data.get('totalResults') or 0
+        if len(articles) < params['pageSize'] or page * params['pageSize'] >= total_results:
+            break
+        page += 1
+
+def fetch_articles(query: str, date: datetime = None, top_k: int = 10) -> List[Article]:
+    """Fetches articles about the provided query.
     
-    # Make the request to the News API
-    response = requests.get(url=CONFIG.get('NEWS_API_URL'), params=params)
-    response.raise_for_status()
-    
-    # Parse the response
-    articles = response.json().get('articles', [])[:top_k]
-    articles = [Article(**article) for article in articles]
-    
-    return articles
+    Args:
+        query (str): The query to search for.
+        date (datetime): The date to filter the articles.
+        top_k (int): The maximum number of articles articles to return.
+    """
+    return list(iter_articles(query=query, date=date, top_k=top_k))
+
+def fetch_article_batch(query: str, date: datetime = None, top_k: int = 10) -> ArticleBatch:
+    """Fetches articles about the provided query into a columnar `ArticleBatch`.
+
+    Args:
+        query (str): The query to search for.
+        date (datetime): The date to filter the articles.
+        top_k (int): The maximum number of articles to return.
+    """
+    return ArticleBatch.from_articles(iter_articles(query=query, date=date, top_k=top_k))
@@ -0,0 +1,419 @@
+"""
+prices.py
+
+This module provides a local price-history store used to score predictions
+against the actual moves of each asset. OHLC series are stored per asset as
+NumPy arrays and memory-mapped when read. They are loaded from CSV files or
+from a pluggable `PriceFeed`. Forward returns are computed for every
+prediction and horizon at once, and joined against stored `ValueWillDrop`
+verdicts to measure their hit rate and precision.
+
+NumPy is only imported with this module, which the Lambda handler loads when
+it needs a price.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.utils.config import CONFIG
+
+# Columns of a stored series
+TIMESTAMP, OPEN, HIGH, LOW, CLOSE = range(5)
+COLUMNS = ("timestamp", "open", "high", "low", "close")
+
+# Header names accepted for the timestamp column of a CSV file
+_TIMESTAMP_HEADERS = ("timestamp", "time", "date", "datetime")
+
+_SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
+
+# Store of the configured directory, created on first use
+_price_store = None
+_price_store_lock = threading.Lock()
+
+###########
+# Classes #
+###########
+
+class PriceSeries:
+    """
+    OHLC series of one asset, sorted by timestamp.
+
+    Args:
+        data (np.ndarray): A `(n, 5)` array of timestamp (seconds since the
+                           epoch), open, high, low and close, possibly
+                           memory-mapped.
+    """
+
+    def __init__(self, data: np.ndarray):
+        self.data = data
+        self.timestamps = data[:, TIMESTAMP]
+        self.close = data[:, CLOSE]
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def index_at(self, times: np.ndarray) -> np.ndarray:
+        """Returns the index of the last bar at or before each time, -1 if none."""
+        return np.searchsorted(self.timestamps, times, side='right') - 1
+
+    def forward_returns(self, times: Sequence[float], horizons: Sequence[float]) -> np.ndarray:
+        """
+        Computes the close-to-close return after each horizon, for every time.
+
+        Args:
+            times (list): The start times, in seconds since the epoch.
+            horizons (list): The horizons, in seconds.
+
+        Returns:
+            np.ndarray: A `(len(times), len(horizons))` array of returns, NaN
+                        where the series does not cover the start or end time.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        horizons = np.asarray(horizons, dtype=np.float64)
+        returns = np.full((len(times), len(horizons)), np.nan)
+        if not len(self) or not len(times):
+            return returns
+
+        ends = times[:, None] + horizons[None, :]
+        start = self.index_at(times)
+        end = self.index_at(ends)
+        valid = (start >= 0)[:, None] & (ends <= self.timestamps[-1])
+        start_close = self.close[np.maximum(start, 0)][:, None]
+        end_close = self.close[np.maximum(end, 0)]
+        np.divide(end_close, start_close, out=returns, where=valid & (start_close > 0))
+        returns -= 1
+        return returns
+
+    def trailing_return(self, time: float, lookback: float, max_staleness: Optional[float] = None) -> Optional[float]:
+        """
+        Returns the return over the `lookback` seconds before `time`.
+
+        The window ends at the last bar at or before `time`, since bars are
+        stored after the fact.
+
+        Args:
+            time (float): The end of the window, in seconds since the epoch.
+            lookback (float): The length of the window, in seconds.
+            max_staleness (float): The age of the last bar, in seconds, past
+                                   which there is no return. Defaults to
+                                   `lookback`.
+
+        Returns:
+            float: The return, or None if the series does not cover the window.
+        """
+        end = int(self.index_at([time])[0])
+        if end < 0:
+            return None
+        end_time = float(self.timestamps[end])
+        if time - end_time > (lookback if max_staleness is None else max_staleness):
+            return None
+        start = int(self.index_at([end_time - lookback])[0])
+        if start < 0 or start == end or self.close[start] <= 0:
+            return None
+        return float(self.close[end] / self.close[start] - 1)
+
+
+class PriceFeed:
+    """Base class of the sources of OHLC bars."""
+
+    def fetch(self, asset: str, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """Returns the `(n, 5)` bars of an asset between two timestamps."""
+        raise NotImplementedError
+
+
+class CSVPriceFeed(PriceFeed):
+    """
+    Local file stand-in for a price feed, reading `<directory>/<asset>.csv`.
+
+    Args:
+        directory (str): The directory of the CSV files.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch(self, asset: str, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        bars = read_price_csv(os.path.join(self.directory, f"{asset_slug(asset)}.csv"))
+        keep = np.ones(len(bars), dtype=bool)
+        if start is not None:
+            keep &= bars[:, TIMESTAMP] >= start
+        if end is not None:
+            keep &= bars[:, TIMESTAMP] <= end
+        return bars[keep]
+
+
+class PriceStore:
+    """
+    Directory of per-asset OHLC series, stored as `.npy` files and
+    memory-mapped when read.
+
+    Args:
+        directory (str): The directory of the series.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._series: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def path(self, asset: str) -> str:
+        return os.path.join(self.directory, f"{asset_slug(asset)}.npy")
+
+    def get(self, asset: str) -> Optional[PriceSeries]:
+        """Returns the memory-mapped series of an asset, or None if there is none."""
+        path = self.path(asset)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        # A rewritten file has a new inode, since it is replaced atomically
+        version = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._series.get(path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        series = PriceSeries(np.load(path, mmap_mode='r'))
+        with self._lock:
+            self._series[path] = (version, series)
+        return series
+
+    def write(self, asset: str, bars: np.ndarray) -> PriceSeries:
+        """
+        Replaces the series of an asset.
+
+        The bars are sorted by timestamp and, for duplicate timestamps, the
+        last bar wins.
+        """
+        bars = np.asarray(bars, dtype=np.float64).reshape(-1, len(COLUMNS))
+        # Stable sort, then keep the last bar of each timestamp
+        bars = bars[np.argsort(bars[:, TIMESTAMP], kind='stable')]
+        last = np.append(bars[1:, TIMESTAMP] != bars[:-1, TIMESTAMP], True) if len(bars) else np.array([], dtype=bool)
+        bars = bars[last]
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(asset)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp.npy"
+        np.save(tmp_path, bars)
+        os.replace(tmp_path, path)
+        return self.get(asset)
+
+    def merge(self, asset: str, bars: np.ndarray) -> PriceSeries:
+        """Adds bars to the series of an asset, replacing bars with the same timestamp."""
+        existing = self.get(asset)
+        if existing is not None:
+            bars = np.concatenate([np.asarray(existing.data), np.asarray(bars, dtype=np.float64).reshape(-1, len(COLUMNS))])
+        return self.write(asset, bars)
+
+    def update(self, asset: str, feed: PriceFeed) -> PriceSeries:
+        """
+        Fetches the bars after the last stored one from a feed and appends
+        them. The series is not rewritten if there are none.
+        """
+        existing = self.get(asset)
+        if existing is None or not len(existing):
+            return self.write(asset, feed.fetch(asset))
+        last = float(existing.timestamps[-1])
+        bars = np.asarray(feed.fetch(asset, start=last), dtype=np.float64).reshape(-1, len(COLUMNS))
+        bars = bars[bars[:, TIMESTAMP] > last]
+        if not len(bars):
+            return existing
+        return self.merge(asset, bars)
+
+###########
+# Methods #
+###########
+
+def asset_slug(asset: str) -> str:
+    """Returns the file name of an asset, e.g. "bitcoin" for " Bitcoin "."""
+    return _SLUG_PATTERN.sub("_", asset.strip().lower()).strip("_")
+
+def parse_timestamp(value: str) -> float:
+    """Parses seconds since the epoch or an ISO 8601 date, read as UTC if naive."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def read_price_csv(path: str) -> np.ndarray:
+    """
+    Reads OHLC bars from a CSV file with a header row.
+
+    The header must name a timestamp column (`timestamp`, `time`, `date` or
+    `datetime`) and the `open`, `high`, `low` and `close` columns, in any
+    order and case. Other columns are ignored.
+
+    Returns:
+        np.ndarray: The `(n, 5)` bars, in file order.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        reader = csv.reader(file)
+        header = [name.strip().lower() for name in next(reader)]
+        try:
+            time_column = next(header.index(name) for name in _TIMESTAMP_HEADERS if name in header)
+            price_columns = [header.index(name) for name in COLUMNS[1:]]
+        except (StopIteration, ValueError):
+            raise ValueError(f"{path} needs a timestamp column and open, high, low and close columns.")
+
+        rows = [
+            [parse_timestamp(row[time_column])] + [float(row[i]) for i in price_columns]
+            for row in reader
+            if row
+        ]
+    return np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+
+def get_price_store() -> PriceStore:
+    """Returns the store of the `PRICE_STORE_DIR` directory, created on first use."""
+    global _price_store
+    if _price_store is None:
+        with _price_store_lock:
+            if _price_store is None:
+                _price_store = PriceStore(CONFIG.get('PRICE_STORE_DIR', '/tmp/crypto_news_prices'))
+    return _price_store
+
+def recent_price_move(
+    asset: str,
+    lookback_hours: float = 24,
+    now: Optional[datetime] = None,
+    max_staleness_hours: Optional[float] = None,
+) -> Optional[float]:
+    """
+    Returns the return of an asset over the last `lookback_hours`, e.g. to
+    include the actual move in an alert email.
+
+    With `PRICE_FEED_DIR`, the new bars of `<PRICE_FEED_DIR>/<asset>.csv`
+    are merged into the store first, so that a directory kept up to date
+    by another job fills it.
+
+    Args:
+        asset (str): The name of the cryptocurrency.
+        lookback_hours (float): The length of the window, in hours.
+        now (datetime): The end of the window. Defaults to now.
+        max_staleness_hours (float): The age of the last bar past which there
+                                     is no move. Defaults to `PRICE_MAX_STALENESS_HOURS`.
+
+    Returns:
+        float: The return, e.g. -0.05 for a 5% drop, or None if the stored
+               series does not cover the period or is stale.
+    """
+    store = get_price_store()
+    feed_dir = CONFIG.get('PRICE_FEED_DIR')
+    series = None
+    if feed_dir and os.path.exists(os.path.join(feed_dir, f"{asset_slug(asset)}.csv")):
+        series = store.update(asset, CSVPriceFeed(feed_dir))
+    if series is None:
+        series = store.get(asset)
+    if series is None:
+        return None
+    if max_staleness_hours is None:
+        max_staleness_hours = CONFIG.get('PRICE_MAX_STALENESS_HOURS', 2)
+    now = (now or datetime.now(timezone.utc)).timestamp()
+    return series.trailing_return(now, lookback_hours * 3600, max_staleness_hours * 3600)
+
+def evaluate_predictions(
+    assets: Sequence[str],
+    times: Sequence[float],
+    verdicts: Sequence[Optional[bool]],
+    horizons_days: Sequence[float],
+    store: PriceStore,
+    drop_threshold: float = 0.0,
+) -> List[dict]:
+    """
+    Scores `ValueWillDrop` verdicts against the actual forward returns.
+
+    A drop happened when the forward return is below `-drop_threshold`.
+    Verdicts that are None, and predictions whose horizon is not covered by
+    the stored series, are not evaluated.
+
+    Args:
+        assets (list): The asset of each prediction.
+        times (list): The time of each prediction, in seconds since the epoch.
+        verdicts (list): The `ValueWillDrop` verdict of each prediction.
+        horizons_days (list): The horizons to evaluate, in days.
+        store (PriceStore): The store of the price series.
+        drop_threshold (float): The fall below which a move counts as a drop.
+
+    Returns:
+        list: One dict per horizon with the number of predictions `evaluated`,
+              the `hit_rate` (share of correct verdicts), the `precision` and
+              `recall` of the drop verdicts, and the `base_rate` of drops.
+    """
+    assets = np.asarray(assets, dtype=object)
+    times = np.asarray(times, dtype=np.float64)
+    known = np.array([verdict is not None for verdict in verdicts], dtype=bool)
+    predicted = np.array([bool(verdict) for verdict in verdicts], dtype=bool)
+    horizons = np.asarray(horizons_days, dtype=np.float64) * 86400
+
+    returns = np.full((len(times), len(horizons)), np.nan)
+    for asset in set(assets[known]):
+        series = store.get(asset)
+        if series is None:
+            continue
+        rows = np.flatnonzero((assets == asset) & known)
+        returns[rows] = series.forward_returns(times[rows], horizons)
+
+    results = []
+    for h, horizon_days in enumerate(horizons_days):
+        covered = ~np.isnan(returns[:, h])
+        actual = returns[covered, h] < -drop_threshold
+        verdict = predicted[covered]
+        true_positives = int(np.count_nonzero(verdict & actual))
+        evaluated = int(np.count_nonzero(covered))
+        results.append({
+            "horizon_days": horizon_days,
+            "evaluated": evaluated,
+            "hit_rate": float(np.count_nonzero(verdict == actual)) / evaluated if evaluated else None,
+            "precision": true_positives / np.count_nonzero(verdict) if np.count_nonzero(verdict) else None,
+            "recall": true_positives / np.count_nonzero(actual) if np.count_nonzero(actual) else None,
+            "base_rate": float(np.count_nonzero(actual)) / evaluated if evaluated else None,
+        })
+    return results
+
+def _end_of_day(date: str) -> float:
+    """Returns the end of a YYYY-MM-DD date (UTC), when its prediction was made."""
+    day = datetime.strptime(date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    return (day + timedelta(days=1)).timestamp()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage price series and score stored predictions.")
+    parser.add_argument("--store", default=None, help="Directory of the price store. Defaults to PRICE_STORE_DIR.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("load", help="Load the bars of an asset from a CSV file.")
+    load.add_argument("--asset", required=True)
+    load.add_argument("--csv", required=True, help="Path of the CSV file.")
+
+    evaluate = commands.add_parser("evaluate", help="Score the verdicts of a backfill output file.")
+    evaluate.add_argument("--predictions", default="/tmp/crypto_news_backfill.json", help="Backfill output (.json).")
+    evaluate.add_argument("--horizons", default=None, help="Comma-separated horizons, in days.")
+    evaluate.add_argument("--drop-threshold", type=float, default=None, help="Fall that counts as a drop, e.g. 0.02.")
+    args = parser.parse_args()
+
+    store = PriceStore(args.store) if args.store else get_price_store()
+    if args.command == "load":
+        series = store.merge(args.asset, read_price_csv(args.csv))
+        print(f"{len(series)} bars stored for {args.asset} in {store.path(args.asset)}.")
+    else:
+        with open(args.predictions, 'r', encoding='utf-8') as file:
+            columns = json.load(file)
+        horizons = [float(h) for h in (args.horizons or ",".join(map(str, CONFIG.get('PRICE_HORIZONS', [1, 3, 7])))).split(",")]
+        results = evaluate_predictions(
+            assets=columns["asset"],
+            times=[_end_of_day(date) for date in columns["date"]],
+            verdicts=columns["value_will_drop"],
+            horizons_days=horizons,
+            store=store,
+            drop_threshold=args.drop_threshold if args.drop_threshold is not None else CONFIG.get('PRICE_DROP_THRESHOLD', 0.0),
+        )
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,151 @@
+"""
+relevance.py
+
+This module provides a cheap local pre-filter that scores the relevance and
+polarity of news articles with keyword lexicons, so that articles which are
+clearly off-topic are dropped before any tokens are spent on the LLM.
+"""
+
+import re
+from dataclasses import dataclass
+from src.services.news import Article, ArticleBatch
+from typing import FrozenSet, List, Optional, Sequence, Union
+
+# Placeholder used by NewsAPI for articles that were taken down
+REMOVED_PLACEHOLDER = "[Removed]"
+
+# Common ticker symbols and nicknames of the most watched assets
+ASSET_ALIASES = {
+    'bitcoin': {'btc', 'bitcoins'},
+    'ethereum': {'eth', 'ether'},
+    'solana': {'sol'},
+    'ripple': {'xrp'},
+    'xrp': {'ripple'},
+    'dogecoin': {'doge'},
+    'cardano': {'ada'},
+    'litecoin': {'ltc'},
+    'binance': {'bnb'},
+}
+
+# Generic crypto-market vocabulary, used as a weaker relevance signal
+CRYPTO_TERMS = frozenset({
+    'crypto', 'cryptocurrency', 'cryptocurrencies', 'cryptos', 'blockchain', 'token', 'tokens',
+    'coin', 'coins', 'stablecoin', 'defi', 'exchange', 'etf', 'etfs', 'mining', 'miners',
+    'wallet', 'halving', 'altcoin', 'altcoins', 'web3', 'nft', 'ledger', 'satoshi',
+})
+
+NEGATIVE_TERMS = frozenset({
+    'crash', 'crashes', 'plunge', 'plunges', 'hack', 'hacked', 'breach', 'ban', 'banned',
+    'lawsuit', 'fraud', 'selloff', 'dump', 'drop', 'drops', 'fall', 'falls', 'bearish',
+    'liquidation', 'liquidations', 'investigation', 'exploit', 'scam', 'bankrupt',
+    'bankruptcy', 'collapse', 'decline', 'outflows', 'warning', 'stolen', 'sued', 'slump',
+})
+
+POSITIVE_TERMS = frozenset({
+    'rally', 'rallies', 'surge', 'surges', 'soar', 'soars', 'bullish', 'record', 'gain',
+    'gains', 'adoption', 'approval', 'approved', 'inflows', 'rise', 'rises', 'jump',
+    'jumps', 'growth', 'boost', 'rebound', 'rebounds', 'recovery', 'recovers', 'climb',
+    'climbs', 'upgrade', 'upgraded', 'partnership',
+})
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+###########
+# Classes #
+###########
+
+@dataclass
+class ArticleScore:
+    """Data class to represent the local scores of an article."""
+    relevance: float
+    polarity: float
+
+
+@dataclass
+class FilterResult:
+    """Data class to represent the outcome of the pre-filter stage."""
+    articles: Union[List[Article], ArticleBatch]
+    scores: List[ArticleScore]
+    dropped: int
+
+###########
+# Methods #
+###########
+
+def tokenize(text: str) -> FrozenSet[str]:
+    """Returns the set of lower-case word tokens of a text."""
+    return frozenset(_TOKEN_PATTERN.findall(text.lower())) if text else frozenset()
+
+def query_terms(query: str) -> FrozenSet[str]:
+    """Returns the tokens of a query, expanded with the known asset aliases."""
+    terms = set(tokenize(query))
+    for term in list(terms):
+        terms |= ASSET_ALIASES.get(term, set())
+    return frozenset(terms)
+
+def score_article(article: Article, terms: FrozenSet[str]) -> ArticleScore:
+    """
+    Scores the relevance and polarity of an article from its title and description.
+
+    Args:
+        article (Article): The article to score.
+        terms (frozenset): The query terms, as returned by `query_terms`.
+
+    Returns:
+        ArticleScore: A relevance in [0, 1] and a polarity in [-1, 1].
+    """
+    return _score_text(article.title, article.description, terms)
+
+def _score_text(title: Optional[str], description: Optional[str], terms: FrozenSet[str]) -> ArticleScore:
+    if title == REMOVED_PLACEHOLDER:
+        return ArticleScore(relevance=0.0, polarity=0.0)
+
+    title_tokens = tokenize(title)
+    description_tokens = tokenize(description)
+    tokens = title_tokens | description_tokens
+
+    relevance = 0.0
+    if title_tokens & terms:
+        relevance += 0.6
+    if description_tokens & terms:
+        relevance += 0.4
+    relevance += 0.15 * len(tokens & CRYPTO_TERMS)
+
+    negative = len(tokens & NEGATIVE_TERMS)
+    positive = len(tokens & POSITIVE_TERMS)
+    polarity = (positive - negative) / (positive + negative) if positive + negative else 0.0
+
+    return ArticleScore(relevance=min(1.0, relevance), polarity=polarity)
+
+def filter_articles(news_articles: Sequence[Article], query: str, min_relevance: float = 0.3) -> FilterResult:
+    """
+    Drops the articles that are clearly not relevant to the query.
+
+    Args:
+        news_articles (list): The fetched articles, as a list or an `ArticleBatch`.
+        query (str): The query the articles were fetched for.
+        min_relevance (float): The minimum relevance of a kept article.
+
+    Returns:
+        FilterResult: The kept articles, as a batch if a batch was given, their
+                      scores and the number dropped.
+    """
+    terms = query_terms(query)
+    if isinstance(news_articles, ArticleBatch):
+        # Batches are scored column by column, without building Article objects
+        rows = zip(news_articles.titles, news_articles.descriptions)
+    else:
+        rows = ((article.title, article.description) for article in news_articles)
+
+    kept, scores = [], []
+    for i, (title, description) in enumerate(rows):
+        score = _score_text(title, description, terms)
+        if title != REMOVED_PLACEHOLDER and score.relevance >= min_relevance:
+            kept.append(i)
+            scores.append(score)
+
+    if isinstance(news_articles, ArticleBatch):
+        articles = news_articles.select(kept)
+    else:
+        articles = [news_articles[i] for i in kept]
+    return FilterResult(articles=articles, scores=scores, dropped=len(news_articles) - len(kept))
@@ -0,0 +1,224 @@
+"""
+seen.py
+
+This module provides an index of already-analyzed news articles, so that
+articles seen on a previous run are not sent to the LLM again.
+
+Articles are keyed by URL and a hash of their content, so an article is sent
+again only when it is new or its content has changed.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from src.utils.config import CONFIG
+from src.services.news import Article
+from typing import Dict, Iterable, List, Optional, Tuple
+
+###########
+# Classes #
+###########
+
+class SeenBackend:
+    """Base class for seen-article storage backends.
+
+    Entries map a key to a `(content_hash, seen_at)` tuple, where `seen_at`
+    is a Unix timestamp. Subclass it to plug in a remote store.
+    """
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[str, float]]:
+        """Returns the stored entries for the given keys."""
+        raise NotImplementedError
+
+    def put_many(self, entries: List[Tuple[str, str, float]]) -> None:
+        """Stores `(key, content_hash, seen_at)` entries."""
+        raise NotImplementedError
+
+    def evict(self, before: float) -> int:
+        """Removes the entries seen before the given timestamp."""
+        raise NotImplementedError
+
+
+class MemoryBackend(SeenBackend):
+    """In-process backend, kept alive across warm Lambda invocations."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[str, float]]:
+        with self._lock:
+            return {key: self._entries[key] for key in keys if key in self._entries}
+
+    def put_many(self, entries: List[Tuple[str, str, float]]) -> None:
+        with self._lock:
+            for key, content_hash, seen_at in entries:
+                self._entries[key] = (content_hash, seen_at)
+
+    def evict(self, before: float) -> int:
+        with self._lock:
+            expired = [key for key, (_, seen_at) in self._entries.items() if seen_at < before]
+            for key in expired:
+                del self._entries[key]
+            return len(expired)
+
+
+class SQLiteBackend(SeenBackend):
+    """Local file backend based on SQLite."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                "key TEXT PRIMARY KEY, content_hash TEXT NOT NULL, seen_at REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS seen_at_idx ON seen (seen_at)")
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[str, float]]:
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT key, content_hash, seen_at FROM seen WHERE key IN ({placeholders})", keys
+            ).fetchall()
+        return {key: (content_hash, seen_at) for key, content_hash, seen_at in rows}
+
+    def put_many(self, entries: List[Tuple[str, str, float]]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO seen (key, content_hash, seen_at) VALUES (?, ?, ?)", entries
+            )
+
+    def evict(self, before: float) -> int:
+        with self._lock, self._connection:
+            return self._connection.execute("DELETE FROM seen WHERE seen_at < ?", (before,)).rowcount
+
+
+class DynamoDBBackend(SeenBackend):
+    """Remote backend based on a DynamoDB table with a `key` partition key.
+
+    Expired items are removed by DynamoDB's own TTL on the `expires_at`
+    attribute, so `evict` is a no-op.
+    """
+
+    def __init__(self, table_name: str, ttl: float, region_name: str = 'us-east-1'):
+        import boto3
+        self._resource = boto3.resource('dynamodb', region_name=region_name)
+        self._table_name = table_name
+        self._table = self._resource.Table(table_name)
+        self._ttl = ttl
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[str, float]]:
+        entries = {}
+        # BatchGetItem accepts at most 100 keys per request
+        for start in range(0, len(keys), 100):
+            response = self._resource.batch_get_item(RequestItems={
+                self._table_name: {'Keys': [{'key': key} for key in keys[start:start + 100]]}
+            })
+            for item in response.get('Responses', {}).get(self._table_name, []):
+                entries[item['key']] = (item['content_hash'], float(item['seen_at']))
+        return entries
+
+    def put_many(self, entries: List[Tuple[str, str, float]]) -> None:
+        with self._table.batch_writer(overwrite_by_pkeys=['key']) as batch:
+            for key, content_hash, seen_at in entries:
+                batch.put_item(Item={
+                    'key': key,
+                    'content_hash': content_hash,
+                    'seen_at': int(seen_at),
+                    'expires_at': int(seen_at + self._ttl),
+                })
+
+    def evict(self, before: float) -> int:
+        return 0
+
+
+class SeenArticleIndex:
+    """Index of already-analyzed articles with TTL-based eviction."""
+
+    def __init__(self, backend: SeenBackend, ttl: float = 2 * 24 * 3600):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def article_key(article: Article, namespace: str = "") -> str:
+        """Returns the index key of an article, scoped by namespace (e.g. the asset)."""
+        return f"{namespace}|{article.url or article.title}"
+
+    @staticmethod
+    def content_hash(article: Article) -> str:
+        """Returns a hash of the article fields that are sent to the LLM."""
+        text = "\0".join(str(field) for field in (article.title, article.description, article.content))
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def filter_new(self, articles: List[Article], namespace: str = "") -> List[Article]:
+        """Returns the articles that are new or changed since they were last seen.
+
+        Args:
+            articles (list): The fetched articles.
+            namespace (str): The scope of the index, e.g. the asset name.
+
+        Returns:
+            list: The articles that were not seen within the TTL.
+        """
+        keys = [self.article_key(article, namespace) for article in articles]
+        seen = self.backend.get_many(list(set(keys)))
+        expired_before = time.time() - self.ttl
+
+        new_articles = []
+        for key, article in zip(keys, articles):
+            entry = seen.get(key)
+            if entry is None or entry[1] < expired_before or entry[0] != self.content_hash(article):
+                new_articles.append(article)
+        return new_articles
+
+    def mark_seen(self, articles: Iterable[Article], namespace: str = "") -> None:
+        """Records the articles as analyzed and evicts expired entries.
+
+        Args:
+            articles (list): The analyzed articles.
+            namespace (str): The scope of the index, e.g. the asset name.
+        """
+        now = time.time()
+        entries = [
+            (self.article_key(article, namespace), self.content_hash(article), now)
+            for article in articles
+        ]
+        if entries:
+            self.backend.put_many(entries)
+        self.backend.evict(now - self.ttl)
+
+###########
+# Methods #
+###########
+
+_seen_index = None
+_seen_index_lock = threading.Lock()
+
+def get_seen_index() -> Optional[SeenArticleIndex]:
+    """Returns the configured seen-article index, or None if it is disabled.
+
+    The index is created on first use and reused across warm invocations.
+    """
+    global _seen_index
+    backend_name = CONFIG.get('SEEN_INDEX_BACKEND', 'sqlite')
+    if backend_name == 'none':
+        return None
+
+    with _seen_index_lock:
+        if _seen_index is None:
+            ttl = CONFIG.get('SEEN_INDEX_TTL', 2 * 24 * 3600)
+            if backend_name == 'sqlite':
+                backend = SQLiteBackend(CONFIG.get('SEEN_INDEX_PATH', '/tmp/crypto_news_seen.sqlite3'))
+            elif backend_name == 'dynamodb':
+                backend = DynamoDBBackend(CONFIG.get('SEEN_INDEX_TABLE'), ttl=ttl)
+            elif backend_name == 'memory':
+                backend = MemoryBackend()
+            else:
+                raise ValueError(f"Unknown seen index backend: {backend_name}")
+            _seen_index = SeenArticleIndex(backend, ttl=ttl)
+        return _seen_index
@@ -0,0 +1,394 @@
+"""
+sentiment.py
+
+This module provides a rolling per-asset sentiment state, so that alerts are
+based on the recent history of an asset rather than on each LLM answer.
+
+Each analysis updates exponentially decayed drop scores over several
+half-lives with only the newly analyzed articles. An alert fires when the
+score crosses `SENTIMENT_ALERT_THRESHOLD` and is re-armed only once the
+score falls below `SENTIMENT_RESET_THRESHOLD`, so a drop reported over
+several runs is alerted once.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from src.utils.config import CONFIG
+from src.services.llm import verdict_confidence
+from typing import Callable, Dict, List, Optional, Tuple
+
+###########
+# Classes #
+###########
+
+@dataclass
+class SentimentState:
+    """Decayed drop scores of an asset, one `(sum, weight)` pair per half-life.
+
+    `sums` holds the decayed sum of the drop probabilities of the analyzed
+    articles and `weights` the decayed number of articles, both keyed by the
+    window label (e.g. "24h"). `alerting` is set between an alert and the
+    score falling back below the reset threshold.
+    """
+    asset: str
+    updated_at: Optional[float] = None
+    sums: Dict[str, float] = field(default_factory=dict)
+    weights: Dict[str, float] = field(default_factory=dict)
+    alerting: bool = False
+
+    def decay(self, half_lives: Dict[str, float], now: float) -> None:
+        """Decays every window to `now`, with half-lives in hours."""
+        if self.updated_at is None:
+            return
+        elapsed = max(0.0, now - self.updated_at)
+        for label, half_life in half_lives.items():
+            factor = 0.5 ** (elapsed / (half_life * 3600))
+            self.sums[label] = self.sums.get(label, 0.0) * factor
+            self.weights[label] = self.weights.get(label, 0.0) * factor
+
+    def add(self, labels: List[str], drop_probability: float, weight: float) -> None:
+        """Adds newly analyzed articles to every window."""
+        for label in labels:
+            self.sums[label] = self.sums.get(label, 0.0) + drop_probability * weight
+            self.weights[label] = self.weights.get(label, 0.0) + weight
+
+    def score(self, label: str, prior_weight: float = 0.0) -> float:
+        """Returns the decayed drop score of a window, in [0, 1].
+
+        The `prior_weight` counts as that many articles without a drop, so
+        that the score fades back to 0 when no news is analyzed.
+        """
+        total = self.weights.get(label, 0.0) + prior_weight
+        return self.sums.get(label, 0.0) / total if total > 0 else 0.0
+
+    def to_json(self) -> str:
+        """Serializes the state."""
+        return json.dumps({
+            "updated_at": self.updated_at,
+            "sums": self.sums,
+            "weights": self.weights,
+            "alerting": self.alerting,
+        })
+
+    @classmethod
+    def from_json(cls, asset: str, text: str) -> "SentimentState":
+        """Deserializes a state written by `to_json`."""
+        data = json.loads(text)
+        return cls(
+            asset=asset,
+            updated_at=data.get("updated_at"),
+            sums=data.get("sums", {}),
+            weights=data.get("weights", {}),
+            alerting=data.get("alerting", False),
+        )
+
+
+class StateBackend:
+    """Base class for sentiment state storage backends.
+
+    States are stored as the JSON text of `SentimentState.to_json`, keyed by
+    asset, with the timestamp of their last update as a version. Writes are
+    conditional on the version that was read, so concurrent updates of an
+    asset never overwrite each other. Subclass it to plug in a remote store.
+    """
+
+    def get(self, asset: str) -> Optional[Tuple[str, float]]:
+        """Returns the stored state of an asset and its version, or None."""
+        raise NotImplementedError
+
+    def put(self, asset: str, state: str, updated_at: float, expected: Optional[float] = None) -> bool:
+        """Stores the state of an asset with the version `updated_at`.
+
+        Args:
+            asset (str): The name of the cryptocurrency.
+            state (str): The JSON text of the state.
+            updated_at (float): The version of the new state.
+            expected (float): The version that was read, or None if there was
+                              no state.
+
+        Returns:
+            bool: False if the stored version is not `expected` any more.
+        """
+        raise NotImplementedError
+
+    def delete(self, asset: str, expected: float) -> bool:
+        """Deletes the state of an asset, unless its version is not `expected` any more."""
+        raise NotImplementedError
+
+
+class MemoryStateBackend(StateBackend):
+    """In-process backend, kept alive across warm Lambda invocations."""
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def get(self, asset: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            return self._states.get(asset)
+
+    def put(self, asset: str, state: str, updated_at: float, expected: Optional[float] = None) -> bool:
+        with self._lock:
+            stored = self._states.get(asset)
+            if (stored[1] if stored else None) != expected:
+                return False
+            self._states[asset] = (state, updated_at)
+            return True
+
+    def delete(self, asset: str, expected: float) -> bool:
+        with self._lock:
+            stored = self._states.get(asset)
+            if stored is None or stored[1] != expected:
+                return False
+            del self._states[asset]
+            return True
+
+
+class SQLiteStateBackend(StateBackend):
+    """Local file backend based on SQLite, which can be shared by the processes of a host."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment ("
+                "asset TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def get(self, asset: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT state, updated_at FROM sentiment WHERE asset = ?", (asset,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put(self, asset: str, state: str, updated_at: float, expected: Optional[float] = None) -> bool:
+        with self._lock, self._connection:
+            if expected is None:
+                cursor = self._connection.execute(
+                    "INSERT OR IGNORE INTO sentiment (asset, state, updated_at) VALUES (?, ?, ?)",
+                    (asset, state, updated_at)
+                )
+            else:
+                cursor = self._connection.execute(
+                    "UPDATE sentiment SET state = ?, updated_at = ? WHERE asset = ? AND updated_at = ?",
+                    (state, updated_at, asset, expected)
+                )
+        return cursor.rowcount == 1
+
+    def delete(self, asset: str, expected: float) -> bool:
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM sentiment WHERE asset = ? AND updated_at = ?", (asset, expected)
+            )
+        return cursor.rowcount == 1
+
+
+class DynamoDBStateBackend(StateBackend):
+    """Remote backend based on a DynamoDB table with an `asset` partition key.
+
+    States are updated with conditional writes, so that concurrent Lambda
+    instances do not both alert on the same drop.
+    """
+
+    def __init__(self, table_name: str, region_name: str = 'us-east-1'):
+        import boto3
+        self._table = boto3.resource('dynamodb', region_name=region_name).Table(table_name)
+
+    def get(self, asset: str) -> Optional[Tuple[str, float]]:
+        item = self._table.get_item(Key={'asset': asset}, ConsistentRead=True).get('Item')
+        return (item['state'], float(item['updated_at'])) if item else None
+
+    def _condition(self, expected: Optional[float]) -> dict:
+        if expected is None:
+            return {'ConditionExpression': 'attribute_not_exists(#asset)', 'ExpressionAttributeNames': {'#asset': 'asset'}}
+        return {
+            'ConditionExpression': '#updated_at = :updated_at',
+            'ExpressionAttributeNames': {'#updated_at': 'updated_at'},
+            'ExpressionAttributeValues': {':updated_at': Decimal(str(expected))},
+        }
+
+    def put(self, asset: str, state: str, updated_at: float, expected: Optional[float] = None) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self._table.put_item(
+                Item={'asset': asset, 'state': state, 'updated_at': Decimal(str(updated_at))},
+                **self._condition(expected)
+            )
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            return False
+
+    def delete(self, asset: str, expected: float) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self._table.delete_item(Key={'asset': asset}, **self._condition(expected))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            return False
+
+
+class SentimentTracker:
+    """Rolling per-asset sentiment with threshold-crossing alerts.
+
+    Args:
+        backend (StateBackend): The storage of the states.
+        half_lives (list): The half-lives of the windows, in hours.
+        alert_half_life (float): The half-life of the window that alerts.
+        alert_threshold (float): The score at which an alert fires.
+        reset_threshold (float): The score below which alerts are re-armed.
+        prior_weight (float): The number of articles without a drop that
+                              every score starts from.
+    """
+
+    # Conditional writes attempted before giving up on a contended asset
+    MAX_ATTEMPTS = 5
+
+    def __init__(
+        self,
+        backend: StateBackend,
+        half_lives: Optional[List[float]] = None,
+        alert_half_life: float = 24.0,
+        alert_threshold: float = 0.6,
+        reset_threshold: float = 0.4,
+        prior_weight: float = 0.5,
+    ):
+        self.backend = backend
+        self.half_lives = {window_label(h): h for h in sorted(set(half_lives or [6.0, 24.0, 168.0]) | {alert_half_life})}
+        self.alert_window = window_label(alert_half_life)
+        self.alert_threshold = alert_threshold
+        self.reset_threshold = reset_threshold
+        self.prior_weight = prior_weight
+
+    def load(self, asset: str) -> SentimentState:
+        """Returns the stored state of an asset, or an empty one."""
+        stored = self.backend.get(asset)
+        return SentimentState.from_json(asset, stored[0]) if stored else SentimentState(asset=asset)
+
+    def update(self, asset: str, drop_probability: float, weight: float, now: Optional[float] = None) -> dict:
+        """Adds newly analyzed articles to the state of an asset.
+
+        See `apply` for the arguments and the result.
+        """
+        return self.apply(asset, drop_probability, weight, now)[0]
+
+    def apply(
+        self,
+        asset: str,
+        drop_probability: float,
+        weight: float,
+        now: Optional[float] = None,
+    ) -> Tuple[dict, Callable[[], bool]]:
+        """Adds newly analyzed articles to the state of an asset and stores it.
+
+        The state is written conditionally on the version that was read, and
+        the update is retried on conflicts, so only one of several concurrent
+        updates crosses the alert threshold.
+
+        Args:
+            asset (str): The name of the cryptocurrency.
+            drop_probability (float): The drop probability of the new articles.
+            weight (float): The number of new articles, e.g. summed source counts.
+            now (float): The Unix timestamp of the update. Defaults to now.
+
+        Returns:
+            tuple: The `scores` of every window, whether the update crossed the
+                   alert threshold (`alert`) and whether the asset is `alerting`,
+                   and a function restoring the previous state, e.g. when the
+                   alert could not be delivered. It returns False if the state
+                   was updated again since.
+
+        Raises:
+            RuntimeError: If the state kept changing during every attempt.
+        """
+        now = time.time() if now is None else now
+        for _ in range(self.MAX_ATTEMPTS):
+            stored = self.backend.get(asset)
+            state = SentimentState.from_json(asset, stored[0]) if stored else SentimentState(asset=asset)
+            result = self._add(state, drop_probability, weight, now)
+            if self.backend.put(asset, state.to_json(), now, expected=stored[1] if stored else None):
+                return result, lambda: self._restore(asset, stored, now)
+        raise RuntimeError(f"The sentiment state of {asset} kept changing during the update.")
+
+    def _add(self, state: SentimentState, drop_probability: float, weight: float, now: float) -> dict:
+        state.decay(self.half_lives, now)
+        # The score may have faded below the reset threshold since the last run
+        if state.score(self.alert_window, self.prior_weight) < self.reset_threshold:
+            state.alerting = False
+        state.add(list(self.half_lives), drop_probability, weight)
+        state.updated_at = now
+
+        score = state.score(self.alert_window, self.prior_weight)
+        alert = False
+        if state.alerting:
+            state.alerting = score >= self.reset_threshold
+        elif score >= self.alert_threshold:
+            alert = state.alerting = True
+
+        return {
+            "scores": {label: round(state.score(label, self.prior_weight), 4) for label in self.half_lives},
+            "alert": alert,
+            "alerting": state.alerting,
+        }
+
+    def _restore(self, asset: str, stored: Optional[Tuple[str, float]], written: float) -> bool:
+        if stored is None:
+            return self.backend.delete(asset, expected=written)
+        return self.backend.put(asset, stored[0], stored[1], expected=written)
+
+###########
+# Methods #
+###########
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+def window_label(half_life: float) -> str:
+    """Returns the label of a window, e.g. "24h"."""
+    return f"{half_life:g}h"
+
+def drop_probability(analysis: dict) -> float:
+    """Returns the probability of a drop implied by a verdict and its confidence."""
+    confidence = verdict_confidence(analysis)
+    if analysis.get("ValueWillDrop", False):
+        return 0.5 + confidence / 2
+    return 0.5 - confidence / 2
+
+def get_sentiment_tracker() -> Optional[SentimentTracker]:
+    """Returns the configured sentiment tracker, or None if it is disabled.
+
+    The tracker is created on first use and reused across warm invocations.
+    """
+    global _tracker
+    backend_name = CONFIG.get('SENTIMENT_BACKEND', 'sqlite')
+    if backend_name == 'none':
+        return None
+
+    with _tracker_lock:
+        if _tracker is None:
+            if backend_name == 'sqlite':
+                backend = SQLiteStateBackend(CONFIG.get('SENTIMENT_PATH', '/tmp/crypto_news_sentiment.sqlite3'))
+            elif backend_name == 'dynamodb':
+                backend = DynamoDBStateBackend(CONFIG.get('SENTIMENT_TABLE'))
+            elif backend_name == 'memory':
+                backend = MemoryStateBackend()
+            else:
+                raise ValueError(f"Unknown sentiment backend: {backend_name}")
+            _tracker = SentimentTracker(
+                backend,
+                half_lives=CONFIG.get('SENTIMENT_HALF_LIVES'),
+                alert_half_life=CONFIG.get('SENTIMENT_ALERT_HALF_LIFE', 24.0),
+                alert_threshold=CONFIG.get('SENTIMENT_ALERT_THRESHOLD', 0.6),
+                reset_threshold=CONFIG.get('SENTIMENT_RESET_THRESHOLD', 0.4),
+                prior_weight=CONFIG.get('SENTIMENT_PRIOR_WEIGHT', 0.5),
+            )
+        return _tracker
@@ -0,0 +1,202 @@
+"""
+similarity.py
+
+This module provides a local index of past analyses, so that a verdict can
+be reused for a set of articles that is nearly identical to one analyzed
+recently, e.g. the same stories re-published by other outlets between runs.
+
+Article sets are embedded with a signed hashing vectorizer over word
+unigrams and bigrams, which needs no model download nor network access.
+The unit vectors are stored in a fixed-size NumPy matrix, memory-mapped
+from `SIMILARITY_DIR`, and searched with one matrix-vector product. The
+verdicts themselves are kept next to it in SQLite.
+
+NumPy is only imported with this module, which the LLM service loads when
+`SIMILARITY_CACHE` is enabled.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from src.utils.config import CONFIG
+from src.services.news import Article
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Index of the configured directory, created on first use
+_index = None
+_index_lock = threading.Lock()
+
+###########
+# Classes #
+###########
+
+@dataclass(frozen=True)
+class SimilarVerdict:
+    """A stored verdict whose article set is similar to the queried one."""
+    verdict: dict
+    similarity: float
+    age: float
+
+
+class VerdictIndex:
+    """
+    Fixed-size index of past verdicts, searched by cosine similarity.
+
+    Once the index is full, the oldest entry is replaced.
+
+    Args:
+        directory (str): The directory of the index files.
+        dim (int): The number of hashed features of the embeddings.
+        max_entries (int): The number of verdicts kept.
+    """
+
+    def __init__(self, directory: str, dim: int = 1024, max_entries: int = 4096):
+        self.directory = directory
+        self.dim = dim
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._vectors = self._open("vectors.npy", (max_entries, dim), np.float32)
+        # 0 marks an empty slot
+        self._created_at = self._open("created_at.npy", (max_entries,), np.float64)
+        self._assets = self._open("assets.npy", (max_entries,), np.uint32)
+
+        self._connection = sqlite3.connect(os.path.join(directory, "verdicts.sqlite3"), check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts (slot INTEGER PRIMARY KEY, verdict TEXT NOT NULL)"
+            )
+
+    def _open(self, name: str, shape: tuple, dtype) -> np.memmap:
+        """Memory-maps an index file, creating it empty if it is missing or has another shape."""
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path):
+            array = open_memmap(path, mode='r+')
+            if array.shape == shape and array.dtype == dtype:
+                return array
+            del array
+        return open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+
+    def embed(self, news_articles: List[Article]) -> np.ndarray:
+        """Returns the unit embedding of a set of articles."""
+        return embed_text(
+            " ".join(f"{a.title or ''} {a.description or ''} {a.content or ''}" for a in news_articles),
+            self.dim,
+        )
+
+    def search(
+        self,
+        asset: str,
+        vector: np.ndarray,
+        threshold: float,
+        max_age: float,
+        now: Optional[float] = None,
+    ) -> Optional[SimilarVerdict]:
+        """
+        Returns the most similar verdict of an asset, if it is similar and
+        recent enough.
+
+        Args:
+            asset (str): The name of the cryptocurrency.
+            vector (np.ndarray): The embedding of the article set, from `embed`.
+            threshold (float): The lowest cosine similarity of a match.
+            max_age (float): The age of the oldest verdict reused, in seconds.
+            now (float): The current Unix timestamp. Defaults to now.
+
+        Returns:
+            SimilarVerdict: The match, or None if there is none.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            similarities = self._vectors @ vector
+            created_at = np.array(self._created_at)
+            eligible = (
+                (created_at > 0)
+                & (created_at >= now - max_age)
+                & (self._assets == asset_id(asset))
+                & (similarities >= threshold)
+            )
+            if not eligible.any():
+                return None
+            slot = int(np.argmax(np.where(eligible, similarities, -np.inf)))
+            row = self._connection.execute("SELECT verdict FROM verdicts WHERE slot = ?", (slot,)).fetchone()
+        if row is None:
+            return None
+        return SimilarVerdict(
+            verdict=json.loads(row[0]),
+            similarity=float(similarities[slot]),
+            age=max(0.0, now - float(created_at[slot])),
+        )
+
+    def add(self, asset: str, vector: np.ndarray, verdict: dict, now: Optional[float] = None) -> None:
+        """Stores the verdict of an article set, replacing the oldest entry."""
+        now = time.time() if now is None else now
+        with self._lock:
+            slot = int(np.argmin(self._created_at))
+            # The slot is only valid once its timestamp is written, last
+            self._created_at[slot] = 0
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO verdicts (slot, verdict) VALUES (?, ?)", (slot, json.dumps(verdict))
+                )
+            self._vectors[slot] = vector
+            self._assets[slot] = asset_id(asset)
+            self._created_at[slot] = now
+            for array in (self._vectors, self._assets, self._created_at):
+                array.flush()
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._created_at))
+
+###########
+# Methods #
+###########
+
+def asset_id(asset: str) -> int:
+    """Returns the stable hash of an asset name stored with each entry."""
+    return zlib.crc32(asset.strip().lower().encode("utf-8"))
+
+def embed_text(text: str, dim: int = 1024) -> np.ndarray:
+    """
+    Returns the unit embedding of a text, from the signed hashes of its word
+    unigrams and bigrams.
+
+    Hashing keeps the embedding stable across processes, so stored vectors
+    remain comparable, and signing the features keeps collisions from
+    inflating similarities.
+    """
+    tokens = _TOKEN_PATTERN.findall(text.lower()) if text else []
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not features:
+        return np.zeros(dim, dtype=np.float32)
+
+    hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint64, count=len(features))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+    vector = np.bincount((hashes % dim).astype(np.intp), weights=signs, minlength=dim)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm > 0 else vector).astype(np.float32)
+
+def get_similarity_index() -> VerdictIndex:
+    """Returns the index of the `SIMILARITY_DIR` directory, created on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VerdictIndex(
+                    CONFIG.get('SIMILARITY_DIR', '/tmp/crypto_news_similarity'),
+                    dim=CONFIG.get('SIMILARITY_DIM', 1024),
+                    max_entries=CONFIG.get('SIMILARITY_MAX_ENTRIES', 4096),
+                )
+    return _index
@@ -1,24 +1,123 @@
 import os
-from dotenv import load_dotenv
+import time
 
 # Global configuration
 CONFIG = {}
 
+# Seconds spent in the last `load_config`, reported as the "config" stage
+CONFIG_LOAD_SECONDS = 0.0
+
+def _split_list(value: str) -> list:
+    """Splits a comma-separated environment variable into a list of values."""
+    if not value:
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
+
 def load_config():
     """Loads the configuration from the environment variables."""
-    global CONFIG
-    
+    global CONFIG, CONFIG_LOAD_SECONDS
+    start = time.perf_counter()
+
     # Load environment variables from .env file if running locally
     if os.getenv('AWS_EXECUTION_ENV') is None:
+        from dotenv import load_dotenv
         load_dotenv()
-    
+
     CONFIG = {
-        'NEWS_API_URL': "https://newsapi.org/v2/everything",
+        'NEWS_API_URL': os.getenv('NEWS_API_URL', "https://newsapi.org/v2/everything"),
         'NEWS_API_KEY': os.getenv('NEWS_API_KEY'),
         'OPENAI_API_KEY': os.getenv('OPENAI_API_KEY'),
+        'OPENAI_BASE_URL': os.getenv('OPENAI_BASE_URL'),
         'CRYPTO_NAME': os.getenv('CRYPTO_NAME'),
+        'CRYPTO_NAMES': _split_list(os.getenv('CRYPTO_NAMES', '')),
+        'MAX_CONCURRENCY': int(os.getenv('MAX_CONCURRENCY', '8')),
         'ALERT_EMAIL': os.getenv('ALERT_EMAIL'),
+        'ALERT_EMAILS': _split_list(os.getenv('ALERT_EMAILS', '')),
+        'SENDER_EMAIL': os.getenv('SENDER_EMAIL'),
+        'SES_ENDPOINT_URL': os.getenv('SES_ENDPOINT_URL'),
+        'SES_MAX_SEND_RATE': float(os.getenv('SES_MAX_SEND_RATE', '1')),
+        'SES_MAX_CONCURRENCY': int(os.getenv('SES_MAX_CONCURRENCY', '4')),
+        'SEEN_INDEX_BACKEND': os.getenv('SEEN_INDEX_BACKEND', 'sqlite'),
+        'SEEN_INDEX_PATH': os.getenv('SEEN_INDEX_PATH', '/tmp/crypto_news_seen.sqlite3'),
+        'SEEN_INDEX_TABLE': os.getenv('SEEN_INDEX_TABLE'),
+        'SEEN_INDEX_TTL': float(os.getenv('SEEN_INDEX_TTL', str(2 * 24 * 3600))),
+        'SENTIMENT_BACKEND': os.getenv('SENTIMENT_BACKEND', 'sqlite'),
+        'SENTIMENT_PATH': os.getenv('SENTIMENT_PATH', '/tmp/crypto_news_sentiment.sqlite3'),
+        'SENTIMENT_TABLE': os.getenv('SENTIMENT_TABLE'),
+        'SENTIMENT_HALF_LIVES': [float(h) for h in _split_list(os.getenv('SENTIMENT_HALF_LIVES', '6,24,168'))],
+        'SENTIMENT_ALERT_HALF_LIFE': float(os.getenv('SENTIMENT_ALERT_HALF_LIFE', '24')),
+        'SENTIMENT_ALERT_THRESHOLD': float(os.getenv('SENTIMENT_ALERT_THRESHOLD', '0.6')),
+        'SENTIMENT_RESET_THRESHOLD': float(os.getenv('SENTIMENT_RESET_THRESHOLD', '0.4')),
+        'SENTIMENT_PRIOR_WEIGHT': float(os.getenv('SENTIMENT_PRIOR_WEIGHT', '0.5')),
+        'LLM_CACHE_SIZE': int(os.getenv('LLM_CACHE_SIZE', '256')),
+        'LLM_CACHE_TTL': float(os.getenv('LLM_CACHE_TTL', '3600')),
+        'LLM_CACHE_DIR': os.getenv('LLM_CACHE_DIR'),
+        'LLM_MAX_CONCURRENCY': int(os.getenv('LLM_MAX_CONCURRENCY', '4')),
+        'LLM_STREAM': os.getenv('LLM_STREAM', 'false').lower() == 'true',
+        'LLM_STREAM_EARLY_EXIT': os.getenv('LLM_STREAM_EARLY_EXIT', 'negative'),
+        'LLM_MODEL': os.getenv('LLM_MODEL', 'gpt-4o-mini'),
+        'LLM_STRUCTURED_OUTPUT': os.getenv('LLM_STRUCTURED_OUTPUT', 'false').lower() == 'true',
+        'LLM_REASONING_MAX_CHARS': int(os.getenv('LLM_REASONING_MAX_CHARS', '300')),
+        'LLM_MAX_COMPLETION_TOKENS': int(os.getenv('LLM_MAX_COMPLETION_TOKENS', '300')),
+        'LLM_CASCADE': _split_list(os.getenv('LLM_CASCADE', '')),
+        'LLM_CASCADE_MIN_CONFIDENCE': float(os.getenv('LLM_CASCADE_MIN_CONFIDENCE', '0.75')),
+        'LLM_CASCADE_ESCALATE_DROPS': os.getenv('LLM_CASCADE_ESCALATE_DROPS', 'true').lower() == 'true',
+        'SIMILARITY_CACHE': os.getenv('SIMILARITY_CACHE', 'false').lower() == 'true',
+        'SIMILARITY_THRESHOLD': float(os.getenv('SIMILARITY_THRESHOLD', '0.9')),
+        'SIMILARITY_MAX_AGE': float(os.getenv('SIMILARITY_MAX_AGE', str(6 * 3600))),
+        'SIMILARITY_DIR': os.getenv('SIMILARITY_DIR', '/tmp/crypto_news_similarity'),
+        'SIMILARITY_DIM': int(os.getenv('SIMILARITY_DIM', '1024')),
+        'SIMILARITY_MAX_ENTRIES': int(os.getenv('SIMILARITY_MAX_ENTRIES', '4096')),
+        'PROMPT_TOKEN_BUDGET': int(os.getenv('PROMPT_TOKEN_BUDGET', '6000')),
+        'PROMPT_ARTICLE_TOKENS': int(os.getenv('PROMPT_ARTICLE_TOKENS', '400')),
+        'RELEVANCE_THRESHOLD': float(os.getenv('RELEVANCE_THRESHOLD', '0.3')),
+        'DEDUP_MAX_DISTANCE': int(os.getenv('DEDUP_MAX_DISTANCE', '3')),
+        'ENRICH_CONTENT': os.getenv('ENRICH_CONTENT', 'false').lower() == 'true',
+        'ENRICH_MAX_CONCURRENCY': int(os.getenv('ENRICH_MAX_CONCURRENCY', '8')),
+        'ENRICH_PER_HOST': int(os.getenv('ENRICH_PER_HOST', '2')),
+        'ENRICH_TIMEOUT': float(os.getenv('ENRICH_TIMEOUT', '5')),
+        'ENRICH_MAX_BYTES': int(os.getenv('ENRICH_MAX_BYTES', str(512 * 1024))),
+        'ENRICH_MAX_CHARS': int(os.getenv('ENRICH_MAX_CHARS', '4000')),
+        'ENRICH_CACHE_SIZE': int(os.getenv('ENRICH_CACHE_SIZE', '512')),
+        'ENRICH_CACHE_TTL': float(os.getenv('ENRICH_CACHE_TTL', str(7 * 24 * 3600))),
+        'ENRICH_CACHE_DIR': os.getenv('ENRICH_CACHE_DIR', '/tmp/crypto_news_pages'),
+        'WORKER_INTERVAL': float(os.getenv('WORKER_INTERVAL', '3600')),
+        'WORKER_MIN_INTERVAL': float(os.getenv('WORKER_MIN_INTERVAL', '300')),
+        'WORKER_MAX_INTERVAL': float(os.getenv('WORKER_MAX_INTERVAL', str(6 * 3600))),
+        'WORKER_DAILY_QUOTA': int(os.getenv('WORKER_DAILY_QUOTA', '100')),
+        'WORKER_QUOTA_PATH': os.getenv('WORKER_QUOTA_PATH', '/tmp/crypto_news_worker_quota.sqlite3'),
+        'WORKER_TOP_K': int(os.getenv('WORKER_TOP_K', '10')),
+        'PRICE_STORE_DIR': os.getenv('PRICE_STORE_DIR', '/tmp/crypto_news_prices'),
+        'PRICE_LOOKBACK_HOURS': float(os.getenv('PRICE_LOOKBACK_HOURS', '24')),
+        'PRICE_MAX_STALENESS_HOURS': float(os.getenv('PRICE_MAX_STALENESS_HOURS', '2')),
+        'PRICE_FEED_DIR': os.getenv('PRICE_FEED_DIR'),
+        'PRICE_HORIZONS': [float(h) for h in _split_list(os.getenv('PRICE_HORIZONS', '1,3,7'))],
+        'PRICE_DROP_THRESHOLD': float(os.getenv('PRICE_DROP_THRESHOLD', '0')),
+        'RATE_LIMIT_BACKEND': os.getenv('RATE_LIMIT_BACKEND', 'local'),
+        'RATE_LIMIT_PATH': os.getenv('RATE_LIMIT_PATH', '/tmp/crypto_news_ratelimit.sqlite3'),
+        'RATE_LIMIT_TABLE': os.getenv('RATE_LIMIT_TABLE'),
+        'NEWS_API_REQUESTS_PER_WINDOW': int(os.getenv('NEWS_API_REQUESTS_PER_WINDOW', '0')),
+        'NEWS_API_RATE_WINDOW': float(os.getenv('NEWS_API_RATE_WINDOW', str(24 * 3600))),
+        'LLM_TOKENS_PER_MINUTE': int(os.getenv('LLM_TOKENS_PER_MINUTE', '0')),
+        'LLM_REQUESTS_PER_MINUTE': int(os.getenv('LLM_REQUESTS_PER_MINUTE', '0')),
+        'ASSET_PRIORITIES': {
+            name.strip().lower(): int(priority)
+            for name, priority in (item.split(':', 1) for item in _split_list(os.getenv('ASSET_PRIORITIES', '')))
+        },
+        'NEWS_API_TIMEOUT': float(os.getenv('NEWS_API_TIMEOUT', '10')),
+        'NEWS_API_HEDGE_PERCENTILE': float(os.getenv('NEWS_API_HEDGE_PERCENTILE', '95')),
+        'LLM_TIMEOUT': float(os.getenv('LLM_TIMEOUT', '30')),
+        'LLM_HEDGE_PERCENTILE': float(os.getenv('LLM_HEDGE_PERCENTILE', '0')),
+        'RETRY_MAX_ATTEMPTS': int(os.getenv('RETRY_MAX_ATTEMPTS', '3')),
+        'RETRY_BASE_DELAY': float(os.getenv('RETRY_BASE_DELAY', '0.5')),
+        'RETRY_MAX_DELAY': float(os.getenv('RETRY_MAX_DELAY', '8')),
+        'CIRCUIT_FAILURE_THRESHOLD': int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5')),
+        'CIRCUIT_RESET_TIMEOUT': float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30')),
+        'DEADLINE_SAFETY_MARGIN': float(os.getenv('DEADLINE_SAFETY_MARGIN', '2')),
+        'METRICS_ENABLED': os.getenv('METRICS_ENABLED', 'true').lower() == 'true',
+        'METRICS_NAMESPACE': os.getenv('METRICS_NAMESPACE', 'CryptoNews'),
     }
+    CONFIG_LOAD_SECONDS = time.perf_counter() - start
 
 # Load the configuration
 load_config()
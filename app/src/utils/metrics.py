@@ -0,0 +1,150 @@
+"""
+metrics.py
+
+This module records per-invocation metrics: the time spent in each stage of
+the pipeline, the OpenAI token usage and the cache hit rates. They are
+returned in the handler's response and emitted on stdout in the CloudWatch
+Embedded Metric Format (EMF), which CloudWatch turns into metrics from the
+Lambda logs.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# Stages of the pipeline, in order
+STAGES = ("config", "fetch", "filter", "enrich", "prompt", "model", "parse", "email")
+
+###########
+# Classes #
+###########
+
+class Metrics:
+    """
+    Thread-safe recorder of the timings and counters of one invocation.
+
+    Stage timings are summed over every asset and chunk of the invocation, so
+    a stage run in parallel can add up to more than the wall-clock duration.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._spans: Dict[str, list] = {}
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Times the enclosed block as part of the given stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        """Adds a duration, in seconds, to the given stage."""
+        with self._lock:
+            span = self._spans.setdefault(stage, [0, 0.0, 0.0])
+            span[0] += 1
+            span[1] += seconds
+            span[2] = max(span[2], seconds)
+
+    def count(self, name: str, value: float = 1) -> None:
+        """Adds a value to the given counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_usage(self, usage) -> None:
+        """Adds the token counts of an OpenAI `usage` object, if there is one."""
+        for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            value = getattr(usage, field, None)
+            if isinstance(value, int):
+                self.count(field, value)
+
+    def to_dict(self) -> dict:
+        """Returns the metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            stages = {
+                stage: {"count": count, "total_ms": round(total * 1000, 3), "max_ms": round(longest * 1000, 3)}
+                for stage, (count, total, longest) in sorted(
+                    self._spans.items(), key=lambda item: _stage_order(item[0])
+                )
+            }
+            counters = dict(self._counters)
+        return {
+            "duration_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "stages": stages,
+            "counters": counters,
+            "llm_cache_hit_rate": _hit_rate(counters, "llm_cache"),
+            "similarity_hit_rate": _hit_rate(counters, "similarity"),
+        }
+
+    def to_emf(self, namespace: str, dimensions: Optional[Dict[str, str]] = None) -> dict:
+        """
+        Returns the metrics as a CloudWatch Embedded Metric Format document.
+
+        Args:
+            namespace (str): The CloudWatch namespace of the metrics.
+            dimensions (dict): The dimension names and values of the metrics.
+
+        Returns:
+            dict: The EMF document, to be printed as a single JSON line.
+        """
+        dimensions = dimensions or {}
+        summary = self.to_dict()
+        values = {"duration_ms": (summary["duration_ms"], "Milliseconds")}
+        for stage, span in summary["stages"].items():
+            values[f"{stage}_ms"] = (span["total_ms"], "Milliseconds")
+        for name, value in summary["counters"].items():
+            values[name] = (value, "Count")
+        for rate in ("llm_cache_hit_rate", "similarity_hit_rate"):
+            if summary[rate] is not None:
+                values[rate] = (summary[rate] * 100, "Percent")
+
+        return {
+            "_aws": {
+                "Timestamp": int(self.started_at * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": namespace,
+                    "Dimensions": [list(dimensions)],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, (_, unit) in values.items()],
+                }],
+            },
+            **dimensions,
+            **{name: value for name, (value, _) in values.items()},
+        }
+
+    def emit(self, namespace: str, dimensions: Optional[Dict[str, str]] = None) -> None:
+        """Prints the metrics on stdout as one EMF JSON line."""
+        print(json.dumps(self.to_emf(namespace, dimensions), separators=(",", ":")), flush=True)
+
+
+# Metrics of the current invocation
+_metrics = Metrics()
+
+###########
+# Methods #
+###########
+
+def _stage_order(stage: str) -> tuple:
+    return (STAGES.index(stage) if stage in STAGES else len(STAGES), stage)
+
+def _hit_rate(counters: Dict[str, int], prefix: str) -> Optional[float]:
+    """Returns the rate of `<prefix>_hits` among hits and misses, or None without lookups."""
+    hits = counters.get(f"{prefix}_hits", 0)
+    lookups = hits + counters.get(f"{prefix}_misses", 0)
+    return hits / lookups if lookups else None
+
+def start_invocation() -> Metrics:
+    """Starts recording the metrics of a new invocation and returns them."""
+    global _metrics
+    _metrics = Metrics()
+    return _metrics
+
+def get_metrics() -> Metrics:
+    """Returns the metrics of the current invocation."""
+    return _metrics
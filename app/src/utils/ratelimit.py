@@ -0,0 +1,354 @@
+"""
+ratelimit.py
+
+This module provides a thread-safe token bucket used to keep calls within a
+service's rate limits, and a scheduler that shares request and token budgets
+across every asset, thread and, with a shared backend, process. Work waits
+for capacity instead of failing with 429s, and waiting work is served in
+priority order.
+"""
+
+import contextvars
+import heapq
+import itertools
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Dict, Iterator, Optional, Tuple
+from src.utils.config import CONFIG
+from src.utils.metrics import get_metrics
+from src.utils.resilience import DeadlineExceeded, remaining_time
+
+# Priority of the rate-limited work of the current context, higher first
+_priority = contextvars.ContextVar("rate_limit_priority", default=0)
+
+# Shared scheduler, created on first use
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+###########
+# Classes #
+###########
+
+class TokenBucket:
+    """
+    Token bucket refilled at a constant rate.
+
+    Args:
+        rate (float): The number of tokens added per second.
+        capacity (float): The maximum number of tokens, i.e. the allowed burst.
+                          Defaults to `rate`.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("The rate of a token bucket must be positive.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """
+        Takes tokens from the bucket if they are available.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the number of seconds
+                   to wait before they are available.
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}.")
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the tokens are available and takes them.
+
+        Args:
+            tokens (float): The number of tokens to take.
+            timeout (float): The maximum number of seconds to wait, or None to
+                             wait as long as needed.
+
+        Returns:
+            bool: Whether the tokens were taken before the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining < wait:
+                    return False
+            time.sleep(wait)
+
+
+class RateLimitBackend:
+    """Base class for the storage of the scheduler's token buckets.
+
+    Subclass it to share the budgets through another store.
+    """
+
+    def try_acquire(self, name: str, tokens: float, rate: float, capacity: float) -> float:
+        """
+        Takes tokens from a bucket if they are available.
+
+        Args:
+            name (str): The name of the bucket.
+            tokens (float): The number of tokens to take.
+            rate (float): The number of tokens added per second.
+            capacity (float): The maximum number of tokens.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the number of seconds
+                   to wait before they are available.
+        """
+        raise NotImplementedError
+
+
+class LocalRateBackend(RateLimitBackend):
+    """In-process backend, shared by the threads of one process."""
+
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, name: str, tokens: float, rate: float, capacity: float) -> float:
+        with self._lock:
+            bucket = self._buckets.get(name)
+            if bucket is None or bucket.rate != rate or bucket.capacity != capacity:
+                bucket = self._buckets[name] = TokenBucket(rate, capacity)
+        return bucket.try_acquire(tokens)
+
+
+class SQLiteRateBackend(RateLimitBackend):
+    """Local file backend based on SQLite, shared by the processes of one host."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def try_acquire(self, name: str, tokens: float, rate: float, capacity: float) -> float:
+        with self._lock:
+            # An immediate transaction locks the buckets against other processes
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._connection.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE name = ?", (name,)
+                ).fetchone()
+                available = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                wait = 0.0 if available >= tokens else (tokens - available) / rate
+                if wait == 0:
+                    available -= tokens
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (name, available, now)
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return wait
+
+
+class DynamoDBRateBackend(RateLimitBackend):
+    """Remote backend based on a DynamoDB table with a `bucket` partition key.
+
+    Buckets are updated with conditional writes, so concurrent Lambda
+    instances never take the same tokens.
+    """
+
+    # Conditional writes attempted before reporting contention as a short wait
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, table_name: str, region_name: str = 'us-east-1'):
+        import boto3
+        self._table = boto3.resource('dynamodb', region_name=region_name).Table(table_name)
+
+    def try_acquire(self, name: str, tokens: float, rate: float, capacity: float) -> float:
+        from botocore.exceptions import ClientError
+        for _ in range(self.MAX_ATTEMPTS):
+            now = time.time()
+            item = self._table.get_item(Key={'bucket': name}, ConsistentRead=True).get('Item')
+            if item is None:
+                available = capacity
+                condition = {'ConditionExpression': 'attribute_not_exists(#bucket)', 'ExpressionAttributeNames': {'#bucket': 'bucket'}}
+            else:
+                available = min(capacity, float(item['tokens']) + max(0.0, now - float(item['updated_at'])) * rate)
+                condition = {
+                    'ConditionExpression': '#updated_at = :updated_at',
+                    'ExpressionAttributeNames': {'#updated_at': 'updated_at'},
+                    'ExpressionAttributeValues': {':updated_at': item['updated_at']},
+                }
+            if available < tokens:
+                return (tokens - available) / rate
+            try:
+                self._table.put_item(
+                    Item={'bucket': name, 'tokens': Decimal(str(available - tokens)), 'updated_at': Decimal(str(now))},
+                    **condition
+                )
+                return 0.0
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
+        return 0.05
+
+
+class RateLimitScheduler:
+    """
+    Scheduler of rate-limited work over shared token buckets.
+
+    Each bucket is served in priority order: only the highest-priority
+    waiter, or the oldest among equals, takes tokens, and the others wait
+    behind it. The backend is called outside of the scheduler's lock, so a
+    slow backend only holds up the waiters of its own bucket.
+
+    Args:
+        backend (RateLimitBackend): The storage of the buckets.
+        limits (dict): The `(rate, capacity)` of each bucket, with the rate in
+                       tokens per second. Buckets without a positive rate are
+                       not limited.
+    """
+
+    def __init__(self, backend: RateLimitBackend, limits: Dict[str, Tuple[float, float]]):
+        self.backend = backend
+        self.limits = {name: limit for name, limit in limits.items() if limit and limit[0] > 0}
+        self._condition = threading.Condition()
+        self._waiters: Dict[str, list] = {}
+        self._sequence = itertools.count()
+
+    def acquire(self, bucket: str, tokens: float = 1, priority: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until tokens are available in a bucket and takes them.
+
+        Args:
+            bucket (str): The name of the bucket.
+            tokens (float): The number of tokens to take, capped to the capacity.
+            priority (int): The priority of the work. Defaults to the priority
+                            of the current context, see `rate_limit_priority`.
+            timeout (float): The maximum number of seconds to wait, or None to
+                             wait as long as needed.
+
+        Returns:
+            bool: Whether the tokens were taken before the timeout.
+        """
+        limit = self.limits.get(bucket)
+        if limit is None:
+            return True
+        rate, capacity = limit
+        tokens = min(tokens, capacity)
+        priority = _priority.get() if priority is None else priority
+        entry = (-priority, next(self._sequence))
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._condition:
+            waiters = self._waiters.setdefault(bucket, [])
+            heapq.heappush(waiters, entry)
+            # A new head of the queue must take over
+            self._condition.notify_all()
+        try:
+            while True:
+                with self._condition:
+                    while waiters[0] != entry:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            return False
+                        self._condition.wait(remaining)
+
+                # The backend may be remote, so it is called without blocking the other buckets
+                wait = self.backend.try_acquire(bucket, tokens, rate, capacity)
+                if wait <= 0:
+                    return True
+
+                with self._condition:
+                    if deadline is not None and wait > deadline - time.monotonic():
+                        return False
+                    # Woken early if a higher-priority waiter takes over
+                    self._condition.wait(wait)
+        finally:
+            with self._condition:
+                waiters.remove(entry)
+                heapq.heapify(waiters)
+                self._condition.notify_all()
+            waited = time.monotonic() - start
+            if waited > 0.001:
+                get_metrics().add_time("rate_limit", waited)
+
+###########
+# Methods #
+###########
+
+@contextmanager
+def rate_limit_priority(priority: int) -> Iterator[None]:
+    """Sets the priority of the rate-limited work done in the block."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority() -> int:
+    """Returns the priority of the rate-limited work of the current context."""
+    return _priority.get()
+
+def asset_priority(asset: str) -> int:
+    """Returns the priority of an asset from `ASSET_PRIORITIES`, 0 by default."""
+    return (CONFIG.get('ASSET_PRIORITIES') or {}).get((asset or "").lower(), 0)
+
+def get_scheduler() -> RateLimitScheduler:
+    """Returns the shared rate-limit scheduler, created on first use from the configuration."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                backend_name = CONFIG.get('RATE_LIMIT_BACKEND', 'local')
+                if backend_name == 'local':
+                    backend = LocalRateBackend()
+                elif backend_name == 'sqlite':
+                    backend = SQLiteRateBackend(CONFIG.get('RATE_LIMIT_PATH', '/tmp/crypto_news_ratelimit.sqlite3'))
+                elif backend_name == 'dynamodb':
+                    backend = DynamoDBRateBackend(CONFIG.get('RATE_LIMIT_TABLE'))
+                else:
+                    raise ValueError(f"Unknown rate limit backend: {backend_name}")
+
+                news_requests = CONFIG.get('NEWS_API_REQUESTS_PER_WINDOW', 0)
+                news_window = CONFIG.get('NEWS_API_RATE_WINDOW', 24 * 3600)
+                llm_tokens = CONFIG.get('LLM_TOKENS_PER_MINUTE', 0)
+                llm_requests = CONFIG.get('LLM_REQUESTS_PER_MINUTE', 0)
+                _scheduler = RateLimitScheduler(backend, {
+                    "news_requests": (news_requests / news_window, news_requests),
+                    "llm_tokens": (llm_tokens / 60, llm_tokens),
+                    "llm_requests": (llm_requests / 60, llm_requests),
+                })
+    return _scheduler
+
+def wait_for_capacity(bucket: str, tokens: float = 1) -> None:
+    """
+    Waits for capacity in a bucket of the shared scheduler, at most until the
+    Lambda deadline.
+
+    Raises:
+        DeadlineExceeded: If there is no capacity before the deadline.
+    """
+    if not get_scheduler().acquire(bucket, tokens, timeout=remaining_time()):
+        raise DeadlineExceeded(f"No {bucket} capacity left before the Lambda deadline.")
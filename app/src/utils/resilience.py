@@ -0,0 +1,263 @@
+"""
+resilience.py
+
+This module provides the resilience layer shared by the NewsAPI and OpenAI
+calls: per-call deadlines derived from the remaining Lambda time, retries
+with jittered exponential backoff, optional hedged requests and a circuit
+breaker.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar('T')
+
+# Absolute deadline (time.monotonic()) of the current invocation, if any
+_deadline = None
+
+# Threads used to run hedged requests
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+###########
+# Classes #
+###########
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when there is no time left for a call before the Lambda times out."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is rejected because the service's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker that stops calling a failing service for a while.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    are rejected. After `reset_timeout` seconds one trial call is let through:
+    it closes the circuit on success and re-opens it on failure.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """The state of the circuit: "closed", "open" or "half-open"."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> None:
+        """Raises `CircuitOpenError` if a call may not be made now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at >= self.reset_timeout and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        raise CircuitOpenError(f"Circuit for {self.name} is open after {self._failures} consecutive failures.")
+
+    def release(self) -> None:
+        """Ends a call that tells nothing about the health of the service, e.g. a rejected request."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.failure_threshold or self._opened_at is not None:
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Keeps the most recent call latencies of a service to compute percentiles."""
+
+    def __init__(self, window: int = 200):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Returns the given percentile of the recorded latencies, in seconds."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(percentile / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+
+class ResiliencePolicy:
+    """
+    Resilience settings and state for calls to one service.
+
+    Args:
+        name (str): The name of the service.
+        timeout (float): The maximum duration of a single call, in seconds.
+        max_attempts (int): The maximum number of attempts per call.
+        base_delay (float): The base delay of the exponential backoff, in seconds.
+        max_delay (float): The maximum delay between attempts, in seconds.
+        hedge_percentile (float): The latency percentile after which a second,
+                                  hedged request is sent, or 0 to disable hedging.
+        is_retryable (callable): Returns whether an exception may be retried.
+        breaker (CircuitBreaker): The circuit breaker of the service.
+    """
+
+    # Minimum number of recorded latencies before hedging kicks in
+    MIN_HEDGE_SAMPLES = 20
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float = 30.0,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        hedge_percentile: float = 0.0,
+        is_retryable: Callable[[Exception], bool] = lambda e: False,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_percentile = hedge_percentile
+        self.is_retryable = is_retryable
+        self.breaker = breaker or CircuitBreaker(name)
+        self.latencies = LatencyTracker()
+
+    def call(self, fn: Callable[[float], T], hedge: bool = True) -> T:
+        """
+        Calls `fn(timeout)` with retries, hedging and the circuit breaker.
+
+        Args:
+            fn (callable): The call to make. It receives the timeout of the
+                           attempt, in seconds.
+            hedge (bool): Whether the call may be hedged. Only idempotent
+                          calls should be hedged.
+
+        Returns:
+            The result of the first successful attempt.
+        """
+        for attempt in range(self.max_attempts):
+            # Before `allow`, which may hand out the only trial of a half-open circuit
+            timeout = call_timeout(self.timeout)
+            self.breaker.allow()
+            try:
+                result = self._attempt(fn, timeout, hedge)
+            except Exception as e:
+                # Only transient errors count against the service, and other
+                # errors do not prove that it recovered
+                if not self.is_retryable(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_attempts - 1:
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                remaining = remaining_time()
+                if remaining is not None and delay >= remaining:
+                    raise
+                time.sleep(delay)
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    def _attempt(self, fn: Callable[[float], T], timeout: float, hedge: bool) -> T:
+        hedge_after = None
+        if hedge and self.hedge_percentile and len(self.latencies) >= self.MIN_HEDGE_SAMPLES:
+            hedge_after = self.latencies.percentile(self.hedge_percentile)
+
+        start = time.monotonic()
+        if hedge_after is None or hedge_after >= timeout:
+            result = fn(timeout)
+            self.latencies.record(time.monotonic() - start)
+            return result
+
+        # Send a second request if the first one is slower than usual, and
+        # return whichever succeeds first
+        pending = {_hedge_executor.submit(fn, timeout)}
+        done, pending = wait(pending, timeout=hedge_after)
+        if not done:
+            pending.add(_hedge_executor.submit(fn, max(0.001, timeout - hedge_after)))
+        error = None
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    self.latencies.record(time.monotonic() - start)
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                raise error
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+###########
+# Methods #
+###########
+
+def set_deadline(context, safety_margin: float = 2.0) -> None:
+    """
+    Sets the deadline of the current invocation from the Lambda context.
+
+    Args:
+        context: The Lambda context, or None when running locally.
+        safety_margin (float): Seconds kept free to return a response.
+    """
+    global _deadline
+    get_remaining = getattr(context, 'get_remaining_time_in_millis', None)
+    if get_remaining is None:
+        _deadline = None
+    else:
+        _deadline = time.monotonic() + get_remaining() / 1000 - safety_margin
+
+def remaining_time() -> Optional[float]:
+    """Returns the seconds left before the deadline, or None without a deadline."""
+    if _deadline is None:
+        return None
+    return _deadline - time.monotonic()
+
+def call_timeout(timeout: float) -> float:
+    """
+    Returns the timeout of a call, capped by the time left before the deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("No time left before the Lambda deadline.")
+    return min(timeout, remaining)
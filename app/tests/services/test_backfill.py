@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from src.services.news import Article, ArticleBatch
+from src.services.backfill import (
+    BackfillCheckpoint,
+    date_range,
+    run_backfill,
+    write_columns,
+)
+
+def fetch(query, date, top_k):
+    if query == "Dogecoin" and date.day == 2:
+        raise Exception("NewsAPI down")
+    return ArticleBatch.from_articles([
+        Article(title=f"{query} news", description="D", content="C", publishedAt=date.strftime('%Y-%m-%d'))
+    ])
+
+###########
+#  Tests  #
+###########
+
+@patch.dict("src.services.backfill.CONFIG", {"RELEVANCE_THRESHOLD": 0.0})
+@patch("src.services.backfill.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": True})
+@patch("src.services.backfill.fetch_article_batch", side_effect=fetch)
+class TestBackfill(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.tmpdir.name, "checkpoint.jsonl")
+        self.dates = date_range(datetime(2025, 1, 1), datetime(2025, 1, 3))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_grid_is_analyzed(self, mock_fetch, mock_analyze):
+        rows = run_backfill(["Bitcoin", "Dogecoin"], self.dates, BackfillCheckpoint(self.checkpoint_path), rate=None)
+
+        self.assertEqual([(row["asset"], row["date"]) for row in rows][:3], [
+            ("Bitcoin", "2025-01-01"), ("Bitcoin", "2025-01-02"), ("Bitcoin", "2025-01-03"),
+        ])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]["status"], "ok")
+        self.assertTrue(rows[0]["value_will_drop"])
+        self.assertEqual(rows[4]["status"], "error")
+        self.assertEqual(rows[4]["error"], "NewsAPI down")
+
+    def test_resume_skips_finished_cells(self, mock_fetch, mock_analyze):
+        run_backfill(["Bitcoin", "Dogecoin"], self.dates, BackfillCheckpoint(self.checkpoint_path), rate=None)
+        self.assertEqual(mock_analyze.call_count, 5)
+
+        # Only the failed cell is retried
+        rows = run_backfill(["Bitcoin", "Dogecoin"], self.dates, BackfillCheckpoint(self.checkpoint_path), rate=None)
+        self.assertEqual(mock_analyze.call_count, 5)
+        self.assertEqual(mock_fetch.call_count, 7)
+        self.assertEqual(len(rows), 6)
+
+    def test_truncated_checkpoint_line_is_ignored(self, mock_fetch, mock_analyze):
+        run_backfill(["Bitcoin"], self.dates[:1], BackfillCheckpoint(self.checkpoint_path), rate=None)
+        with open(self.checkpoint_path, "a") as file:
+            file.write('{"asset": "Bitcoin", "da')
+
+        checkpoint = BackfillCheckpoint(self.checkpoint_path)
+        self.assertIn(("Bitcoin", "2025-01-01"), checkpoint)
+        self.assertEqual(len(checkpoint.results), 1)
+
+    def test_cell_recorded_after_a_truncated_line_is_readable(self, mock_fetch, mock_analyze):
+        run_backfill(["Bitcoin"], self.dates[:1], BackfillCheckpoint(self.checkpoint_path), rate=None)
+        with open(self.checkpoint_path, "a") as file:
+            file.write('{"asset": "Bitcoin", "da')
+
+        run_backfill(["Bitcoin"], self.dates[:2], BackfillCheckpoint(self.checkpoint_path), rate=None)
+
+        checkpoint = BackfillCheckpoint(self.checkpoint_path)
+        self.assertEqual(set(checkpoint.results), {("Bitcoin", "2025-01-01"), ("Bitcoin", "2025-01-02")})
+        self.assertEqual(mock_analyze.call_count, 2)
+
+    def test_write_columns(self, mock_fetch, mock_analyze):
+        rows = run_backfill(["Bitcoin"], self.dates, BackfillCheckpoint(self.checkpoint_path), rate=None)
+        output_path = os.path.join(self.tmpdir.name, "output.json")
+
+        write_columns(rows, output_path)
+
+        with open(output_path) as file:
+            columns = json.load(file)
+        self.assertEqual(columns["date"], ["2025-01-01", "2025-01-02", "2025-01-03"])
+        self.assertEqual(columns["articles_analyzed"], [1, 1, 1])
+        self.assertEqual(len(columns["reasoning"]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
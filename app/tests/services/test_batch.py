@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from src.services.news import Article
+from src.services.batch import (
+    LocalBatchClient,
+    make_custom_id,
+    read_batch_results,
+    run_batch,
+    write_batch_file,
+)
+
+def make_articles(prefix: str):
+    return [
+        Article(title=f"{prefix} title", description="D", content="C", publishedAt="2025-01-10", url=f"https://{prefix}")
+    ]
+
+###########
+#  Tests  #
+###########
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmpdir.name, "input.jsonl")
+        self.output_path = os.path.join(self.tmpdir.name, "output.jsonl")
+        self.date = datetime(2025, 1, 10)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_write_batch_file(self):
+        jobs = [
+            ("Bitcoin", self.date, make_articles("a")),
+            ("Ethereum", self.date, []),
+            ("Ethereum", self.date, make_articles("b")),
+        ]
+        custom_ids = write_batch_file(jobs, self.input_path)
+
+        with open(self.input_path) as file:
+            lines = [json.loads(line) for line in file]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual([line["custom_id"] for line in lines], custom_ids)
+        self.assertTrue(custom_ids[0].startswith("Bitcoin|2025-01-10|"))
+        self.assertEqual(lines[0]["url"], "/v1/chat/completions")
+        self.assertIn("a title", lines[0]["body"]["messages"][1]["content"])
+
+    def test_run_batch_matches_results_by_custom_id(self):
+        def responder(body):
+            prompt = body["messages"][1]["content"]
+            if "c title" in prompt:
+                raise Exception("rate limited")
+            value_will_drop = "a title" in prompt
+            return '```json\n{"Reasoning": "R", "ValueWillDrop": %s}\n```' % str(value_will_drop).lower()
+
+        jobs = [
+            ("Bitcoin", self.date, make_articles("a")),
+            ("Ethereum", self.date, make_articles("b")),
+            ("Solana", self.date, make_articles("c")),
+        ]
+        results = run_batch(jobs, LocalBatchClient(responder, self.output_path), self.input_path)
+
+        self.assertTrue(results[make_custom_id("Bitcoin", self.date, jobs[0][2])]["ValueWillDrop"])
+        self.assertFalse(results[make_custom_id("Ethereum", self.date, jobs[1][2])]["ValueWillDrop"])
+        self.assertIn("error", results[make_custom_id("Solana", self.date, jobs[2][2])])
+
+    @patch.dict("src.services.batch.CONFIG", {"LLM_MODEL": "gpt-4.1-mini"})
+    def test_requests_use_the_configured_model_and_budget(self):
+        articles = [
+            Article(title=f"Story {i}", description="D " * 200, content="C", publishedAt="2025-01-10", url=f"https://{i}")
+            for i in range(6)
+        ]
+        def responder(body):
+            value_will_drop = "Story 5" in body["messages"][1]["content"]
+            return '{"Reasoning": "R", "ValueWillDrop": %s}' % str(value_will_drop).lower()
+
+        with patch.dict("src.services.llm.CONFIG", {"PROMPT_TOKEN_BUDGET": 600, "PROMPT_ARTICLE_TOKENS": None}):
+            custom_ids = write_batch_file([("Bitcoin", self.date, articles)], self.input_path)
+            results = run_batch([("Bitcoin", self.date, articles)], LocalBatchClient(responder, self.output_path), self.input_path)
+
+        with open(self.input_path) as file:
+            lines = [json.loads(line) for line in file]
+        self.assertGreater(len(lines), 1)
+        self.assertEqual({line["body"]["model"] for line in lines}, {"gpt-4.1-mini"})
+        # The verdicts of the chunks are combined into one, weighted by their articles
+        custom_id = make_custom_id("Bitcoin", self.date, articles)
+        self.assertTrue(all(chunk_id.startswith(custom_id + "#") for chunk_id in custom_ids))
+        self.assertEqual(list(results), [custom_id])
+        self.assertFalse(results[custom_id]["ValueWillDrop"])
+
+    def test_read_batch_results_invalid_response(self):
+        line = json.dumps({
+            "custom_id": "x",
+            "error": None,
+            "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "not json"}}]}},
+        })
+        self.assertIn("error", read_batch_results([line])["x"])
+
+
+if __name__ == "__main__":
+    unittest.main()
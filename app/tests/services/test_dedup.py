@@ -0,0 +1,79 @@
+import unittest
+from src.services.news import Article, ArticleBatch
+from src.services.dedup import cluster_articles, deduplicate_articles, simhash, shingles
+from src.services.llm import format_article
+
+WIRE_STORY = (
+    "Bitcoin fell sharply on Tuesday after regulators announced a new investigation into "
+    "several major cryptocurrency exchanges, sending prices to their lowest level in weeks "
+    "as traders rushed to reduce their exposure to digital assets."
+)
+
+def make_article(title: str, content: str, source: str) -> Article:
+    return Article(
+        title=title,
+        description=None,
+        content=content,
+        publishedAt="2025-01-10",
+        source={"id": None, "name": source},
+    )
+
+###########
+#  Tests  #
+###########
+
+class TestDeduplicate(unittest.TestCase):
+
+    def test_syndicated_copies_are_merged(self):
+        articles = [
+            make_article("Bitcoin falls on exchange probe", WIRE_STORY, "Reuters"),
+            make_article("ETF inflows hit a record", "Spot bitcoin funds took in record inflows this week.", "CoinDesk"),
+            make_article("Bitcoin falls on exchange probe", WIRE_STORY, "Yahoo Entertainment"),
+            make_article("Bitcoin falls on exchange probe", WIRE_STORY.replace("Tuesday", "Tuesday,"), "MSN"),
+        ]
+
+        result = deduplicate_articles(articles)
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0].source["name"], "Reuters")
+        self.assertEqual(result[0].source_count, 3)
+        self.assertEqual(result[1].source_count, 1)
+
+    def test_batch_is_deduplicated_by_columns(self):
+        articles = [
+            make_article("Bitcoin falls on exchange probe", WIRE_STORY, "Reuters"),
+            make_article("ETF inflows hit a record", "Spot bitcoin funds took in record inflows this week.", "CoinDesk"),
+            make_article("Bitcoin falls on exchange probe", WIRE_STORY, "Yahoo Entertainment"),
+        ]
+
+        result = deduplicate_articles(ArticleBatch.from_articles(articles))
+
+        self.assertIsInstance(result, ArticleBatch)
+        self.assertEqual(result.source_names, ["Reuters", "CoinDesk"])
+        self.assertEqual(result.source_counts, [2, 1])
+        # The input articles are left untouched
+        self.assertEqual(articles[0].source_count, 1)
+
+    def test_distinct_stories_are_kept(self):
+        articles = [
+            make_article(f"Story {i}", f"Completely different story number {i} about topic {i * 7}", "Source")
+            for i in range(50)
+        ]
+        self.assertEqual(len(cluster_articles(articles)), 50)
+
+    def test_simhash_is_locality_sensitive(self):
+        base = simhash(shingles(WIRE_STORY))
+        near = simhash(shingles(WIRE_STORY + " Analysts expect"))
+        far = simhash(shingles("Ethereum developers scheduled the next network upgrade for March"))
+        self.assertLess(bin(base ^ near).count("1"), bin(base ^ far).count("1"))
+
+    def test_source_count_is_included_in_prompt(self):
+        merged = deduplicate_articles([
+            make_article("Bitcoin falls on exchange probe", WIRE_STORY, "Reuters"),
+            make_article("Bitcoin falls on exchange probe", WIRE_STORY, "MSN"),
+        ])
+        self.assertIn("Sources: 2", format_article(merged[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
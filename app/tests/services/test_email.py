@@ -1,7 +1,35 @@
+import threading
+import time
 import unittest
 from unittest.mock import patch
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
-from src.services.email import send_email_alert
+from src.services.email import DigestDeliveryError, get_send_rate_limiter, send_email_alert, send_digest
+from src.utils.ratelimit import TokenBucket
+
+class FakeSES:
+    """Local stand-in for the SES SendEmail API."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def send_email(self, Source, Destination, Message):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+            self.calls.append({"Source": Source, "Destination": Destination, "Message": Message, "at": time.monotonic()})
+            return {"MessageId": f"id-{len(self.calls)}"}
+
+ALERTS = [
+    {"asset": "Bitcoin", "reasoning": "Exchange hack", "articles_analyzed": 12},
+    {"asset": "Ethereum", "reasoning": "ETF outflows", "articles_analyzed": 3},
+]
 
 ###########
 #  Tests  #
@@ -9,21 +37,24 @@ from src.services.email import send_email_alert
 
 class TestSendEmailAlert(unittest.TestCase):
 
-    @patch("src.services.email.ses_client")
-    def test_send_email_alert_success(self, mock_ses):
+    @patch("src.services.email.get_ses_client")
+    def test_send_email_alert_success(self, mock_get_ses):
+        mock_ses = mock_get_ses.return_value
         mock_ses.send_email.return_value = {"MessageId": "test-id"}
         response = send_email_alert("Justification text", "Bitcoin")
         self.assertIsNotNone(response)
         self.assertIn("MessageId", response)
 
-    @patch("src.services.email.ses_client")
-    def test_send_email_alert_no_credentials(self, mock_ses):
+    @patch("src.services.email.get_ses_client")
+    def test_send_email_alert_no_credentials(self, mock_get_ses):
+        mock_ses = mock_get_ses.return_value
         mock_ses.send_email.side_effect = NoCredentialsError()
         response = send_email_alert("Justification text", "Ethereum")
         self.assertIsNone(response)
 
-    @patch("src.services.email.ses_client")
-    def test_send_email_alert_partial_credentials(self, mock_ses):
+    @patch("src.services.email.get_ses_client")
+    def test_send_email_alert_partial_credentials(self, mock_get_ses):
+        mock_ses = mock_get_ses.return_value
         mock_ses.send_email.side_effect = PartialCredentialsError(
             provider="test",
             cred_var="test_var",
@@ -31,6 +62,114 @@ class TestSendEmailAlert(unittest.TestCase):
         response = send_email_alert("Justification text", "Litecoin")
         self.assertIsNone(response)
 
+    @patch("src.services.email.get_ses_client")
+    def test_send_email_alert_articles_analyzed(self, mock_get_ses):
+        send_email_alert("Justification text", "Bitcoin", articles_analyzed=7)
+        body = mock_get_ses.return_value.send_email.call_args.kwargs["Message"]["Body"]["Text"]["Data"]
+        self.assertIn("News articles analyzed: 7", body)
+
+    @patch.dict("src.services.email.CONFIG", {"PRICE_LOOKBACK_HOURS": 24})
+    @patch("src.services.email.get_ses_client")
+    def test_send_email_alert_price_move(self, mock_get_ses):
+        send_email_alert("Justification text", "Bitcoin", price_move=-0.042)
+        body = mock_get_ses.return_value.send_email.call_args.kwargs["Message"]["Body"]["Text"]["Data"]
+        self.assertIn("Actual price move: -4.20% over the last 24h", body)
+
+
+@patch.dict("src.services.email.CONFIG", {"SENDER_EMAIL": "alerts@example.com", "SES_MAX_CONCURRENCY": 4})
+class TestSendDigest(unittest.TestCase):
+
+    def setUp(self):
+        self.ses = FakeSES(latency=0.05)
+        patcher = patch("src.services.email.get_ses_client", return_value=self.ses)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        limiter = patch("src.services.email.get_send_rate_limiter", return_value=TokenBucket(rate=1000, capacity=1000))
+        limiter.start()
+        self.addCleanup(limiter.stop)
+
+    def test_one_digest_for_all_assets(self):
+        responses = send_digest(ALERTS, {"a@example.com": None, "b@example.com": None})
+
+        self.assertEqual(len(responses), 1)
+        call = self.ses.calls[0]
+        self.assertEqual(call["Destination"]["BccAddresses"], ["a@example.com", "b@example.com"])
+        body = call["Message"]["Body"]["Text"]["Data"]
+        self.assertIn("== Bitcoin ==", body)
+        self.assertIn("News articles analyzed: 12", body)
+        self.assertIn("ETF outflows", body)
+
+    def test_digest_includes_price_moves(self):
+        alerts = [{**ALERTS[0], "price_move": 0.015}] + ALERTS[1:]
+        send_digest(alerts, {"a@example.com": None})
+
+        body = self.ses.calls[0]["Message"]["Body"]["Text"]["Data"]
+        self.assertEqual(body.count("Actual price move:"), 1)
+        self.assertIn("Actual price move: +1.50%", body)
+
+    def test_digest_per_subscription(self):
+        send_digest(ALERTS, {"a@example.com": ["bitcoin"], "b@example.com": ["Solana"], "c@example.com": None})
+
+        self.assertEqual(len(self.ses.calls), 2)
+        bodies = {tuple(c["Destination"]["BccAddresses"]): c["Message"]["Body"]["Text"]["Data"] for c in self.ses.calls}
+        self.assertNotIn("Ethereum", bodies[("a@example.com",)])
+        self.assertIn("Ethereum", bodies[("c@example.com",)])
+
+    @patch("builtins.print")
+    def test_failed_calls_report_their_assets(self, mock_print):
+        send_email = self.ses.send_email
+        def send_or_fail(**kwargs):
+            if kwargs["Destination"]["BccAddresses"] == ["b@example.com"]:
+                raise NoCredentialsError()
+            return send_email(**kwargs)
+        self.ses.send_email = send_or_fail
+
+        with self.assertRaises(DigestDeliveryError) as raised:
+            send_digest(ALERTS, {"a@example.com": ["bitcoin"], "b@example.com": ["ethereum"]})
+
+        self.assertEqual(raised.exception.undelivered, frozenset({"Ethereum"}))
+        self.assertEqual([c["Destination"]["BccAddresses"] for c in self.ses.calls], [["a@example.com"]])
+
+    def test_large_recipient_lists_are_batched_concurrently(self):
+        recipients = {f"user{i}@example.com": None for i in range(200)}
+
+        send_digest(ALERTS, recipients)
+
+        self.assertEqual(len(self.ses.calls), 5)
+        self.assertTrue(all(len(c["Destination"]["BccAddresses"]) <= 49 for c in self.ses.calls))
+        self.assertGreater(self.ses.max_in_flight, 1)
+
+    def test_send_rate_is_limited(self):
+        bucket = TokenBucket(rate=100, capacity=50)
+        with patch("src.services.email.get_send_rate_limiter", return_value=bucket):
+            start = time.monotonic()
+            send_digest(ALERTS, {f"user{i}@example.com": None for i in range(98)})
+        # 100 recipients (98 + 2 senders) at 100/s, with a burst of 50
+        self.assertGreaterEqual(time.monotonic() - start, 0.45)
+
+    def test_batches_fit_in_the_send_rate(self):
+        bucket = TokenBucket(rate=20, capacity=20)
+        with patch("src.services.email.get_send_rate_limiter", return_value=bucket):
+            start = time.monotonic()
+            send_digest(ALERTS, {f"user{i}@example.com": None for i in range(38)})
+
+        # 40 recipients (38 + 2 senders) at 20/s, with a burst of 20
+        self.assertEqual(len(self.ses.calls), 2)
+        self.assertTrue(all(len(c["Destination"]["BccAddresses"]) == 19 for c in self.ses.calls))
+        self.assertGreaterEqual(time.monotonic() - start, 0.95)
+
+    @patch.dict("src.services.email.CONFIG", {"SES_MAX_SEND_RATE": 1})
+    def test_slowest_send_rate_sends_one_recipient_per_call(self):
+        with patch("src.services.email._send_rate_limiter", None):
+            limiter = get_send_rate_limiter()
+        self.assertEqual(limiter.capacity, 1)
+
+        bucket = TokenBucket(rate=100, capacity=1)
+        with patch("src.services.email.get_send_rate_limiter", return_value=bucket):
+            send_digest(ALERTS, {"a@example.com": None, "b@example.com": None})
+
+        self.assertEqual(sorted(c["Destination"]["BccAddresses"] for c in self.ses.calls), [["a@example.com"], ["b@example.com"]])
+
 
 if __name__ == "__main__":
     unittest.main()
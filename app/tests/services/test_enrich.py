@@ -0,0 +1,202 @@
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from src.services.llm import ResponseCache
+from src.services.news import Article, ArticleBatch
+from src.services.enrich import (
+    MainTextExtractor,
+    enrich_articles,
+    extract_main_text,
+    fetch_full_text,
+)
+
+PARAGRAPH = "Bitcoin fell sharply after regulators announced a new investigation into exchanges."
+
+PAGE = f"""
+<html><head><script>var tracking = "<p>not text</p>";</script><style>p {{ color: red; }}</style></head>
+<body>
+  <nav><p>Home | Markets | Crypto | Subscribe to our newsletter today</p></nav>
+  <p>Sidebar teaser paragraph that is long enough to be kept as text.</p>
+  <article>
+    <p>By Staff</p>
+    <p>{PARAGRAPH}</p>
+    <p>Traders moved &amp; reduced their exposure to digital assets across the board.
+  </article>
+  <footer><p>Copyright notice that is long enough to be kept as a paragraph.</p></footer>
+</body></html>
+"""
+
+def make_article(url: str, content: str = "Truncated content [+1200 chars]") -> Article:
+    return Article(title="Bitcoin falls", description="D", content=content, publishedAt="2025-01-10", url=url)
+
+def make_response(html: str, content_type: str = "text/html; charset=utf-8", encoding: str = "utf-8"):
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.headers = {"Content-Type": content_type}
+    response.encoding = "utf-8"
+    data = html.encode(encoding)
+    response.iter_content.side_effect = lambda chunk_size: (data[i:i + 64] for i in range(0, len(data), 64))
+    return response
+
+###########
+#  Tests  #
+###########
+
+class TestMainTextExtractor(unittest.TestCase):
+
+    def test_article_paragraphs_are_preferred(self):
+        extractor = MainTextExtractor()
+        extractor.feed(PAGE)
+        extractor.close()
+
+        paragraphs = extractor.text.split("\n\n")
+        self.assertEqual(paragraphs[0], PARAGRAPH)
+        self.assertEqual(paragraphs[1], "Traders moved & reduced their exposure to digital assets across the board.")
+        self.assertEqual(len(paragraphs), 2)
+
+    def test_page_without_article_uses_every_paragraph(self):
+        extractor = MainTextExtractor()
+        extractor.feed(f"<div><p>{PARAGRAPH}</p><nav><p>{PARAGRAPH} menu</p></nav><p>{PARAGRAPH}</p></div>")
+        extractor.close()
+        self.assertEqual(extractor.text, f"{PARAGRAPH}\n\n{PARAGRAPH}")
+
+    def test_reading_stops_at_max_chars(self):
+        read = []
+        def chunks():
+            for _ in range(1000):
+                chunk = f"<p>{PARAGRAPH}</p>".encode("utf-8")
+                read.append(chunk)
+                yield chunk
+
+        text = extract_main_text(chunks(), max_bytes=10 ** 6, max_chars=200)
+
+        self.assertEqual(len(text), 200)
+        self.assertLess(len(read), 10)
+
+    def test_reading_stops_at_max_bytes(self):
+        chunks = [f"<p>{PARAGRAPH} {i}</p>".encode("utf-8") for i in range(100)]
+        text = extract_main_text(iter(chunks), max_bytes=len(chunks[0]) * 2, max_chars=10 ** 6)
+        self.assertEqual(text, f"{PARAGRAPH} 0\n\n{PARAGRAPH} 1")
+
+
+@patch.dict("src.services.enrich.CONFIG", {"ENRICH_PER_HOST": 2, "ENRICH_MAX_CHARS": 4000})
+class TestEnrichArticles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(directory=self.tmpdir.name)
+        patcher = patch("src.services.enrich._page_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    @patch("src.services.enrich.http_session.get")
+    def test_pages_are_downloaded_once(self, mock_get):
+        mock_get.side_effect = lambda url, **kwargs: make_response(PAGE)
+
+        first = fetch_full_text("https://news.example.com/a")
+        second = fetch_full_text("https://news.example.com/a")
+
+        self.assertTrue(first.startswith(PARAGRAPH))
+        self.assertEqual(first, second)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertTrue(mock_get.call_args.kwargs["stream"])
+
+        # The disk tier survives a new cache, e.g. a new container
+        with patch("src.services.enrich._page_cache", ResponseCache(directory=self.tmpdir.name)):
+            self.assertEqual(fetch_full_text("https://news.example.com/a"), first)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch("builtins.print")
+    @patch("src.services.enrich.http_session.get", side_effect=Exception("timeout"))
+    def test_failed_downloads_keep_the_content(self, mock_get, mock_print):
+        articles = [make_article("https://news.example.com/a")]
+
+        result = enrich_articles(articles)
+
+        self.assertIs(result[0], articles[0])
+        # Errors are not cached, so the page is retried on the next run
+        fetch_full_text("https://news.example.com/a")
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch("src.services.enrich.http_session.get")
+    def test_articles_are_copied_not_modified(self, mock_get):
+        mock_get.side_effect = lambda url, **kwargs: make_response(
+            PAGE if url.endswith("a") else "<p>short</p>"
+        )
+        articles = [make_article("https://news.example.com/a"), make_article("https://news.example.com/b"), make_article(None)]
+
+        result = enrich_articles(articles)
+
+        self.assertTrue(result[0].content.startswith(PARAGRAPH))
+        self.assertEqual(articles[0].content, "Truncated content [+1200 chars]")
+        self.assertIs(result[1], articles[1])
+        self.assertIs(result[2], articles[2])
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch("src.services.enrich.http_session.get")
+    def test_batch_is_enriched(self, mock_get):
+        mock_get.side_effect = lambda url, **kwargs: make_response(PAGE)
+        batch = ArticleBatch.from_articles([make_article("https://news.example.com/a")])
+
+        result = enrich_articles(batch)
+
+        self.assertIsInstance(result, ArticleBatch)
+        self.assertTrue(result.contents[0].startswith(PARAGRAPH))
+        self.assertEqual(batch.contents[0], "Truncated content [+1200 chars]")
+
+    @patch("src.services.enrich.http_session.get")
+    def test_requests_per_host_are_limited(self, mock_get):
+        active, peak = {}, {}
+        lock = threading.Lock()
+
+        def get(url, **kwargs):
+            host = url.split("/")[2]
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            time.sleep(0.05)
+            with lock:
+                active[host] -= 1
+            return make_response(PAGE)
+        mock_get.side_effect = get
+
+        articles = [make_article(f"https://{host}.example.com/{i}") for host in ("a", "b") for i in range(6)]
+        enrich_articles(articles, max_workers=8)
+
+        self.assertEqual(peak, {"a.example.com": 2, "b.example.com": 2})
+
+    @patch("src.services.enrich.http_session.get")
+    def test_update_content(self, mock_get):
+        mock_get.side_effect = lambda url, **kwargs: make_response(PAGE)
+        article = make_article("https://news.example.com/a")
+
+        self.assertTrue(article.update_content())
+        self.assertTrue(article.content.startswith(PARAGRAPH))
+
+    @patch("src.services.enrich.http_session.get")
+    def test_non_html_pages_are_skipped(self, mock_get):
+        mock_get.return_value = make_response("%PDF-1.7", content_type="application/pdf")
+        self.assertEqual(fetch_full_text("https://news.example.com/report.pdf"), "")
+
+    @patch("src.services.enrich.http_session.get")
+    def test_charset_comes_from_the_header_or_the_page(self, mock_get):
+        text = "Le bitcoin a chuté après l’annonce d’une enquête sur les plateformes d’échange."
+        latin_text = "Le bitcoin a chuté après l'annonce d'une enquête sur les plateformes d'échange."
+        mock_get.side_effect = [
+            # Without a charset, requests would decode the page as ISO-8859-1
+            make_response(f"<p>{text}</p>", content_type="text/html"),
+            make_response(f'<meta charset="windows-1252"><p>{text}</p>', content_type="text/html", encoding="cp1252"),
+            make_response(f"<p>{latin_text}</p>", content_type="text/html; charset=ISO-8859-1", encoding="latin-1"),
+        ]
+
+        self.assertEqual(fetch_full_text("https://news.example.com/a", use_cache=False), text)
+        self.assertEqual(fetch_full_text("https://news.example.com/b", use_cache=False), text)
+        self.assertEqual(fetch_full_text("https://news.example.com/c", use_cache=False), latin_text)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import tempfile
 import unittest
 from unittest.mock import patch
 from src.services.llm import (
@@ -5,8 +6,21 @@ from src.services.llm import (
     call_model,
     parse_response,
     analyze_news_with_llm,
+    response_cache,
+    ResponseCache,
+    build_prompts,
+    combine_verdicts,
+    estimate_tokens,
+    format_article,
+    call_model_stream,
+    IncrementalVerdictParser,
+    heuristic_verdict,
+    verdict_confidence,
+    parse_structured_response,
+    RESPONSE_SCHEMA,
 )
 from src.services.news import Article
+from src.utils.metrics import get_metrics, start_invocation
 
 ###########
 #  Tests  #
@@ -50,6 +64,84 @@ class TestGeneratePrompt(unittest.TestCase):
         self.assertIn('{"Reasoning":', prompt)
 
 
+class TestTokenBudget(unittest.TestCase):
+    def make_article(self, i, content_length=100):
+        return Article(
+            title=f"Title {i}",
+            description=f"Desc {i}",
+            content="x" * content_length,
+            publishedAt="2021-10-01",
+        )
+
+    def test_format_article_truncates_content_first(self):
+        block = format_article(self.make_article(1, content_length=2000), max_tokens=30)
+        self.assertLessEqual(estimate_tokens(block), 30)
+        self.assertIn("Title 1", block)
+        self.assertIn("Desc 1", block)
+        self.assertIn("...", block)
+
+    def test_format_article_drops_description(self):
+        article = self.make_article(1)
+        article.description = "d" * 400
+        block = format_article(article, max_tokens=10)
+        self.assertLessEqual(estimate_tokens(block), 10)
+        self.assertIn("Title 1", block)
+        self.assertNotIn("Description", block)
+
+    def test_build_prompts_single_chunk_matches_generate_prompt(self):
+        articles = [self.make_article(i) for i in range(3)]
+        prompts = build_prompts(articles, "Bitcoin", token_budget=6000)
+        self.assertEqual(prompts, [(generate_prompt(articles, "Bitcoin"), 3)])
+
+    def test_build_prompts_splits_into_budgeted_chunks(self):
+        articles = [self.make_article(i) for i in range(50)]
+        prompts = build_prompts(articles, "Bitcoin", token_budget=500)
+        self.assertGreater(len(prompts), 1)
+        self.assertEqual(sum(count for _, count in prompts), 50)
+        for prompt, _ in prompts:
+            self.assertLessEqual(estimate_tokens(prompt), 500)
+            self.assertIn('{"Reasoning":', prompt)
+
+    def test_build_prompts_budget_too_small(self):
+        with self.assertRaises(ValueError):
+            build_prompts([self.make_article(1)], "Bitcoin", token_budget=10)
+
+
+class TestCombineVerdicts(unittest.TestCase):
+    def test_single_verdict_is_unchanged(self):
+        verdict = {"Reasoning": "R", "ValueWillDrop": True}
+        self.assertEqual(combine_verdicts([verdict]), verdict)
+
+    def test_weighted_majority(self):
+        verdicts = [
+            {"Reasoning": "Bad news", "ValueWillDrop": True},
+            {"Reasoning": "Fine", "ValueWillDrop": False},
+        ]
+        combined = combine_verdicts(verdicts, weights=[1, 3])
+        self.assertFalse(combined["ValueWillDrop"])
+        self.assertTrue(combined["Reasoning"].startswith("Fine"))
+        self.assertIn("Bad news", combined["Reasoning"])
+
+        combined = combine_verdicts(verdicts, weights=[3, 1])
+        self.assertTrue(combined["ValueWillDrop"])
+        self.assertNotIn("Confidence", combined)
+
+    def test_confidence_is_weighted(self):
+        verdicts = [
+            {"Reasoning": "A", "ValueWillDrop": False, "Confidence": 0.2},
+            {"Reasoning": "B", "ValueWillDrop": False, "Confidence": 1.0},
+        ]
+        combined = combine_verdicts(verdicts, weights=[3, 1])
+        self.assertAlmostEqual(combined["Confidence"], 0.4)
+
+    def test_verdict_confidence(self):
+        self.assertEqual(verdict_confidence({"Confidence": 1.5}), 1.0)
+        self.assertEqual(verdict_confidence({"Confidence": "0.25"}), 0.25)
+        # A missing or invalid confidence is taken as certain
+        self.assertEqual(verdict_confidence({}), 1.0)
+        self.assertEqual(verdict_confidence({"Confidence": "high"}), 1.0)
+
+
 class TestCallModel(unittest.TestCase):
     def test_call_model(self):
         mock_response = unittest.mock.Mock()
@@ -62,6 +154,35 @@ class TestCallModel(unittest.TestCase):
         result = call_model("Test prompt", mock_llm_client)
         self.assertEqual(result, "Mocked response")
 
+    @patch("src.services.llm.wait_for_capacity")
+    def test_call_model_waits_for_rate_limits(self, mock_wait):
+        mock_llm_client = unittest.mock.Mock()
+        mock_llm_client.chat.completions.create.return_value.choices = [
+            unittest.mock.Mock(message=unittest.mock.Mock(content="Mocked response"))
+        ]
+
+        call_model("x" * 400, mock_llm_client)
+
+        mock_wait.assert_any_call("llm_requests")
+        bucket, tokens = mock_wait.call_args.args
+        self.assertEqual(bucket, "llm_tokens")
+        self.assertGreater(tokens, 100)
+
+    def test_call_model_records_usage(self):
+        mock_response = unittest.mock.Mock()
+        mock_response.choices = [unittest.mock.Mock(message=unittest.mock.Mock(content="Mocked response"))]
+        mock_response.usage = unittest.mock.Mock(prompt_tokens=50, completion_tokens=10, total_tokens=60)
+        mock_llm_client = unittest.mock.Mock()
+        mock_llm_client.chat.completions.create.return_value = mock_response
+
+        metrics = start_invocation()
+        call_model("Test prompt", mock_llm_client)
+
+        summary = metrics.to_dict()
+        self.assertEqual(summary["counters"]["prompt_tokens"], 50)
+        self.assertEqual(summary["counters"]["llm_calls"], 1)
+        self.assertEqual(summary["stages"]["model"]["count"], 1)
+
 
 class TestParseResponse(unittest.TestCase):
     def test_parse_response_valid_json(self):
@@ -83,8 +204,92 @@ class TestParseResponse(unittest.TestCase):
         with self.assertRaises(ValueError):
             parse_response(invalid_json)
 
+    def test_parse_response_keeps_leading_characters(self):
+        # The former strip("```json\n") also removed leading 'j', 's', 'o' or 'n'
+        parsed = parse_response('{"Reasoning": "ok", "ValueWillDrop": false}')
+        self.assertFalse(parsed["ValueWillDrop"])
+        parsed = parse_response('```\n{"Reasoning": "json", "ValueWillDrop": false}\n```\n')
+        self.assertEqual(parsed["Reasoning"], "json")
+
+    def test_parse_response_rejects_trailing_text(self):
+        with self.assertRaises(ValueError):
+            parse_response('{"Reasoning": "R", "ValueWillDrop": true} and more')
+        with self.assertRaises(ValueError):
+            parse_response('["not", "an", "object"]')
+
+
+def make_stream(text, size=3):
+    return [
+        unittest.mock.Mock(choices=[unittest.mock.Mock(delta=unittest.mock.Mock(content=text[i:i + size]))])
+        for i in range(0, len(text), size)
+    ]
+
+
+class TestStreaming(unittest.TestCase):
+    def test_parser_decodes_values_incrementally(self):
+        parser = IncrementalVerdictParser()
+        text = '```json\n{"ValueWillDrop": true, "Reasoning": "Quote: \\"ValueWillDrop\\": false"}\n```'
+        seen = []
+        for i in range(0, len(text), 4):
+            parser.feed(text[i:i + 4])
+            seen.append(parser.value_will_drop)
+        self.assertIs(seen[0], None)
+        self.assertTrue(all(value is True for value in seen[8:]))
+        self.assertTrue(parser.complete)
+        self.assertEqual(parser.values["Reasoning"], 'Quote: "ValueWillDrop": false')
+
+    def test_stream_stops_on_negative_verdict(self):
+        chunks = make_stream('{"ValueWillDrop": false, "Reasoning": "' + "x" * 300 + '"}')
+        read = []
+        def stream():
+            for chunk in chunks:
+                read.append(chunk)
+                yield chunk
+        client = unittest.mock.Mock()
+        client.chat.completions.create.return_value = stream()
+
+        parser = call_model_stream("prompt", client, stop_on_verdict="negative")
+
+        self.assertFalse(parser.value_will_drop)
+        self.assertFalse(parser.complete)
+        self.assertLess(len(read), len(chunks))
+
+    def test_parser_decodes_numbers(self):
+        parser = IncrementalVerdictParser()
+        parser.feed('{"ValueWillDrop": false, "Confidence": 0.8')
+        self.assertNotIn("Confidence", parser.values)
+        parser.feed('5, "Reasoning": "R"}')
+        self.assertEqual(parser.values["Confidence"], 0.85)
+
+    def test_stream_waits_for_confidence(self):
+        client = unittest.mock.Mock()
+        client.chat.completions.create.return_value = iter(
+            make_stream('{"ValueWillDrop": false, "Confidence": 0.9, "Reasoning": "' + "x" * 300 + '"}')
+        )
+
+        parser = call_model_stream("prompt", client, stop_on_verdict="negative", model="small", wait_for=("Confidence",))
+
+        self.assertEqual(parser.values["Confidence"], 0.9)
+        self.assertFalse(parser.complete)
+        self.assertEqual(client.chat.completions.create.call_args.kwargs["model"], "small")
+
+    def test_stream_reads_reasoning_on_positive_verdict(self):
+        client = unittest.mock.Mock()
+        client.chat.completions.create.return_value = iter(
+            make_stream('{"ValueWillDrop": true, "Reasoning": "Hack"}')
+        )
+
+        parser = call_model_stream("prompt", client, stop_on_verdict="negative")
+
+        self.assertTrue(parser.complete)
+        self.assertEqual(parse_response(parser.text), {"ValueWillDrop": True, "Reasoning": "Hack"})
+
 
 class TestAnalyzeNewsWithLLM(unittest.TestCase):
+    def setUp(self):
+        response_cache.clear()
+        start_invocation()
+
     @patch(
         "src.services.llm.call_model",
         return_value=(
@@ -102,6 +307,281 @@ class TestAnalyzeNewsWithLLM(unittest.TestCase):
         self.assertEqual(result["Reasoning"], "Some explanation")
         self.assertFalse(result["ValueWillDrop"])
 
+    @patch(
+        "src.services.llm.call_model",
+        return_value='{"Reasoning": "Cached", "ValueWillDrop": true}',
+    )
+    def test_analyze_news_with_llm_cache_hit(self, mock_call_model):
+        articles = [
+            Article(title="T", description="D", content="C", publishedAt="2021-10-01")
+        ]
+        first = analyze_news_with_llm(articles, "XRP")
+        second = analyze_news_with_llm(articles, "XRP")
+        mock_call_model.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(response_cache.stats()["hits"], 1)
+        self.assertEqual(get_metrics().to_dict()["llm_cache_hit_rate"], 0.5)
+
+    @patch("src.services.llm.call_model", return_value="not json")
+    def test_analyze_news_with_llm_does_not_cache_invalid(self, mock_call_model):
+        articles = [
+            Article(title="T", description="D", content="C", publishedAt="2021-10-01")
+        ]
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                analyze_news_with_llm(articles, "XRP")
+        self.assertEqual(mock_call_model.call_count, 2)
+
+    @patch.dict("src.services.llm.CONFIG", {"LLM_STREAM": True, "LLM_STREAM_EARLY_EXIT": "negative"})
+    @patch("src.services.llm.call_model_stream")
+    def test_analyze_news_with_llm_streaming(self, mock_stream):
+        parser = IncrementalVerdictParser()
+        parser.feed('{"ValueWillDrop": false, "Reasoning": "Partial')
+        mock_stream.return_value = parser
+        articles = [
+            Article(title="T", description="D", content="C", publishedAt="2021-10-01")
+        ]
+        result = analyze_news_with_llm(articles, "XRP")
+        self.assertEqual(result, {"Reasoning": "No reasoning provided.", "ValueWillDrop": False})
+        self.assertIn('{"ValueWillDrop": [true/false], "Reasoning"', mock_stream.call_args.args[0])
+        # Partial answers are not cached
+        self.assertEqual(response_cache.stats()["misses"], 1)
+        analyze_news_with_llm(articles, "XRP")
+        self.assertEqual(mock_stream.call_count, 2)
+
+    @patch.dict("src.services.llm.CONFIG", {"PROMPT_TOKEN_BUDGET": 500})
+    @patch("src.services.llm.call_model")
+    def test_analyze_news_with_llm_chunks(self, mock_call_model):
+        def respond(prompt, client=None, model=None, **kwargs):
+            value_will_drop = "Title 0" in prompt
+            return '{"Reasoning": "R", "ValueWillDrop": %s}' % str(value_will_drop).lower()
+        mock_call_model.side_effect = respond
+        articles = [
+            Article(title=f"Title {i}", description="D", content="C" * 200, publishedAt="2021-10-01")
+            for i in range(20)
+        ]
+        result = analyze_news_with_llm(articles, "XRP")
+        self.assertGreater(mock_call_model.call_count, 1)
+        self.assertFalse(result["ValueWillDrop"])
+
+
+@patch.dict("src.services.llm.CONFIG", {
+    "LLM_CASCADE": ["heuristic", "small", "large"],
+    "LLM_CASCADE_MIN_CONFIDENCE": 0.75,
+    "LLM_CASCADE_ESCALATE_DROPS": True,
+})
+class TestCascade(unittest.TestCase):
+    def setUp(self):
+        response_cache.clear()
+        start_invocation()
+
+    @staticmethod
+    def make_articles(*titles):
+        return [Article(title=title, description=None, content="C", publishedAt="2021-10-01") for title in titles]
+
+    def test_heuristic_verdict(self):
+        verdict = heuristic_verdict(self.make_articles("Bitcoin rallies", "Bitcoin hacked", "Bitcoin crash"), "Bitcoin")
+        self.assertTrue(verdict["ValueWillDrop"])
+        self.assertAlmostEqual(verdict["Confidence"], 0.3)
+
+    @patch("src.services.llm.call_model")
+    def test_clear_day_is_answered_by_the_heuristic(self, mock_call_model):
+        result = analyze_news_with_llm(self.make_articles("Bitcoin rallies", "Bitcoin ETF inflows"), "Bitcoin")
+
+        mock_call_model.assert_not_called()
+        self.assertFalse(result["ValueWillDrop"])
+        self.assertEqual(result["Tier"], "heuristic")
+        self.assertEqual(len(result["Tiers"]), 1)
+        self.assertEqual(get_metrics().to_dict()["counters"]["cascade_answers_heuristic"], 1)
+
+    @patch("src.services.llm.call_model")
+    def test_uncertain_verdicts_are_escalated(self, mock_call_model):
+        answers = {
+            "small": '{"Reasoning": "Unsure", "ValueWillDrop": false, "Confidence": 0.5}',
+            "large": '{"Reasoning": "Sure", "ValueWillDrop": false, "Confidence": 0.95}',
+        }
+        mock_call_model.side_effect = lambda prompt, model=None, **kwargs: answers[model]
+
+        result = analyze_news_with_llm(self.make_articles("Bitcoin crash", "Bitcoin rallies"), "Bitcoin")
+
+        self.assertEqual([call.kwargs["model"] for call in mock_call_model.call_args_list], ["small", "large"])
+        self.assertIn('"Confidence": [0.0 to 1.0]', mock_call_model.call_args.args[0])
+        self.assertEqual(result["Reasoning"], "Sure")
+        self.assertEqual(result["Tier"], "large")
+        self.assertEqual([tier["Tier"] for tier in result["Tiers"]], ["heuristic", "small", "large"])
+        self.assertEqual([tier["Escalated"] for tier in result["Tiers"]], [True, True, False])
+        self.assertEqual(result["Tiers"][1]["Confidence"], 0.5)
+        self.assertEqual(get_metrics().to_dict()["counters"]["cascade_escalations"], 2)
+
+    @patch("src.services.llm.call_model")
+    def test_tentative_drops_are_escalated(self, mock_call_model):
+        answers = {
+            "small": '{"Reasoning": "Hack", "ValueWillDrop": true, "Confidence": 0.9}',
+            "large": '{"Reasoning": "Minor", "ValueWillDrop": false, "Confidence": 0.8}',
+        }
+        mock_call_model.side_effect = lambda prompt, model=None, **kwargs: answers[model]
+
+        with patch.dict("src.services.llm.CONFIG", {"LLM_CASCADE": ["small", "large"]}):
+            result = analyze_news_with_llm(self.make_articles("Bitcoin hacked"), "Bitcoin")
+        self.assertFalse(result["ValueWillDrop"])
+        self.assertEqual(result["Tier"], "large")
+
+        # The last tier always answers, even a drop
+        answers["large"] = answers["small"]
+        response_cache.clear()
+        with patch.dict("src.services.llm.CONFIG", {"LLM_CASCADE": ["small", "large"], "LLM_CASCADE_ESCALATE_DROPS": False}):
+            result = analyze_news_with_llm(self.make_articles("Bitcoin hacked"), "Bitcoin")
+        self.assertTrue(result["ValueWillDrop"])
+        self.assertEqual(result["Tier"], "small")
+
+    @patch("builtins.print")
+    @patch("src.services.llm.call_model")
+    def test_failed_tier_is_escalated(self, mock_call_model, mock_print):
+        def respond(prompt, model=None, **kwargs):
+            if model == "small":
+                raise Exception("model unavailable")
+            return '{"Reasoning": "R", "ValueWillDrop": false, "Confidence": 0.9}'
+        mock_call_model.side_effect = respond
+
+        with patch.dict("src.services.llm.CONFIG", {"LLM_CASCADE": ["small", "large"]}):
+            result = analyze_news_with_llm(self.make_articles("Bitcoin hacked"), "Bitcoin")
+
+        self.assertEqual(result["Tier"], "large")
+        self.assertEqual(result["Tiers"][0]["Error"], "model unavailable")
+
+
+@patch.dict("src.services.llm.CONFIG", {"LLM_STRUCTURED_OUTPUT": True, "LLM_REASONING_MAX_CHARS": 20})
+class TestStructuredOutput(unittest.TestCase):
+    def setUp(self):
+        response_cache.clear()
+        start_invocation()
+
+    def test_articles_are_numbered_across_chunks(self):
+        articles = [Article(title=f"Title {i}", description="D", content="C" * 200, publishedAt="2021-10-01") for i in range(20)]
+
+        prompts = build_prompts(articles, "XRP", token_budget=500, structured=True)
+
+        self.assertGreater(len(prompts), 1)
+        self.assertIn("[1] Title: Title 0", prompts[0][0])
+        first_of_second_chunk = prompts[0][1] + 1
+        self.assertIn(f"[{first_of_second_chunk}] Title: Title {first_of_second_chunk - 1}", prompts[1][0])
+        self.assertNotIn("```json", prompts[0][0])
+
+    def test_call_model_requests_the_schema(self):
+        mock_llm_client = unittest.mock.Mock()
+        message = unittest.mock.Mock(content='{"ValueWillDrop": false}', refusal=None)
+        mock_llm_client.chat.completions.create.return_value.choices = [unittest.mock.Mock(message=message)]
+
+        call_model("prompt", mock_llm_client, structured=True)
+
+        kwargs = mock_llm_client.chat.completions.create.call_args.kwargs
+        schema = kwargs["response_format"]["json_schema"]["schema"]
+        self.assertEqual(schema["properties"]["Reasoning"], {"type": "string", "maxLength": 20})
+        self.assertEqual(schema["required"], RESPONSE_SCHEMA["json_schema"]["schema"]["required"])
+        self.assertNotIn("maxLength", RESPONSE_SCHEMA["json_schema"]["schema"]["properties"]["Reasoning"])
+        self.assertEqual(kwargs["max_tokens"], 300)
+
+        message.refusal = "I cannot help with that."
+        with self.assertRaises(ValueError):
+            call_model("prompt", mock_llm_client, structured=True)
+
+    def test_parse_structured_response(self):
+        verdict = parse_structured_response(
+            '{"ValueWillDrop": true, "Confidence": 1.2, "Citations": [3, 1, 3], "Reasoning": "' + "x" * 50 + '"}'
+        )
+        self.assertEqual(verdict, {"ValueWillDrop": True, "Confidence": 1.0, "Citations": [1, 3], "Reasoning": "x" * 20})
+
+        for response in (
+            '{"ValueWillDrop": "yes", "Confidence": 0.5, "Citations": [], "Reasoning": "R"}',
+            '{"ValueWillDrop": true, "Confidence": "high", "Citations": [], "Reasoning": "R"}',
+            '{"ValueWillDrop": true, "Confidence": 0.5, "Citations": ["1"], "Reasoning": "R"}',
+            '{"ValueWillDrop": true, "Confidence": 0.5, "Citations": []}',
+            '[true]',
+            '```json\n{}\n```',
+        ):
+            with self.assertRaises(ValueError):
+                parse_structured_response(response)
+
+    @patch("src.services.llm.call_model")
+    def test_analyze_news_with_structured_output(self, mock_call_model):
+        mock_call_model.return_value = '{"ValueWillDrop": true, "Confidence": 0.9, "Citations": [1, 7], "Reasoning": "Hack in [1]"}'
+        articles = [Article(title=f"T{i}", description="D", content="C", publishedAt="2021-10-01") for i in range(2)]
+
+        result = analyze_news_with_llm(articles, "XRP")
+
+        self.assertTrue(mock_call_model.call_args.kwargs["structured"])
+        self.assertIn("[2] Title: T1", mock_call_model.call_args.args[0])
+        self.assertEqual(result["Citations"], [1])
+        self.assertEqual(result["Reasoning"], "Hack in [1]")
+
+    @patch("src.services.llm.get_llm_client")
+    def test_truncated_answer_falls_back_to_its_verdict(self, mock_get_client):
+        choice = unittest.mock.Mock(finish_reason="length")
+        choice.message = unittest.mock.Mock(
+            content='{"ValueWillDrop": true, "Confidence": 0.7, "Citations": [1], "Reasoning": "The exchange ha', refusal=None
+        )
+        mock_get_client.return_value.chat.completions.create.return_value.choices = [choice]
+        articles = [Article(title="T", description="D", content="C", publishedAt="2021-10-01")]
+
+        result = analyze_news_with_llm(articles, "XRP")
+
+        self.assertTrue(result["ValueWillDrop"])
+        self.assertEqual(result["Confidence"], 0.7)
+        self.assertEqual(result["Citations"], [1])
+        self.assertEqual(get_metrics().to_dict()["counters"]["llm_truncated"], 1)
+
+        # An answer cut off before its verdict still fails, and is not cached
+        choice.message.content = '{"ValueWill'
+        with self.assertRaises(ValueError):
+            analyze_news_with_llm(articles, "XRP")
+
+    @patch.dict("src.services.llm.CONFIG", {"LLM_STREAM": True, "LLM_STREAM_EARLY_EXIT": "negative"})
+    @patch("src.services.llm.call_model_stream")
+    def test_streamed_structured_answer_stops_early(self, mock_stream):
+        parser = IncrementalVerdictParser()
+        parser.feed('{"ValueWillDrop": false, "Confidence": 0.8, "Citations": [2], "Reasoning": "Part')
+        mock_stream.return_value = parser
+        articles = [Article(title=f"T{i}", description="D", content="C", publishedAt="2021-10-01") for i in range(2)]
+
+        result = analyze_news_with_llm(articles, "XRP")
+
+        self.assertTrue(mock_stream.call_args.kwargs["structured"])
+        self.assertEqual(result["Citations"], [2])
+        self.assertEqual(result["Confidence"], 0.8)
+        self.assertFalse(result["ValueWillDrop"])
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 1, "hit_rate": 2 / 3})
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache(ttl=60)
+        with patch("src.services.llm.time.time", return_value=0):
+            cache.set("a", "1")
+        with patch("src.services.llm.time.time", return_value=61):
+            self.assertIsNone(cache.get("a"))
+
+    def test_disk_tier_survives_new_instance(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ResponseCache(directory=directory).set("a", "1")
+            cache = ResponseCache(directory=directory)
+            self.assertEqual(cache.get("a"), "1")
+
+    def test_key_depends_on_model_system_and_prompt(self):
+        key = ResponseCache.make_key("m", "s", "p")
+        self.assertEqual(key, ResponseCache.make_key("m", "s", "p"))
+        self.assertNotEqual(key, ResponseCache.make_key("m2", "s", "p"))
+        self.assertNotEqual(key, ResponseCache.make_key("m", "s2", "p"))
+        self.assertNotEqual(key, ResponseCache.make_key("m", "s", "p2"))
+
 
 if __name__ == "__main__":
     unittest.main()
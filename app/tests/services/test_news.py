@@ -1,7 +1,8 @@
 import unittest
+import requests
 from unittest.mock import patch, MagicMock
 from datetime import datetime, timedelta
-from src.services.news import fetch_articles, Article
+from src.services.news import fetch_articles, iter_articles, http_session, Article, ArticleBatch
 
 MOCK_ARTICLES = [
     {
@@ -98,7 +99,7 @@ class TestFetchArticles(unittest.TestCase):
             "articles": MOCK_ARTICLES
         }
 
-    @patch('requests.get')
+    @patch('src.services.news.http_session.get')
     def test_fetch_articles_no_date(self, mock_get):
         """Test fetching articles with no date specified."""
         # Set up the mock response
@@ -111,7 +112,7 @@ class TestFetchArticles(unittest.TestCase):
         result = fetch_articles(query="bitcoin")
 
         # Assertions
-        # 1. requests.get was called once
+        # 1. The session was called once
         mock_get.assert_called_once()
 
         # 2. The returned object is a list of Article
@@ -125,7 +126,7 @@ class TestFetchArticles(unittest.TestCase):
         self.assertEqual(result[0].title, MOCK_ARTICLES[0]['title'])
         self.assertEqual(result[0].author, MOCK_ARTICLES[0]['author'])
 
-    @patch('requests.get')
+    @patch('src.services.news.http_session.get')
     def test_fetch_articles_with_date(self, mock_get):
         """Test fetching articles with a specified date filter."""
         mock_resp = MagicMock()
@@ -149,7 +150,7 @@ class TestFetchArticles(unittest.TestCase):
         # Verify we still parse articles
         self.assertEqual(len(result), 8)
 
-    @patch('requests.get')
+    @patch('src.services.news.http_session.get')
     def test_fetch_articles_top_k(self, mock_get):
         """Test fetching articles with a smaller top_k parameter."""
         mock_resp = MagicMock()
@@ -166,7 +167,7 @@ class TestFetchArticles(unittest.TestCase):
         self.assertEqual(result[0].title, MOCK_ARTICLES[0]['title'])
         self.assertEqual(result[-1].title, MOCK_ARTICLES[2]['title'])
 
-    @patch('requests.get')
+    @patch('src.services.news.http_session.get')
     def test_fetch_articles_empty_response(self, mock_get):
         """Test fetching articles when the API returns no articles."""
         # Mock with an empty list of articles
@@ -179,7 +180,7 @@ class TestFetchArticles(unittest.TestCase):
 
         self.assertEqual(len(result), 0, "Should return an empty list if no articles found.")
 
-    @patch('requests.get')
+    @patch('src.services.news.http_session.get')
     def test_fetch_articles_raise_for_status(self, mock_get):
         """Test that fetch_articles raises an HTTPError when the request fails."""
         mock_resp = MagicMock()
@@ -193,5 +194,103 @@ class TestFetchArticles(unittest.TestCase):
         self.assertIn("HTTP Error occurred", str(context.exception))
 
 
+class TestIterArticles(unittest.TestCase):
+
+    def _page(self, articles, total):
+        mock_resp = MagicMock()
+        mock_resp.raise_for_status = MagicMock()
+        mock_resp.json.return_value = {"totalResults": total, "articles": articles}
+        return mock_resp
+
+    @patch('src.services.news.http_session.get')
+    def test_iter_articles_paginates(self, mock_get):
+        """Test that pages are requested until top_k articles are yielded."""
+        mock_get.side_effect = [
+            self._page(MOCK_ARTICLES[:3], total=8),
+            self._page(MOCK_ARTICLES[3:6], total=8),
+            self._page(MOCK_ARTICLES[6:], total=8),
+        ]
+
+        result = list(iter_articles(query="bitcoin", top_k=5, page_size=3))
+
+        self.assertEqual(len(result), 5)
+        self.assertEqual(result[4].title, MOCK_ARTICLES[4]['title'])
+        # The third page is never requested
+        self.assertEqual(mock_get.call_count, 2)
+        pages = [kwargs['params']['page'] for _, kwargs in mock_get.call_args_list]
+        self.assertEqual(pages, [1, 2])
+        self.assertEqual(mock_get.call_args.kwargs['params']['pageSize'], 3)
+
+    @patch('src.services.news.http_session.get')
+    def test_iter_articles_stops_on_last_page(self, mock_get):
+        """Test that no page is requested past the total number of results."""
+        mock_get.side_effect = [
+            self._page(MOCK_ARTICLES[:3], total=5),
+            self._page(MOCK_ARTICLES[3:5], total=5),
+        ]
+
+        result = list(iter_articles(query="bitcoin", top_k=100, page_size=3))
+
+        self.assertEqual(len(result), 5)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch('src.services.news.news_api_policy.base_delay', 0.001)
+    @patch('src.services.news.http_session.get')
+    def test_iter_articles_retries_server_errors(self, mock_get):
+        """Test that a transient NewsAPI error is retried with a timeout."""
+        error_resp = MagicMock()
+        error_resp.status_code = 503
+        error_resp.raise_for_status.side_effect = requests.HTTPError(response=error_resp)
+        mock_get.side_effect = [error_resp, self._page(MOCK_ARTICLES[:2], total=2)]
+
+        result = list(iter_articles(query="bitcoin", top_k=10))
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertIn('timeout', mock_get.call_args.kwargs)
+
+    def test_session_is_pooled(self):
+        """Test that the module-level session keeps connections alive with gzip."""
+        self.assertIn('gzip', http_session.headers['Accept-Encoding'])
+        self.assertEqual(http_session.headers['Connection'], 'keep-alive')
+
+
+class TestArticle(unittest.TestCase):
+
+    def test_from_api_ignores_unknown_fields(self):
+        article = Article.from_api({**MOCK_ARTICLES[0], "sentiment": "neutral"})
+
+        self.assertEqual(article.title, MOCK_ARTICLES[0]['title'])
+        self.assertEqual(article.source, {"id": None, "name": "Gizmodo.com"})
+        self.assertFalse(hasattr(article, '__dict__'))
+
+    def test_source_names_are_interned(self):
+        first = Article.from_api(MOCK_ARTICLES[1])
+        second = Article.from_api({**MOCK_ARTICLES[2], "source": {"id": None, "name": "".join(["Slashdot", ".org"])}})
+        self.assertIs(first.source_name, second.source_name)
+
+    def test_published_at_is_decoded_lazily(self):
+        article = Article.from_api(MOCK_ARTICLES[0])
+        self.assertEqual(article.published_at, datetime.fromisoformat("2024-12-12T15:30:41+00:00"))
+        self.assertIsNone(Article(title="T", description=None, content=None, publishedAt="soon").published_at)
+
+    def test_replace_and_equality(self):
+        article = Article.from_api(MOCK_ARTICLES[0])
+        merged = article.replace(source_count=3)
+        self.assertEqual(merged.source_count, 3)
+        self.assertEqual(merged.url, article.url)
+        self.assertNotEqual(merged, article)
+        self.assertEqual(merged.replace(source_count=1), article)
+
+    def test_batch_round_trip(self):
+        articles = [Article.from_api(article) for article in MOCK_ARTICLES]
+        batch = ArticleBatch.from_articles(articles)
+
+        self.assertEqual(len(batch), len(articles))
+        self.assertEqual(batch.to_articles(), articles)
+        self.assertEqual(batch.select([2, 0]).titles, [articles[2].title, articles[0].title])
+
+
+
 if __name__ == '__main__':
     unittest.main()
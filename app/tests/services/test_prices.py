@@ -0,0 +1,173 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+import numpy as np
+from src.services.prices import (
+    CSVPriceFeed,
+    PriceStore,
+    evaluate_predictions,
+    read_price_csv,
+    recent_price_move,
+)
+
+DAY = 86400
+START = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+
+def daily_bars(closes):
+    return np.array([[START + i * DAY, close, close, close, close] for i, close in enumerate(closes)])
+
+###########
+#  Tests  #
+###########
+
+class TestPriceStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = PriceStore(os.path.join(self.tmpdir.name, "store"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_series_is_memory_mapped(self):
+        self.store.write("Bitcoin", daily_bars([100, 110, 99]))
+
+        series = self.store.get("bitcoin")
+
+        self.assertIsInstance(series.data, np.memmap)
+        self.assertEqual(len(series), 3)
+        self.assertIsNone(self.store.get("Ethereum"))
+
+    def test_merge_sorts_and_replaces_duplicates(self):
+        self.store.write("Bitcoin", daily_bars([100, 110, 99]))
+        bars = daily_bars([100, 110, 99, 120])
+        bars[2, 4] = 95
+
+        series = self.store.merge("Bitcoin", bars[::-1])
+
+        self.assertEqual(series.close.tolist(), [100, 110, 95, 120])
+
+    def test_csv_feed(self):
+        path = os.path.join(self.tmpdir.name, "bitcoin.csv")
+        with open(path, "w") as file:
+            file.write("Date,Open,High,Low,Close,Volume\n")
+            file.write("2025-01-01,100,105,95,101,10\n")
+            file.write("2025-01-02T00:00:00Z,101,120,100,118,12\n")
+            file.write(f"{START + 2 * DAY},118,119,90,91,30\n")
+
+        bars = read_price_csv(path)
+        self.assertEqual(bars[:, 0].tolist(), [START, START + DAY, START + 2 * DAY])
+        self.assertEqual(bars[1].tolist()[1:], [101, 120, 100, 118])
+
+        self.store.write("Bitcoin", bars[:1])
+        series = self.store.update("Bitcoin", CSVPriceFeed(self.tmpdir.name))
+        self.assertEqual(series.close.tolist(), [101, 118, 91])
+
+    def test_forward_and_trailing_returns(self):
+        series = self.store.write("Bitcoin", daily_bars([100, 110, 99, 120]))
+
+        returns = series.forward_returns([START, START + DAY, START - DAY], [DAY, 2 * DAY, 5 * DAY])
+
+        np.testing.assert_allclose(returns[0, :2], [0.1, -0.01])
+        np.testing.assert_allclose(returns[1, :2], [-0.1, 120 / 110 - 1])
+        self.assertTrue(np.isnan(returns[:, 2]).all())
+        self.assertTrue(np.isnan(returns[2]).all())
+        self.assertAlmostEqual(series.trailing_return(START + 3 * DAY, DAY), 120 / 99 - 1)
+
+    def test_trailing_return_ends_at_the_last_bar(self):
+        hourly = np.array([[START + h * 3600, 100 + h, 100 + h, 100 + h, 100 + h] for h in range(48)])
+        series = self.store.write("Bitcoin", hourly)
+        last = START + 47 * 3600
+
+        # Bars are stored after the fact, so `now` is usually past the last one
+        self.assertAlmostEqual(series.trailing_return(last + 3600, DAY, max_staleness=2 * 3600), 147 / 123 - 1)
+        self.assertIsNone(series.trailing_return(last + 3 * 3600, DAY, max_staleness=2 * 3600))
+        self.assertIsNone(series.trailing_return(START + 3600, DAY))
+
+    def test_recent_price_move_fills_the_store_from_the_feed(self):
+        feed_dir = os.path.join(self.tmpdir.name, "feed")
+        os.makedirs(feed_dir)
+        with open(os.path.join(feed_dir, "bitcoin.csv"), "w") as file:
+            file.write("timestamp,open,high,low,close\n")
+            for i, close in enumerate([100, 90]):
+                file.write(f"{START + i * DAY},{close},{close},{close},{close}\n")
+        now = datetime.fromtimestamp(START + DAY + 3600, timezone.utc)
+
+        with patch("src.services.prices.get_price_store", return_value=self.store), \
+                patch.dict("src.services.prices.CONFIG", {"PRICE_FEED_DIR": feed_dir, "PRICE_MAX_STALENESS_HOURS": 2}):
+            move = recent_price_move("Bitcoin", lookback_hours=24, now=now)
+            missing = recent_price_move("Ethereum", lookback_hours=24, now=now)
+
+        self.assertAlmostEqual(move, -0.1)
+        self.assertIsNone(missing)
+        self.assertEqual(len(self.store.get("Bitcoin")), 2)
+
+    def test_update_only_appends_new_bars(self):
+        feed_dir = os.path.join(self.tmpdir.name, "feed")
+        os.makedirs(feed_dir)
+        path = os.path.join(feed_dir, "bitcoin.csv")
+        with open(path, "w") as file:
+            file.write("timestamp,open,high,low,close\n")
+            file.write(f"{START},100,100,100,100\n")
+        feed = CSVPriceFeed(feed_dir)
+        self.store.update("Bitcoin", feed)
+
+        # The feed still returns the last stored bar
+        with patch.object(self.store, "write", wraps=self.store.write) as mock_write:
+            self.assertEqual(len(self.store.update("Bitcoin", feed)), 1)
+            mock_write.assert_not_called()
+
+            with open(path, "a") as file:
+                file.write(f"{START + DAY},90,90,90,90\n")
+            series = self.store.update("Bitcoin", feed)
+
+        self.assertEqual(series.close.tolist(), [100, 90])
+
+
+class TestEvaluatePredictions(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = PriceStore(self.tmpdir.name)
+        self.store.write("Bitcoin", daily_bars([100, 90, 95, 80, 85]))
+        self.store.write("Ethereum", daily_bars([10, 11, 12, 13, 14]))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_hit_rate_and_precision(self):
+        results = evaluate_predictions(
+            assets=["Bitcoin", "Bitcoin", "Bitcoin", "Ethereum", "Ethereum", "Solana", "Bitcoin"],
+            times=[START, START + DAY, START + 2 * DAY, START, START + DAY, START, START + 3 * DAY],
+            verdicts=[True, True, True, False, None, True, False],
+            horizons_days=[1, 10],
+            store=self.store,
+        )
+
+        one_day = results[0]
+        # Bitcoin drops after the first and third days, Ethereum never drops
+        self.assertEqual(one_day["evaluated"], 5)
+        self.assertEqual(one_day["hit_rate"], 4 / 5)
+        self.assertEqual(one_day["precision"], 2 / 3)
+        self.assertEqual(one_day["recall"], 1.0)
+        self.assertEqual(one_day["base_rate"], 2 / 5)
+        self.assertEqual(results[1], {
+            "horizon_days": 10, "evaluated": 0, "hit_rate": None, "precision": None, "recall": None, "base_rate": None,
+        })
+
+    def test_many_predictions_are_vectorized(self):
+        closes = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(scale=0.02, size=5000)))
+        self.store.write("Bitcoin", daily_bars(closes))
+        times = START + np.arange(5000) * DAY
+
+        results = evaluate_predictions(["Bitcoin"] * 5000, times, [True] * 5000, [1, 7], self.store)
+
+        self.assertEqual(results[0]["evaluated"], 4999)
+        self.assertEqual(results[1]["evaluated"], 4993)
+        self.assertEqual(results[0]["hit_rate"], results[0]["precision"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from src.services.news import Article, ArticleBatch
+from src.services.relevance import filter_articles, query_terms, score_article
+from tests.services.test_news import MOCK_ARTICLES
+
+def make_article(title: str, description: str = "") -> Article:
+    return Article(title=title, description=description, content="", publishedAt="2025-01-10")
+
+# Market news without a clear direction
+NEUTRAL_ARTICLES = [
+    make_article("Bitcoin developers publish the notes of their monthly call", "The call covered wallet tooling."),
+    make_article("What analysts will watch for Bitcoin this week", "A look at the calendar of upcoming data releases."),
+    make_article("Bitcoin exchange opens an office in Lisbon", "The company hired a local team."),
+]
+
+###########
+#  Tests  #
+###########
+
+class TestRelevance(unittest.TestCase):
+
+    def test_filter_drops_irrelevant_and_removed_articles(self):
+        articles = [Article(**article) for article in MOCK_ARTICLES]
+
+        result = filter_articles(articles, query="bitcoin")
+
+        titles = [article.title for article in result.articles]
+        self.assertEqual(result.dropped, 3)
+        self.assertEqual(len(result.scores), len(result.articles))
+        self.assertNotIn("[Removed]", titles)
+        self.assertFalse(any("Anthropic" in title for title in titles))
+        self.assertFalse(any("Jimmy Carter" in title for title in titles))
+
+    def test_filter_batch_matches_list(self):
+        articles = [Article(**article) for article in MOCK_ARTICLES]
+
+        from_list = filter_articles(articles, query="bitcoin")
+        from_batch = filter_articles(ArticleBatch.from_articles(articles), query="bitcoin")
+
+        self.assertIsInstance(from_batch.articles, ArticleBatch)
+        self.assertEqual(from_batch.articles.to_articles(), from_list.articles)
+        self.assertEqual(from_batch.scores, from_list.scores)
+
+    def test_aliases_count_as_query_terms(self):
+        self.assertIn("btc", query_terms("Bitcoin"))
+        article = Article(title="BTC slides", description=None, content=None, publishedAt="2025-01-10")
+        self.assertGreaterEqual(score_article(article, query_terms("bitcoin")).relevance, 0.6)
+
+    def test_polarity(self):
+        terms = query_terms("bitcoin")
+        negative = Article(title="Bitcoin exchange hacked, prices plunge", description="", content="", publishedAt="")
+        positive = Article(title="Bitcoin rally hits record", description="", content="", publishedAt="")
+        self.assertEqual(score_article(negative, terms).polarity, -1.0)
+        self.assertEqual(score_article(positive, terms).polarity, 1.0)
+
+    def test_neutral_articles_have_no_polarity(self):
+        terms = query_terms("bitcoin")
+        for article in NEUTRAL_ARTICLES:
+            self.assertEqual(score_article(article, terms).polarity, 0.0, article.title)
+
+    def test_polarity_weighs_both_directions(self):
+        terms = query_terms("bitcoin")
+        rebound = make_article("Bitcoin rebounds as ETF inflows climb", "Prices recover from last week's lows.")
+        mixed = make_article("Bitcoin recovers after exchange hack", "")
+        mostly_negative = make_article("Bitcoin gains fade as lawsuit and outflows weigh on prices", "")
+
+        self.assertEqual(score_article(rebound, terms).polarity, 1.0)
+        self.assertEqual(score_article(mixed, terms).polarity, 0.0)
+        self.assertAlmostEqual(score_article(mostly_negative, terms).polarity, -1 / 3)
+
+    def test_threshold_is_configurable(self):
+        article = Article(title="Crypto markets", description="Exchange volumes", content="", publishedAt="")
+        self.assertEqual(filter_articles([article], "bitcoin", min_relevance=0.3).dropped, 0)
+        self.assertEqual(filter_articles([article], "bitcoin", min_relevance=0.5).dropped, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from src.services.news import Article
+from src.services.seen import SeenArticleIndex, SQLiteBackend, MemoryBackend
+
+def make_article(url: str, content: str = "Content") -> Article:
+    return Article(title="Title", description="Desc", content=content, publishedAt="2025-01-10", url=url)
+
+###########
+#  Tests  #
+###########
+
+class TestSeenArticleIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index = SeenArticleIndex(SQLiteBackend(os.path.join(self.tmpdir.name, "seen.sqlite3")), ttl=60)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_filter_new_skips_seen_articles(self):
+        articles = [make_article("https://a"), make_article("https://b")]
+        self.index.mark_seen(articles[:1], namespace="Bitcoin")
+
+        result = self.index.filter_new(articles, namespace="Bitcoin")
+
+        self.assertEqual([a.url for a in result], ["https://b"])
+
+    def test_changed_content_is_new(self):
+        self.index.mark_seen([make_article("https://a")], namespace="Bitcoin")
+
+        result = self.index.filter_new([make_article("https://a", content="Updated")], namespace="Bitcoin")
+
+        self.assertEqual(len(result), 1)
+
+    def test_namespaces_are_independent(self):
+        self.index.mark_seen([make_article("https://a")], namespace="Bitcoin")
+
+        result = self.index.filter_new([make_article("https://a")], namespace="Ethereum")
+
+        self.assertEqual(len(result), 1)
+
+    def test_expired_entries_are_new_and_evicted(self):
+        backend = MemoryBackend()
+        index = SeenArticleIndex(backend, ttl=60)
+        now = time.time()
+        with patch("src.services.seen.time.time", return_value=now - 120):
+            index.mark_seen([make_article("https://a")])
+
+        self.assertEqual(len(index.filter_new([make_article("https://a")])), 1)
+
+        index.mark_seen([make_article("https://b")])
+        self.assertEqual(backend.get_many(["|https://a"]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
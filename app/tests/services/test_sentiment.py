@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+from src.services.sentiment import (
+    SentimentTracker,
+    MemoryStateBackend,
+    SQLiteStateBackend,
+    drop_probability,
+)
+
+HOUR = 3600.0
+
+###########
+#  Tests  #
+###########
+
+class TestSentimentTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = SentimentTracker(MemoryStateBackend(), half_lives=[6, 24, 168])
+
+    def test_drop_alerts_once(self):
+        first = self.tracker.update("Bitcoin", 1.0, weight=1, now=0)
+        self.assertTrue(first["alert"])
+        self.assertAlmostEqual(first["scores"]["24h"], 1 / 1.5, places=4)
+        self.assertEqual(set(first["scores"]), {"6h", "24h", "168h"})
+
+        # The same drop reported again a few hours later does not alert again
+        second = self.tracker.update("Bitcoin", 1.0, weight=1, now=3 * HOUR)
+        self.assertFalse(second["alert"])
+        self.assertTrue(second["alerting"])
+
+    def test_alert_is_rearmed_once_the_score_fades(self):
+        self.tracker.update("Bitcoin", 1.0, weight=1, now=0)
+
+        # Three half-lives later, the old drop has faded below the reset threshold
+        result = self.tracker.update("Bitcoin", 1.0, weight=1, now=72 * HOUR)
+
+        self.assertTrue(result["alert"])
+
+    def test_decisions_use_the_recent_history(self):
+        self.tracker.update("Bitcoin", 0.0, weight=5, now=0)
+
+        result = self.tracker.update("Bitcoin", 1.0, weight=1, now=HOUR)
+
+        self.assertFalse(result["alert"])
+        self.assertLess(result["scores"]["24h"], 0.2)
+        # The short window forgets the calm period first
+        self.assertGreater(result["scores"]["6h"], result["scores"]["168h"])
+
+    def test_assets_are_independent(self):
+        self.tracker.update("Bitcoin", 1.0, weight=1, now=0)
+        self.assertTrue(self.tracker.update("Ethereum", 1.0, weight=1, now=0)["alert"])
+
+    def test_state_is_persisted(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "sentiment.sqlite3")
+            SentimentTracker(SQLiteStateBackend(path)).update("Bitcoin", 1.0, weight=1, now=0)
+
+            tracker = SentimentTracker(SQLiteStateBackend(path))
+            state = tracker.load("Bitcoin")
+            self.assertTrue(state.alerting)
+            self.assertEqual(state.updated_at, 0)
+            self.assertFalse(tracker.update("Bitcoin", 1.0, weight=1, now=HOUR)["alert"])
+
+    def test_concurrent_updates_alert_once(self):
+        backend = MemoryStateBackend()
+        tracker = SentimentTracker(backend)
+        get = backend.get
+
+        def get_then_race(asset):
+            # Another instance stores the same drop between the read and the write
+            stored = get(asset)
+            if not other_results:
+                backend.get = get
+                other_results.append(SentimentTracker(backend).update(asset, 1.0, weight=1, now=0))
+            return stored
+
+        other_results = []
+        backend.get = get_then_race
+        result = tracker.update("Bitcoin", 1.0, weight=1, now=1)
+
+        self.assertTrue(other_results[0]["alert"])
+        self.assertFalse(result["alert"])
+        self.assertAlmostEqual(result["scores"]["24h"], 2 / 2.5, places=3)
+
+    def test_reverted_alert_fires_again(self):
+        result, revert = self.tracker.apply("Bitcoin", 1.0, weight=1, now=0)
+        self.assertTrue(result["alert"])
+
+        self.assertTrue(revert())
+
+        self.assertIsNone(self.tracker.backend.get("Bitcoin"))
+        self.assertTrue(self.tracker.update("Bitcoin", 1.0, weight=1, now=HOUR)["alert"])
+
+    def test_revert_keeps_later_updates(self):
+        self.tracker.update("Bitcoin", 0.0, weight=1, now=0)
+        _, revert = self.tracker.apply("Bitcoin", 1.0, weight=3, now=HOUR)
+        self.tracker.update("Bitcoin", 1.0, weight=1, now=2 * HOUR)
+
+        self.assertFalse(revert())
+        self.assertEqual(self.tracker.load("Bitcoin").updated_at, 2 * HOUR)
+
+    def test_sqlite_writes_are_conditional(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            backend = SQLiteStateBackend(os.path.join(tmpdir, "sentiment.sqlite3"))
+
+            self.assertTrue(backend.put("Bitcoin", "{}", 1.0))
+            self.assertFalse(backend.put("Bitcoin", "{}", 2.0))
+            self.assertFalse(backend.put("Bitcoin", "{}", 2.0, expected=0.0))
+            self.assertTrue(backend.put("Bitcoin", "{}", 2.0, expected=1.0))
+            self.assertFalse(backend.delete("Bitcoin", expected=1.0))
+            self.assertTrue(backend.delete("Bitcoin", expected=2.0))
+            self.assertIsNone(backend.get("Bitcoin"))
+
+    def test_drop_probability(self):
+        self.assertEqual(drop_probability({"ValueWillDrop": True}), 1.0)
+        self.assertEqual(drop_probability({"ValueWillDrop": False}), 0.0)
+        self.assertAlmostEqual(drop_probability({"ValueWillDrop": True, "Confidence": 0.6}), 0.8)
+
+
+if __name__ == "__main__":
+    unittest.main()
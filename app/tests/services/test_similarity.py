@@ -0,0 +1,114 @@
+import tempfile
+import unittest
+import numpy as np
+from unittest.mock import patch
+from src.services.llm import analyze_news_with_llm
+from src.services.news import Article
+from src.services.similarity import VerdictIndex, embed_text
+from src.utils.metrics import get_metrics, start_invocation
+
+HOUR = 3600.0
+NOW = 1700000000.0
+
+ARTICLES = [
+    Article(title="SEC sues Binance over unregistered securities", description="The regulator filed charges", content="C", publishedAt="2023-06-05"),
+    Article(title="Bitcoin slides as exchange faces lawsuit", description="Prices fell after the news", content="C", publishedAt="2023-06-05"),
+]
+
+###########
+#  Tests  #
+###########
+
+class TestEmbedText(unittest.TestCase):
+
+    def test_embeddings_are_unit_vectors(self):
+        vector = embed_text("Bitcoin hits a record high", dim=256)
+        self.assertEqual(vector.shape, (256,))
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+        self.assertFalse(embed_text("", dim=256).any())
+
+    def test_similar_texts_are_close(self):
+        text = "SEC sues Binance over unregistered securities, Bitcoin slides"
+        same = embed_text(text) @ embed_text(text.upper() + "!")
+        close = embed_text(text) @ embed_text(text + " on Monday")
+        other = embed_text(text) @ embed_text("Ethereum upgrade cuts gas fees for layer two rollups")
+
+        self.assertAlmostEqual(float(same), 1.0, places=5)
+        self.assertGreater(close, 0.8)
+        self.assertLess(other, 0.3)
+
+
+class TestVerdictIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index = VerdictIndex(self.tmpdir.name, dim=256, max_entries=3)
+        self.vector = self.index.embed(ARTICLES)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_recent_similar_verdict_is_found(self):
+        self.index.add("Bitcoin", self.vector, {"ValueWillDrop": True}, now=NOW)
+
+        match = self.index.search("Bitcoin", self.vector, threshold=0.9, max_age=6 * HOUR, now=NOW + HOUR)
+
+        self.assertEqual(match.verdict, {"ValueWillDrop": True})
+        self.assertAlmostEqual(match.similarity, 1.0, places=5)
+        self.assertEqual(match.age, HOUR)
+
+    def test_other_assets_old_and_dissimilar_verdicts_are_ignored(self):
+        self.index.add("Bitcoin", self.vector, {"ValueWillDrop": True}, now=NOW)
+        other = embed_text("Ethereum upgrade cuts gas fees", dim=256)
+
+        self.assertIsNone(self.index.search("Ethereum", self.vector, 0.9, 6 * HOUR, now=NOW + HOUR))
+        self.assertIsNone(self.index.search("Bitcoin", self.vector, 0.9, 6 * HOUR, now=NOW + 7 * HOUR))
+        self.assertIsNone(self.index.search("Bitcoin", other, 0.9, 6 * HOUR, now=NOW + HOUR))
+
+    def test_oldest_entry_is_replaced_once_full(self):
+        for i in range(4):
+            self.index.add("Bitcoin", embed_text(f"story {i}", dim=256), {"Reasoning": str(i)}, now=i + 1)
+
+        self.assertEqual(len(self.index), 3)
+        self.assertIsNone(self.index.search("Bitcoin", embed_text("story 0", dim=256), 0.9, HOUR, now=5))
+        match = self.index.search("Bitcoin", embed_text("story 3", dim=256), 0.9, HOUR, now=5)
+        self.assertEqual(match.verdict, {"Reasoning": "3"})
+
+    def test_index_is_persisted(self):
+        self.index.add("Bitcoin", self.vector, {"ValueWillDrop": False}, now=NOW)
+
+        index = VerdictIndex(self.tmpdir.name, dim=256, max_entries=3)
+
+        self.assertEqual(index.search("Bitcoin", self.vector, 0.9, HOUR, now=NOW + 1).verdict, {"ValueWillDrop": False})
+
+
+class TestSimilarityCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        index = VerdictIndex(self.tmpdir.name, dim=256, max_entries=8)
+        patcher = patch("src.services.similarity.get_similarity_index", return_value=index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmpdir.cleanup)
+        start_invocation()
+
+    @patch.dict("src.services.llm.CONFIG", {"SIMILARITY_CACHE": True, "LLM_CASCADE": []})
+    @patch("src.services.llm.call_model", return_value='{"Reasoning": "Lawsuit", "ValueWillDrop": true}')
+    def test_near_identical_articles_reuse_the_verdict(self, mock_call_model):
+        first = analyze_news_with_llm(ARTICLES, "Bitcoin")
+        # The same stories, re-published with another description
+        republished = [ARTICLES[0], ARTICLES[1].replace(description="Prices fell after the news on Monday")]
+        second = analyze_news_with_llm(republished, "Bitcoin")
+        third = analyze_news_with_llm(republished, "Ethereum")
+
+        self.assertEqual(mock_call_model.call_count, 2)
+        self.assertNotIn("Similarity", first)
+        self.assertTrue(second["ValueWillDrop"])
+        self.assertGreater(second["Similarity"], 0.9)
+        self.assertNotIn("Similarity", third)
+        self.assertAlmostEqual(get_metrics().to_dict()["similarity_hit_rate"], 1 / 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
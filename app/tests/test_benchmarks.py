@@ -0,0 +1,142 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from benchmarks.profile_handler import Sampler, module_name, stack_hot_spots
+from benchmarks.run import compare, percentile
+from benchmarks.standins import (
+    NewsAPIStandIn,
+    OpenAIStandIn,
+    ReplayNewsAPIStandIn,
+    ReplayOpenAIStandIn,
+    SESStandIn,
+    StandInProfile,
+    load_recording,
+)
+from src.services.news import iter_articles
+from src.services.llm import call_model, parse_response
+from src.utils.ratelimit import LocalRateBackend, RateLimitScheduler
+
+###########
+#  Tests  #
+###########
+
+class TestStandIns(unittest.TestCase):
+
+    def test_news_api_stand_in_paginates(self):
+        with NewsAPIStandIn(total_results=30, content_chars=50) as news:
+            with patch.dict("src.services.news.CONFIG", {"NEWS_API_URL": news.url}):
+                articles = list(iter_articles("bitcoin", top_k=25, page_size=10))
+            self.assertEqual(len(articles), 25)
+            self.assertEqual(news.requests, 3)
+            self.assertLessEqual(len(articles[0].content), 50)
+
+    def test_openai_stand_in_answers_chat_completions(self):
+        from openai import OpenAI
+        with OpenAIStandIn(drop_rate=1.0) as stand_in:
+            client = OpenAI(api_key="test", base_url=stand_in.url, max_retries=0)
+            verdict = parse_response(call_model("Is the price dropping?", client))
+        self.assertTrue(verdict["ValueWillDrop"])
+
+    def test_ses_stand_in_accepts_send_email(self):
+        import boto3
+        with SESStandIn() as ses:
+            client = boto3.client(
+                "ses",
+                region_name="us-east-1",
+                endpoint_url=ses.url,
+                aws_access_key_id="test",
+                aws_secret_access_key="test",
+            )
+            response = client.send_email(
+                Source="a@example.com",
+                Destination={"ToAddresses": ["b@example.com"]},
+                Message={"Subject": {"Data": "S"}, "Body": {"Text": {"Data": "B"}}},
+            )
+            self.assertIn("MessageId", response)
+            self.assertEqual(ses.messages[0]["Source"], ["a@example.com"])
+
+    def test_error_rate(self):
+        with NewsAPIStandIn(StandInProfile(error_rate=1.0)) as news:
+            with patch.dict("src.services.news.CONFIG", {"NEWS_API_URL": news.url}), \
+                    patch("src.services.news.news_api_policy.max_attempts", 1):
+                with self.assertRaises(Exception):
+                    list(iter_articles("bitcoin", top_k=1))
+            self.assertEqual(news.errors, 1)
+
+
+class TestReplay(unittest.TestCase):
+
+    def test_recorded_pages_are_replayed(self):
+        page = {"status": "ok", "totalResults": 2, "articles": [
+            {"source": {"name": "Recorded"}, "title": f"Recorded {i}", "description": "D", "content": "C",
+             "url": f"https://news.example.com/{i}", "publishedAt": "2025-01-10T12:00:00Z"}
+            for i in range(2)
+        ]}
+        with ReplayNewsAPIStandIn({"Bitcoin": [page]}, total_results=5) as news:
+            with patch.dict("src.services.news.CONFIG", {"NEWS_API_URL": news.url}):
+                recorded = list(iter_articles("bitcoin", top_k=10, page_size=2))
+                generated = list(iter_articles("ethereum", top_k=10, page_size=2))
+        self.assertEqual([a.title for a in recorded], ["Recorded 0", "Recorded 1"])
+        self.assertEqual(len(generated), 5)
+
+    def test_recorded_answers_are_replayed_in_turn(self):
+        from openai import OpenAI
+        completion = {"choices": [{"message": {"content": '{"Reasoning": "B", "ValueWillDrop": false}'}}]}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "recording.json")
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump({"openai": ['{"Reasoning": "A", "ValueWillDrop": true}', completion]}, file)
+            recording = load_recording(path)
+
+        with ReplayOpenAIStandIn(recording["openai"]) as stand_in:
+            client = OpenAI(api_key="test", base_url=stand_in.url, max_retries=0)
+            reasons = [parse_response(call_model("Is the price dropping?", client))["Reasoning"] for _ in range(3)]
+        self.assertEqual(reasons, ["A", "B", "A"])
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_pipeline_threads_are_sampled(self):
+        scheduler = RateLimitScheduler(LocalRateBackend(), {"news_requests": (5, 1)})
+        scheduler.acquire("news_requests")
+        # Waits about 0.2s for the bucket to refill, inside the pipeline
+        thread = threading.Thread(target=scheduler.acquire, args=("news_requests",), name="worker-1")
+
+        sampler = Sampler(interval=0.005, memory=False).start()
+        thread.start()
+        thread.join()
+        sampler.stop()
+
+        stacks = [stack for stack in sampler.stacks if stack.startswith("worker;")]
+        self.assertTrue(stacks)
+        self.assertTrue(all("src.utils.ratelimit:acquire" in stack for stack in stacks))
+
+    def test_hot_spots(self):
+        stacks = {"MainThread;a:main;b:fetch": 3, "MainThread;a:main;c:parse": 1, "pool;c:parse;c:parse": 2}
+        self.assertEqual(stack_hot_spots(stacks, limit=2), [("b:fetch", 3, 3), ("c:parse", 3, 3)])
+
+    def test_module_name(self):
+        self.assertEqual(module_name(os.path.abspath("src/services/llm.py")), "src.services.llm")
+        self.assertEqual(module_name(threading.__file__), "threading")
+
+
+class TestReport(unittest.TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+
+    def test_compare_flags_regressions(self):
+        baseline = {"s": {"p50_ms": 100, "p95_ms": 200, "p99_ms": 300, "peak_mb": 1, "assets_per_s": 10}}
+        results = {"s": {"p50_ms": 105, "p95_ms": 300, "p99_ms": 300, "peak_mb": 1, "assets_per_s": 5}}
+        regressions = compare(results, baseline, tolerance=0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("s p95_ms"))
+
+
+if __name__ == "__main__":
+    unittest.main()
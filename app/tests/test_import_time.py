@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+import unittest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start budget for importing the handler, in milliseconds
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "500"))
+
+# Heavy modules that must only be imported when they are first needed
+LAZY_MODULES = ("openai", "boto3", "dotenv", "numpy")
+
+def import_times(module: str) -> dict:
+    """Imports a module in a fresh interpreter and returns the cumulative
+    import time of every imported module, in microseconds."""
+    env = {**os.environ, "AWS_EXECUTION_ENV": "AWS_Lambda_python3.9"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+###########
+#  Tests  #
+###########
+
+class TestImportTime(unittest.TestCase):
+
+    def test_handler_import_within_budget(self):
+        times = import_times("lambda_function")
+        self.assertLess(times["lambda_function"] / 1000, IMPORT_TIME_BUDGET_MS)
+
+    def test_heavy_clients_are_not_imported(self):
+        times = import_times("lambda_function")
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, times)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,266 @@
+import json
+import time
+import unittest
+from unittest.mock import patch
+from botocore.exceptions import NoCredentialsError
+from lambda_function import lambda_handler, analyze_assets
+from src.services.email import DigestDeliveryError
+from src.services.news import Article
+from src.services.seen import SeenArticleIndex, MemoryBackend
+from src.services.sentiment import SentimentTracker, MemoryStateBackend
+from src.utils.ratelimit import TokenBucket
+
+ARTICLES = [
+    Article(title="T", description="D", content="C", publishedAt="2021-10-01")
+]
+
+###########
+#  Tests  #
+###########
+
+@patch.dict("lambda_function.CONFIG", {"RELEVANCE_THRESHOLD": 0.0, "SENTIMENT_BACKEND": "none"})
+@patch("lambda_function.get_seen_index", return_value=None)
+class TestLambdaHandler(unittest.TestCase):
+
+    @patch("lambda_function.send_email_alert")
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": True})
+    @patch("lambda_function.fetch_articles", return_value=ARTICLES)
+    @patch.dict("lambda_function.CONFIG", {"CRYPTO_NAME": "Bitcoin", "CRYPTO_NAMES": []})
+    def test_single_asset_alert(self, mock_fetch, mock_analyze, mock_send, mock_index):
+        result = lambda_handler(None, None)
+        self.assertEqual(result["statusCode"], 200)
+        self.assertEqual(result["body"], "Alert email sent.")
+        mock_send.assert_called_once_with(justification="R", crypto_name="Bitcoin", articles_analyzed=1, price_move=None)
+
+    @patch("lambda_function.send_email_alert")
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": True})
+    @patch("lambda_function.fetch_articles", return_value=ARTICLES)
+    @patch.dict("lambda_function.CONFIG", {"CRYPTO_NAME": "Bitcoin", "CRYPTO_NAMES": []})
+    def test_repeated_drop_alerts_once(self, mock_fetch, mock_analyze, mock_send, mock_index):
+        tracker = SentimentTracker(MemoryStateBackend())
+        with patch("lambda_function.get_sentiment_tracker", return_value=tracker):
+            first = lambda_handler(None, None)
+            second = lambda_handler(None, None)
+
+        mock_send.assert_called_once()
+        self.assertEqual(first["body"], "Alert email sent.")
+        self.assertTrue(first["sentiment"]["alert"])
+        self.assertFalse(second["alert"])
+        self.assertIn("already alerted", second["body"])
+
+    @patch("lambda_function.send_email_alert")
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": True})
+    @patch("lambda_function.fetch_articles", return_value=ARTICLES)
+    @patch.dict("lambda_function.CONFIG", {"CRYPTO_NAME": "Bitcoin", "CRYPTO_NAMES": []})
+    def test_failed_email_alerts_again(self, mock_fetch, mock_analyze, mock_send, mock_index):
+        mock_index.return_value = SeenArticleIndex(MemoryBackend())
+        mock_send.side_effect = [Exception("SES down"), {"MessageId": "1"}]
+        tracker = SentimentTracker(MemoryStateBackend())
+        with patch("lambda_function.get_sentiment_tracker", return_value=tracker):
+            first = lambda_handler(None, None)
+            second = lambda_handler(None, None)
+
+        self.assertEqual(first["statusCode"], 500)
+        # Neither the articles nor the alert were stored as handled
+        self.assertEqual(second["body"], "Alert email sent.")
+        self.assertEqual(mock_send.call_count, 2)
+        self.assertTrue(tracker.load("Bitcoin").alerting)
+
+    @patch("builtins.print")
+    @patch("src.services.email.get_ses_client")
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": True})
+    @patch("lambda_function.fetch_articles", return_value=ARTICLES)
+    @patch.dict("lambda_function.CONFIG", {"CRYPTO_NAME": "Bitcoin", "CRYPTO_NAMES": []})
+    def test_missing_credentials_alert_again(self, mock_fetch, mock_analyze, mock_ses, mock_print, mock_index):
+        mock_index.return_value = SeenArticleIndex(MemoryBackend())
+        mock_ses.return_value.send_email.side_effect = [NoCredentialsError(), {"MessageId": "1"}]
+        tracker = SentimentTracker(MemoryStateBackend())
+        with patch("lambda_function.get_sentiment_tracker", return_value=tracker):
+            first = lambda_handler(None, None)
+            second = lambda_handler(None, None)
+
+        self.assertEqual(first["statusCode"], 500)
+        self.assertEqual(second["body"], "Alert email sent.")
+        self.assertTrue(tracker.load("Bitcoin").alerting)
+
+    @patch("builtins.print")
+    @patch("lambda_function.send_email_alert")
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": True})
+    @patch("lambda_function.fetch_articles", return_value=ARTICLES)
+    @patch.dict("lambda_function.CONFIG", {"CRYPTO_NAME": "Bitcoin", "CRYPTO_NAMES": [], "METRICS_ENABLED": True})
+    def test_metrics_are_returned_and_emitted(self, mock_fetch, mock_analyze, mock_send, mock_print, mock_index):
+        result = lambda_handler(None, None)
+
+        metrics = result["metrics"]
+        self.assertTrue({"fetch", "filter", "email"} <= set(metrics["stages"]))
+        self.assertEqual(metrics["counters"]["articles_analyzed"], 1)
+        emf = json.loads(mock_print.call_args.args[0])
+        self.assertEqual(emf["_aws"]["CloudWatchMetrics"][0]["Namespace"], "CryptoNews")
+        self.assertIn("fetch_ms", emf)
+
+    @patch("lambda_function.fetch_articles", return_value=[])
+    @patch.dict("lambda_function.CONFIG", {"CRYPTO_NAME": "Bitcoin", "CRYPTO_NAMES": []})
+    def test_single_asset_no_articles(self, mock_fetch, mock_index):
+        result = lambda_handler(None, None)
+        self.assertEqual(result["body"], "No news articles available.")
+
+    @patch("lambda_function.fetch_articles", side_effect=Exception("boom"))
+    @patch.dict("lambda_function.CONFIG", {"CRYPTO_NAME": "Bitcoin", "CRYPTO_NAMES": []})
+    def test_single_asset_error(self, mock_fetch, mock_index):
+        result = lambda_handler(None, None)
+        self.assertEqual(result["statusCode"], 500)
+        self.assertEqual(result["body"], "boom")
+        self.assertIn("fetch", result["metrics"]["stages"])
+
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": False})
+    @patch("lambda_function.fetch_articles", return_value=ARTICLES)
+    @patch.dict("lambda_function.CONFIG", {"CRYPTO_NAME": "Bitcoin", "CRYPTO_NAMES": []})
+    def test_seen_articles_are_not_analyzed_again(self, mock_fetch, mock_analyze, mock_index):
+        mock_index.return_value = SeenArticleIndex(MemoryBackend())
+
+        first = lambda_handler(None, None)
+        second = lambda_handler(None, None)
+
+        self.assertEqual(first["body"], "No market drop detected.")
+        self.assertEqual(second["body"], "No new news articles available.")
+        mock_analyze.assert_called_once()
+
+    @patch("lambda_function.enrich_articles")
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": False})
+    @patch("lambda_function.fetch_articles", return_value=ARTICLES)
+    @patch.dict("lambda_function.CONFIG", {"CRYPTO_NAME": "Bitcoin", "CRYPTO_NAMES": [], "ENRICH_CONTENT": True})
+    def test_enriched_articles_are_analyzed(self, mock_fetch, mock_analyze, mock_enrich, mock_index):
+        enriched = [ARTICLES[0].replace(content="Full text")]
+        mock_enrich.return_value = enriched
+        mock_index.return_value = SeenArticleIndex(MemoryBackend())
+
+        lambda_handler(None, None)
+        second = lambda_handler(None, None)
+
+        self.assertEqual(mock_analyze.call_args.kwargs["news_articles"], enriched)
+        # The seen index keeps the NewsAPI content, so the article is not analyzed again
+        self.assertEqual(second["body"], "No new news articles available.")
+        mock_analyze.assert_called_once()
+
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": False})
+    @patch("lambda_function.fetch_articles")
+    @patch.dict("lambda_function.CONFIG", {"CRYPTO_NAME": "Bitcoin", "CRYPTO_NAMES": [], "RELEVANCE_THRESHOLD": 0.3})
+    def test_irrelevant_articles_are_dropped(self, mock_fetch, mock_analyze, mock_index):
+        relevant = Article(title="Bitcoin hits record", description="D", content="C", publishedAt="2021-10-01")
+        removed = Article(title="[Removed]", description="[Removed]", content="[Removed]", publishedAt="2021-10-01")
+        mock_fetch.return_value = [relevant, removed] + ARTICLES
+
+        result = lambda_handler(None, None)
+
+        self.assertEqual(result["articles_dropped"], 2)
+        self.assertEqual(mock_analyze.call_args.kwargs["news_articles"], [relevant])
+
+
+@patch.dict("lambda_function.CONFIG", {"RELEVANCE_THRESHOLD": 0.0, "SENTIMENT_BACKEND": "none"})
+@patch("lambda_function.get_seen_index", return_value=None)
+class TestMultiAsset(unittest.TestCase):
+
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": False})
+    @patch("lambda_function.fetch_articles")
+    def test_failing_asset_does_not_fail_run(self, mock_fetch, mock_analyze, mock_index):
+        def fetch(query, date, top_k):
+            if query == "Dogecoin":
+                raise Exception("NewsAPI down")
+            return ARTICLES
+        mock_fetch.side_effect = fetch
+
+        result = lambda_handler({"assets": ["Bitcoin", "Dogecoin", "Ethereum"]}, None)
+
+        self.assertEqual(result["statusCode"], 200)
+        self.assertEqual([r["asset"] for r in result["results"]], ["Bitcoin", "Dogecoin", "Ethereum"])
+        self.assertEqual(result["results"][1], {"asset": "Dogecoin", "statusCode": 500, "body": "NewsAPI down"})
+        self.assertEqual(result["results"][2]["body"], "No market drop detected.")
+
+    @patch("lambda_function.send_digest")
+    @patch("lambda_function.send_email_alert")
+    @patch("lambda_function.analyze_news_with_llm")
+    @patch("lambda_function.fetch_articles", return_value=ARTICLES)
+    @patch.dict("lambda_function.CONFIG", {"ALERT_EMAILS": ["a@example.com", "b@example.com"]})
+    def test_alerts_are_sent_as_one_digest(self, mock_fetch, mock_analyze, mock_send, mock_digest, mock_index):
+        mock_analyze.side_effect = lambda news_articles, crypto_name: {
+            "Reasoning": f"{crypto_name} reason",
+            "ValueWillDrop": crypto_name != "Ethereum",
+        }
+
+        result = lambda_handler({"assets": ["Bitcoin", "Ethereum", "Solana"]}, None)
+
+        mock_send.assert_not_called()
+        mock_digest.assert_called_once()
+        alerts, subscriptions = mock_digest.call_args.args
+        self.assertEqual([alert["asset"] for alert in alerts], ["Bitcoin", "Solana"])
+        self.assertEqual(alerts[0], {"asset": "Bitcoin", "reasoning": "Bitcoin reason", "articles_analyzed": 1, "price_move": None})
+        self.assertEqual(subscriptions, {"a@example.com": None, "b@example.com": None})
+        self.assertIn("2 alert(s) sent", result["body"])
+
+    @patch("lambda_function.send_digest")
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": True})
+    @patch("lambda_function.fetch_articles", return_value=ARTICLES)
+    @patch.dict("lambda_function.CONFIG", {"ALERT_EMAILS": ["a@example.com"]})
+    def test_failed_digest_alerts_again(self, mock_fetch, mock_analyze, mock_digest, mock_index):
+        mock_index.return_value = SeenArticleIndex(MemoryBackend())
+        mock_digest.side_effect = [Exception("SES down"), None]
+        tracker = SentimentTracker(MemoryStateBackend())
+        with patch("lambda_function.get_sentiment_tracker", return_value=tracker):
+            first = lambda_handler({"assets": ["Bitcoin"]}, None)
+            second = lambda_handler({"assets": ["Bitcoin"]}, None)
+
+        self.assertEqual(first["statusCode"], 500)
+        self.assertNotIn("commit", first["results"][0])
+        self.assertIn("1 alert(s) sent", second["body"])
+        self.assertNotIn("commit", second["results"][0])
+        self.assertEqual(mock_digest.call_args.args[0][0]["asset"], "Bitcoin")
+        self.assertTrue(tracker.load("Bitcoin").alerting)
+
+    @patch("builtins.print")
+    @patch("src.services.email.get_send_rate_limiter", return_value=TokenBucket(rate=1000, capacity=1000))
+    @patch("src.services.email.get_ses_client")
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": True})
+    @patch("lambda_function.fetch_articles", return_value=ARTICLES)
+    @patch.dict("lambda_function.CONFIG", {"ALERT_EMAILS": ["a@example.com"]})
+    def test_digest_without_credentials_alerts_again(self, mock_fetch, mock_analyze, mock_ses, mock_limiter, mock_print, mock_index):
+        mock_ses.return_value.send_email.side_effect = [NoCredentialsError(), {"MessageId": "1"}]
+        tracker = SentimentTracker(MemoryStateBackend())
+        with patch("lambda_function.get_sentiment_tracker", return_value=tracker):
+            first = lambda_handler({"assets": ["Bitcoin"]}, None)
+            second = lambda_handler({"assets": ["Bitcoin"]}, None)
+
+        self.assertEqual(first["statusCode"], 500)
+        self.assertIn("1 alert(s) sent", second["body"])
+        self.assertEqual(mock_ses.return_value.send_email.call_count, 2)
+
+    @patch("lambda_function.send_digest")
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": True})
+    @patch("lambda_function.fetch_articles", return_value=ARTICLES)
+    def test_only_undelivered_digest_alerts_fire_again(self, mock_fetch, mock_analyze, mock_digest, mock_index):
+        mock_digest.side_effect = DigestDeliveryError("1 of 2 digest email(s) failed", frozenset({"Solana"}))
+        tracker = SentimentTracker(MemoryStateBackend())
+        with patch("lambda_function.get_sentiment_tracker", return_value=tracker):
+            result = lambda_handler({"assets": ["Bitcoin", "Solana"]}, None)
+
+        self.assertEqual(result["statusCode"], 500)
+        self.assertTrue(tracker.load("Bitcoin").alerting)
+        self.assertFalse(tracker.load("Solana").alerting)
+
+    @patch("lambda_function.analyze_news_with_llm", return_value={"Reasoning": "R", "ValueWillDrop": False})
+    @patch("lambda_function.fetch_articles")
+    def test_assets_run_concurrently(self, mock_fetch, mock_analyze, mock_index):
+        def fetch(query, date, top_k):
+            time.sleep(0.2)
+            return ARTICLES
+        mock_fetch.side_effect = fetch
+
+        start = time.perf_counter()
+        results = analyze_assets(["A", "B", "C", "D"], date=None, max_workers=4)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(results), 4)
+        self.assertLess(elapsed, 0.6)
+
+
+if __name__ == "__main__":
+    unittest.main()
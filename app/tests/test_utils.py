@@ -0,0 +1,310 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+from src.utils import resilience
+from src.utils.metrics import Metrics
+from src.utils.ratelimit import (
+    TokenBucket,
+    LocalRateBackend,
+    SQLiteRateBackend,
+    RateLimitScheduler,
+    asset_priority,
+    current_priority,
+    rate_limit_priority,
+    wait_for_capacity,
+)
+from src.utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    ResiliencePolicy,
+    call_timeout,
+    set_deadline,
+)
+
+class TransientError(Exception):
+    pass
+
+def make_policy(**kwargs) -> ResiliencePolicy:
+    defaults = dict(
+        name="test",
+        timeout=5,
+        max_attempts=3,
+        base_delay=0.001,
+        max_delay=0.002,
+        is_retryable=lambda e: isinstance(e, TransientError),
+    )
+    return ResiliencePolicy(**{**defaults, **kwargs})
+
+###########
+#  Tests  #
+###########
+
+class TestResiliencePolicy(unittest.TestCase):
+
+    def tearDown(self):
+        set_deadline(None)
+
+    def test_retries_transient_errors(self):
+        fn = Mock(side_effect=[TransientError(), TransientError(), "ok"])
+        self.assertEqual(make_policy().call(fn), "ok")
+        self.assertEqual(fn.call_count, 3)
+
+    def test_gives_up_after_max_attempts(self):
+        fn = Mock(side_effect=TransientError())
+        with self.assertRaises(TransientError):
+            make_policy().call(fn)
+        self.assertEqual(fn.call_count, 3)
+
+    def test_does_not_retry_other_errors(self):
+        fn = Mock(side_effect=ValueError("bad request"))
+        with self.assertRaises(ValueError):
+            make_policy().call(fn)
+        fn.assert_called_once()
+
+    def test_timeout_is_capped_by_deadline(self):
+        context = Mock()
+        context.get_remaining_time_in_millis.return_value = 3000
+        set_deadline(context, safety_margin=1)
+        fn = Mock(return_value="ok")
+        make_policy(timeout=30).call(fn)
+        self.assertLessEqual(fn.call_args.args[0], 2)
+
+    def test_deadline_exceeded(self):
+        context = Mock()
+        context.get_remaining_time_in_millis.return_value = 500
+        set_deadline(context, safety_margin=1)
+        with self.assertRaises(DeadlineExceeded):
+            call_timeout(10)
+
+    def test_hedged_request_returns_first_success(self):
+        policy = make_policy(hedge_percentile=50)
+        for _ in range(ResiliencePolicy.MIN_HEDGE_SAMPLES):
+            policy.latencies.record(0.01)
+
+        calls = []
+        lock = threading.Lock()
+        def fn(timeout):
+            with lock:
+                calls.append(timeout)
+                first = len(calls) == 1
+            time.sleep(1.0 if first else 0.01)
+            return "slow" if first else "fast"
+
+        start = time.monotonic()
+        result = policy.call(fn)
+        self.assertEqual(result, "fast")
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(len(calls), 2)
+
+    def test_hedging_can_be_disabled_per_call(self):
+        policy = make_policy(hedge_percentile=50)
+        for _ in range(ResiliencePolicy.MIN_HEDGE_SAMPLES):
+            policy.latencies.record(0.001)
+        fn = Mock(side_effect=lambda timeout: time.sleep(0.05) or "ok")
+        self.assertEqual(policy.call(fn, hedge=False), "ok")
+        fn.assert_called_once()
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+        policy = make_policy(max_attempts=1, breaker=breaker)
+        fn = Mock(side_effect=TransientError())
+        for _ in range(2):
+            with self.assertRaises(TransientError):
+                policy.call(fn)
+
+        with self.assertRaises(CircuitOpenError):
+            policy.call(fn)
+        self.assertEqual(fn.call_count, 2)
+        self.assertEqual(breaker.state, "open")
+
+    def test_half_open_trial_closes_circuit(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+        with patch.object(resilience.time, "monotonic", return_value=time.monotonic() + 61):
+            self.assertEqual(breaker.state, "half-open")
+            breaker.allow()
+            # Only one trial call is let through
+            with self.assertRaises(CircuitOpenError):
+                breaker.allow()
+            breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_deadline_does_not_take_the_trial(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        context = Mock()
+        context.get_remaining_time_in_millis.return_value = 500
+        set_deadline(context, safety_margin=1)
+        try:
+            with self.assertRaises(DeadlineExceeded):
+                make_policy(breaker=breaker).call(Mock(return_value="ok"))
+        finally:
+            set_deadline(None)
+
+        self.assertEqual(make_policy(breaker=breaker).call(Mock(return_value="ok")), "ok")
+        self.assertEqual(breaker.state, "closed")
+
+    def test_rejected_trial_does_not_close_the_circuit(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        policy = make_policy(breaker=breaker)
+
+        with self.assertRaises(ValueError):
+            policy.call(Mock(side_effect=ValueError("bad request")))
+
+        self.assertEqual(breaker.state, "half-open")
+        # The trial is released for the next call
+        self.assertEqual(policy.call(Mock(return_value="ok")), "ok")
+        self.assertEqual(breaker.state, "closed")
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertGreater(bucket.try_acquire(), 0)
+
+    def test_acquire_timeout(self):
+        bucket = TokenBucket(rate=1, capacity=1)
+        self.assertTrue(bucket.acquire(timeout=0))
+        self.assertFalse(bucket.acquire(timeout=0.1))
+
+    def test_acquire_more_than_capacity(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=1, capacity=1).acquire(2)
+
+
+class TestRateLimitScheduler(unittest.TestCase):
+
+    def test_unlimited_bucket(self):
+        scheduler = RateLimitScheduler(LocalRateBackend(), {"llm_tokens": (0, 0)})
+        self.assertTrue(scheduler.acquire("llm_tokens", 10 ** 6, timeout=0))
+        self.assertTrue(scheduler.acquire("unknown"))
+
+    def test_work_waits_for_capacity(self):
+        scheduler = RateLimitScheduler(LocalRateBackend(), {"news_requests": (20, 1)})
+        start = time.perf_counter()
+        self.assertTrue(scheduler.acquire("news_requests"))
+        self.assertTrue(scheduler.acquire("news_requests"))
+        self.assertGreaterEqual(time.perf_counter() - start, 0.04)
+        self.assertFalse(scheduler.acquire("news_requests", timeout=0.01))
+
+    def test_slow_backend_does_not_block_other_buckets(self):
+        backend = LocalRateBackend()
+        try_acquire = backend.try_acquire
+        def slow_for_news(name, *args):
+            if name == "news_requests":
+                time.sleep(0.3)
+            return try_acquire(name, *args)
+        backend.try_acquire = slow_for_news
+        scheduler = RateLimitScheduler(backend, {"news_requests": (1, 1), "llm_requests": (1, 1)})
+
+        news = threading.Thread(target=scheduler.acquire, args=("news_requests",))
+        news.start()
+        time.sleep(0.05)
+        start = time.perf_counter()
+        self.assertTrue(scheduler.acquire("llm_requests"))
+        self.assertLess(time.perf_counter() - start, 0.15)
+        news.join()
+
+    def test_tokens_are_capped_to_the_capacity(self):
+        scheduler = RateLimitScheduler(LocalRateBackend(), {"llm_tokens": (1000, 100)})
+        self.assertTrue(scheduler.acquire("llm_tokens", 500, timeout=0))
+
+    def test_high_priority_is_served_first(self):
+        scheduler = RateLimitScheduler(LocalRateBackend(), {"llm_requests": (10, 1)})
+        scheduler.acquire("llm_requests")
+        order = []
+
+        def work(name, priority):
+            with rate_limit_priority(priority):
+                scheduler.acquire("llm_requests")
+            order.append(name)
+
+        low = threading.Thread(target=work, args=("low", 0))
+        high = threading.Thread(target=work, args=("high", 5))
+        low.start()
+        time.sleep(0.02)
+        high.start()
+        low.join()
+        high.join()
+
+        self.assertEqual(order, ["high", "low"])
+
+    def test_sqlite_backend_is_shared(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "ratelimit.sqlite3")
+            first, second = SQLiteRateBackend(path), SQLiteRateBackend(path)
+            self.assertEqual(first.try_acquire("news_requests", 1, rate=0.01, capacity=2), 0)
+            self.assertEqual(second.try_acquire("news_requests", 1, rate=0.01, capacity=2), 0)
+            self.assertGreater(first.try_acquire("news_requests", 1, rate=0.01, capacity=2), 0)
+
+    @patch.dict("src.utils.ratelimit.CONFIG", {"ASSET_PRIORITIES": {"bitcoin": 10}})
+    def test_priority_context(self):
+        self.assertEqual(current_priority(), 0)
+        with rate_limit_priority(asset_priority("Bitcoin")):
+            self.assertEqual(current_priority(), 10)
+        self.assertEqual(asset_priority("Dogecoin"), 0)
+
+    @patch("src.utils.ratelimit.remaining_time", return_value=0.01)
+    def test_wait_is_bounded_by_the_deadline(self, mock_remaining):
+        scheduler = RateLimitScheduler(LocalRateBackend(), {"news_requests": (0.1, 1)})
+        scheduler.acquire("news_requests")
+        with patch("src.utils.ratelimit.get_scheduler", return_value=scheduler):
+            with self.assertRaises(resilience.DeadlineExceeded):
+                wait_for_capacity("news_requests")
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_spans_and_counters(self):
+        metrics = Metrics()
+        with metrics.span("model"):
+            time.sleep(0.01)
+        metrics.add_time("fetch", 0.002)
+        metrics.add_time("fetch", 0.004)
+        metrics.count("llm_cache_hits")
+        metrics.count("llm_cache_misses", 3)
+        metrics.record_usage(Mock(prompt_tokens=100, completion_tokens=20, total_tokens=120))
+
+        summary = metrics.to_dict()
+        self.assertEqual(list(summary["stages"]), ["fetch", "model"])
+        self.assertEqual(summary["stages"]["fetch"], {"count": 2, "total_ms": 6.0, "max_ms": 4.0})
+        self.assertGreaterEqual(summary["stages"]["model"]["total_ms"], 10)
+        self.assertEqual(summary["counters"]["total_tokens"], 120)
+        self.assertEqual(summary["llm_cache_hit_rate"], 0.25)
+
+    def test_usage_without_counts_is_ignored(self):
+        metrics = Metrics()
+        metrics.record_usage(None)
+        metrics.record_usage(Mock())
+        self.assertEqual(metrics.to_dict()["counters"], {})
+
+    def test_emf_document(self):
+        metrics = Metrics()
+        metrics.add_time("fetch", 0.5)
+        metrics.count("prompt_tokens", 42)
+
+        document = metrics.to_emf("CryptoNews", {"Service": "CryptoNews"})
+
+        directive = document["_aws"]["CloudWatchMetrics"][0]
+        self.assertEqual(directive["Namespace"], "CryptoNews")
+        self.assertEqual(directive["Dimensions"], [["Service"]])
+        self.assertIn({"Name": "fetch_ms", "Unit": "Milliseconds"}, directive["Metrics"])
+        self.assertIn({"Name": "prompt_tokens", "Unit": "Count"}, directive["Metrics"])
+        self.assertEqual(document["fetch_ms"], 500.0)
+        self.assertEqual(document["prompt_tokens"], 42)
+        self.assertEqual(document["Service"], "CryptoNews")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from src.utils.metrics import get_metrics
+from src.utils.resilience import ResiliencePolicy
+from worker import AssetPoller, DailyQuota, Worker, count_news_requests, worst_case_poll_requests
+
+DAY = 86400.0
+
+def make_result(new_articles: int = 0, drop: bool = False, score: float = None) -> dict:
+    result = {"statusCode": 200, "body": "B", "articles_analyzed": new_articles, "analysis": {"ValueWillDrop": drop}}
+    if score is not None:
+        result["sentiment"] = {"scores": {"6h": score, "24h": score}}
+    return result
+
+###########
+#  Tests  #
+###########
+
+class TestDailyQuota(unittest.TestCase):
+
+    def test_quota_is_spread_over_the_day(self):
+        now = [10 * DAY + DAY / 2]
+        quota = DailyQuota(100, clock=lambda: now[0])
+        quota.record(50)
+
+        # 50 requests left for 4 assets over half a day
+        self.assertEqual(quota.remaining(), 50)
+        self.assertAlmostEqual(quota.min_interval(4), DAY / 2 * 4 / 50)
+
+    def test_quota_is_reset_at_midnight(self):
+        now = [10 * DAY + DAY - 60]
+        quota = DailyQuota(2, clock=lambda: now[0])
+        quota.record(2)
+        self.assertEqual(quota.remaining(), 0)
+        self.assertAlmostEqual(quota.min_interval(1), 60)
+
+        now[0] += 61
+        self.assertEqual(quota.remaining(), 2)
+
+    def test_polls_in_flight_are_reserved(self):
+        quota = DailyQuota(1)
+        quota.reserve()
+        self.assertEqual(quota.remaining(), 0)
+        quota.release()
+        self.assertEqual(quota.remaining(), 1)
+
+    def test_used_requests_survive_a_restart(self):
+        now = [10 * DAY]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "quota.sqlite3")
+            DailyQuota(5, clock=lambda: now[0], path=path).record(3)
+
+            quota = DailyQuota(5, clock=lambda: now[0], path=path)
+            self.assertEqual(quota.remaining(), 2)
+
+            now[0] += DAY
+            self.assertEqual(quota.remaining(), 5)
+            quota.record()
+            self.assertEqual(DailyQuota(5, clock=lambda: now[0], path=path).used, 1)
+
+    def test_worst_case_covers_every_page_retry_and_hedge(self):
+        policy = ResiliencePolicy("NewsAPI", max_attempts=3)
+        self.assertEqual(worst_case_poll_requests(10, policy), 3)
+        self.assertEqual(worst_case_poll_requests(250, policy), 9)
+
+        policy.hedge_percentile = 95
+        self.assertEqual(worst_case_poll_requests(10, policy), 6)
+
+    @patch.dict("worker.CONFIG", {"NEWS_API_URL": "https://newsapi.org/v2/everything"})
+    def test_only_news_requests_are_counted(self):
+        quota = DailyQuota(10)
+        hook = count_news_requests(quota)
+
+        hook(MagicMock(url="https://newsapi.org/v2/everything?q=bitcoin"))
+        hook(MagicMock(url="https://news.example.com/article"))
+
+        self.assertEqual(quota.used, 1)
+
+
+class TestAssetPoller(unittest.TestCase):
+
+    def setUp(self):
+        self.poller = AssetPoller("Bitcoin", interval=3600, min_interval=300, max_interval=4 * 3600)
+
+    def test_quiet_asset_slows_down(self):
+        self.assertEqual(self.poller.update(make_result(0)), 7200)
+        self.assertEqual(self.poller.update(make_result(0)), 4 * 3600)
+        self.assertEqual(self.poller.update(make_result(0)), 4 * 3600)
+
+    def test_rising_volume_speeds_up(self):
+        self.assertEqual(self.poller.update(make_result(3)), 1800)
+        # A steady flow of news keeps the interval
+        for _ in range(10):
+            self.poller.update(make_result(3))
+        interval = self.poller.interval
+        self.assertEqual(self.poller.update(make_result(3)), interval)
+        self.assertEqual(self.poller.update(make_result(10)), max(300, interval / 2))
+
+    def test_rising_drop_score_speeds_up(self):
+        self.poller.volume = 5.0
+        self.poller.update(make_result(1, score=0.2))
+        self.assertEqual(self.poller.update(make_result(1, score=0.5)), 3600 / 2)
+        self.assertEqual(self.poller.update(make_result(1, score=0.4)), 3600 / 2)
+
+    def test_failed_poll_backs_off(self):
+        self.assertEqual(self.poller.update({"statusCode": 500, "body": "NewsAPI down"}), 7200)
+
+
+class TestWorker(unittest.TestCase):
+
+    @patch("builtins.print")
+    def test_assets_are_polled_on_their_own_intervals(self, mock_print):
+        polls = []
+        lock = threading.Lock()
+
+        def poll(asset):
+            with lock:
+                polls.append(asset)
+            if asset == "Dogecoin":
+                raise Exception("NewsAPI down")
+            return make_result(1 if asset == "Bitcoin" else 0)
+
+        worker = Worker(
+            ["Bitcoin", "Ethereum", "Dogecoin"], DailyQuota(10 ** 9), poll=poll,
+            interval=0.02, min_interval=0.01, max_interval=0.08,
+        )
+
+        async def run():
+            stop = asyncio.Event()
+            asyncio.get_running_loop().call_later(0.3, stop.set)
+            await worker.run(stop)
+
+        asyncio.run(run())
+
+        # Quiet and failing assets back off, the active one does not
+        self.assertGreater(polls.count("Bitcoin"), polls.count("Ethereum"))
+        self.assertGreaterEqual(polls.count("Dogecoin"), 1)
+        self.assertEqual(worker.pollers["Ethereum"].interval, 0.08)
+
+    @patch("builtins.print")
+    def test_polls_stop_when_the_quota_is_used_up(self, mock_print):
+        quota = DailyQuota(3)
+        calls = []
+
+        def poll(asset):
+            calls.append(asset)
+            quota.record()
+            return make_result(1)
+
+        worker = Worker(["Bitcoin", "Ethereum"], quota, poll=poll, interval=0.01, min_interval=0.0, max_interval=0.01)
+        # Ignore the spreading over the day, only the limit matters here
+        quota.min_interval = lambda assets: 0.0
+
+        async def run():
+            stop = asyncio.Event()
+            asyncio.get_running_loop().call_later(0.2, stop.set)
+            await worker.run(stop)
+
+        asyncio.run(run())
+        self.assertEqual(len(calls), 3)
+
+    @patch("builtins.print")
+    def test_polls_start_only_if_the_quota_covers_their_worst_case(self, mock_print):
+        quota = DailyQuota(5)
+        calls = []
+
+        def poll(asset):
+            calls.append(asset)
+            quota.record()
+            return make_result(1)
+
+        worker = Worker(["Bitcoin"], quota, poll=poll, interval=0.01, min_interval=0.0, max_interval=0.01, requests_per_poll=3)
+        quota.min_interval = lambda assets: 0.0
+
+        async def run():
+            stop = asyncio.Event()
+            asyncio.get_running_loop().call_later(0.2, stop.set)
+            await worker.run(stop)
+
+        asyncio.run(run())
+        # A fourth poll could retry past the 2 requests left
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(quota.remaining(), 2)
+
+    @patch("builtins.print")
+    @patch.dict("worker.CONFIG", {"METRICS_ENABLED": True, "METRICS_NAMESPACE": "CryptoNews"})
+    def test_metrics_are_emitted_after_polls(self, mock_print):
+        def poll(asset):
+            get_metrics().count("articles_analyzed", 2)
+            return make_result(2)
+
+        worker = Worker(["Bitcoin"], DailyQuota(10 ** 9), poll=poll, interval=0.05, min_interval=0.05, max_interval=0.05)
+
+        async def run():
+            stop = asyncio.Event()
+            asyncio.get_running_loop().call_later(0.12, stop.set)
+            await worker.run(stop)
+
+        asyncio.run(run())
+
+        documents = [
+            json.loads(call.args[0]) for call in mock_print.call_args_list if call.args[0].startswith("{")
+        ]
+        self.assertGreaterEqual(len(documents), 2)
+        # Each document only counts the polls since the previous one
+        self.assertTrue(all(document["articles_analyzed"] == 2 for document in documents))
+        self.assertEqual(documents[0]["Service"], "CryptoNewsWorker")
+
+
+if __name__ == "__main__":
+    unittest.main()
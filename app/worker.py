@@ -0,0 +1,341 @@
+"""
+worker.py
+
+Long-running worker mode. Instead of the daily Lambda schedule, each asset is
+polled on its own adaptive interval from a single asyncio event loop: faster
+when news volume or negative sentiment is rising, slower when it is quiet.
+Polls stay within a daily NewsAPI request quota, and the clients and caches
+of the pipeline are kept warm between polls since the process never exits.
+
+The pipeline itself is blocking, so polls run on a bounded thread pool.
+"""
+
+import argparse
+import asyncio
+import math
+import signal
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from src.utils.config import CONFIG
+from src.utils.metrics import get_metrics, start_invocation
+from src.utils.resilience import ResiliencePolicy
+from src.services.news import MAX_PAGE_SIZE, http_session, news_api_policy
+from lambda_function import analyze_asset
+
+###########
+# Classes #
+###########
+
+class DailyQuota:
+    """
+    Daily request quota, reset at midnight UTC.
+
+    With a `path`, the requests used today are stored in SQLite, so that the
+    quota survives restarts and is shared by the workers of a host.
+
+    Args:
+        limit (int): The number of requests allowed per day.
+        clock (callable): Returns the current Unix timestamp.
+        path (str): The SQLite file of the used requests, or None to keep
+                    them in memory.
+    """
+
+    def __init__(self, limit: int, clock: Callable[[], float] = time.time, path: Optional[str] = None):
+        self.limit = limit
+        self.clock = clock
+        self.in_flight = 0
+        self._used = 0
+        self._day = self._today()
+        self._lock = threading.Lock()
+        self._connection = None
+        if path is not None:
+            self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS quota (day INTEGER PRIMARY KEY, used INTEGER NOT NULL)"
+                )
+
+    def _today(self) -> int:
+        return int(self.clock() // 86400)
+
+    def _used_today(self) -> int:
+        day = self._today()
+        if self._connection is not None:
+            row = self._connection.execute("SELECT used FROM quota WHERE day = ?", (day,)).fetchone()
+            return row[0] if row else 0
+        if day != self._day:
+            self._day = day
+            self._used = 0
+        return self._used
+
+    @property
+    def used(self) -> int:
+        """Returns the number of requests sent today."""
+        with self._lock:
+            return self._used_today()
+
+    def record(self, requests: int = 1) -> None:
+        """Counts requests that were sent."""
+        with self._lock:
+            if self._connection is None:
+                self._used = self._used_today() + requests
+                return
+            day = self._today()
+            with self._connection:
+                self._connection.execute("DELETE FROM quota WHERE day < ?", (day,))
+                self._connection.execute("INSERT OR IGNORE INTO quota (day, used) VALUES (?, 0)", (day,))
+                self._connection.execute("UPDATE quota SET used = used + ? WHERE day = ?", (requests, day))
+
+    def reserve(self, requests: int = 1) -> None:
+        """Counts the requests a poll in flight may send, which are not recorded yet."""
+        with self._lock:
+            self.in_flight += requests
+
+    def release(self, requests: int = 1) -> None:
+        """Ends a poll started with `reserve`."""
+        with self._lock:
+            self.in_flight -= requests
+
+    def remaining(self) -> int:
+        """Returns the number of requests left today, minus the polls in flight."""
+        with self._lock:
+            return max(0, self.limit - self._used_today() - self.in_flight)
+
+    def seconds_until_reset(self) -> float:
+        """Returns the number of seconds until the quota is reset."""
+        now = self.clock()
+        return (now // 86400 + 1) * 86400 - now
+
+    def min_interval(self, assets: int) -> float:
+        """
+        Returns the shortest polling interval per asset that spreads the
+        remaining requests over the rest of the day.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            return self.seconds_until_reset()
+        return self.seconds_until_reset() * assets / remaining
+
+
+class AssetPoller:
+    """
+    Adaptive polling interval of an asset.
+
+    The interval is halved when more new articles than usual were analyzed
+    or the short-term drop score rose, and doubled when a poll found nothing
+    new or failed, within `[min_interval, max_interval]`.
+
+    Args:
+        asset (str): The name of the cryptocurrency.
+        interval (float): The initial interval, in seconds.
+        min_interval (float): The shortest interval, in seconds.
+        max_interval (float): The longest interval, in seconds.
+    """
+
+    # Weight of the last poll in the average number of new articles
+    VOLUME_SMOOTHING = 0.3
+
+    def __init__(self, asset: str, interval: float, min_interval: float, max_interval: float):
+        self.asset = asset
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min(max_interval, max(min_interval, interval))
+        self.volume = 0.0
+        self.drop_score = None
+        self.polls = 0
+
+    def update(self, result: dict) -> float:
+        """
+        Adapts the interval to the result of a poll.
+
+        Args:
+            result (dict): The result of `analyze_asset`.
+
+        Returns:
+            float: The new interval, in seconds.
+        """
+        self.polls += 1
+        new_articles = result.get("articles_analyzed", 0) if result.get("statusCode") == 200 else 0
+        rising_volume = new_articles > 0 and new_articles > 1.5 * self.volume
+        self.volume += self.VOLUME_SMOOTHING * (new_articles - self.volume)
+
+        rising_drop = bool(result.get("analysis", {}).get("ValueWillDrop", False))
+        scores = result.get("sentiment", {}).get("scores")
+        if scores:
+            # The shortest window reacts first
+            drop_score = next(iter(scores.values()))
+            rising_drop = rising_drop or (self.drop_score is not None and drop_score > self.drop_score)
+            self.drop_score = drop_score
+
+        if rising_volume or rising_drop:
+            self.interval /= 2
+        elif new_articles == 0:
+            self.interval *= 2
+        self.interval = min(self.max_interval, max(self.min_interval, self.interval))
+        return self.interval
+
+
+class Worker:
+    """
+    Polls several assets on adaptive intervals from one event loop.
+
+    Args:
+        assets (list): The names of the cryptocurrencies to poll.
+        quota (DailyQuota): The daily NewsAPI request quota.
+        poll (callable): Runs the pipeline for an asset and returns its result.
+                         Defaults to `analyze_asset` for today.
+        interval (float): The initial interval of every asset, in seconds.
+        min_interval (float): The shortest interval, in seconds.
+        max_interval (float): The longest interval, in seconds.
+        max_concurrency (int): The maximum number of polls running at once.
+        requests_per_poll (int): The most NewsAPI requests a poll can send,
+                                 which must be left in the quota to start it.
+    """
+
+    def __init__(
+        self,
+        assets: List[str],
+        quota: DailyQuota,
+        poll: Optional[Callable[[str], dict]] = None,
+        interval: float = 3600,
+        min_interval: float = 300,
+        max_interval: float = 6 * 3600,
+        max_concurrency: int = 4,
+        requests_per_poll: int = 1,
+    ):
+        self.quota = quota
+        # A poll costing more than the whole quota still runs once a day
+        self.requests_per_poll = max(1, min(requests_per_poll, quota.limit))
+        self.poll = poll or (lambda asset: analyze_asset(asset, datetime.now(), CONFIG.get('WORKER_TOP_K', 10)))
+        self.pollers: Dict[str, AssetPoller] = {
+            asset: AssetPoller(asset, interval, min_interval, max_interval) for asset in assets
+        }
+        self.max_concurrency = max(1, max_concurrency)
+        self._running = 0
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Polls every asset until `stop` is set."""
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            tasks = [
+                asyncio.ensure_future(self._poll_forever(poller, loop, executor, stop))
+                for poller in self.pollers.values()
+            ]
+            try:
+                await stop.wait()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _poll_forever(self, poller: AssetPoller, loop, executor, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            # Wait for the quota to be reset once it cannot cover a poll
+            while self.quota.remaining() < self.requests_per_poll:
+                if await _sleep_or_stop(stop, self.quota.seconds_until_reset()):
+                    return
+
+            self.quota.reserve(self.requests_per_poll)
+            self._running += 1
+            try:
+                result = await loop.run_in_executor(executor, self._run_poll, poller.asset)
+            finally:
+                self.quota.release(self.requests_per_poll)
+                self._running -= 1
+
+            interval = poller.update(result)
+            delay = max(interval, self.quota.min_interval(len(self.pollers)))
+            print(f"Polled {poller.asset}: {result.get('body')} Next poll in {delay:.0f}s.")
+            # Polls in flight still record into the current metrics
+            if self._running == 0:
+                self._emit_metrics()
+            if await _sleep_or_stop(stop, delay):
+                return
+
+    def _emit_metrics(self) -> None:
+        """Emits the metrics of the polls since the last emission, and starts new ones."""
+        metrics = get_metrics()
+        start_invocation()
+        if CONFIG.get('METRICS_ENABLED', True):
+            metrics.emit(CONFIG.get('METRICS_NAMESPACE', 'CryptoNews'), {"Service": "CryptoNewsWorker"})
+
+    def _run_poll(self, asset: str) -> dict:
+        try:
+            return self.poll(asset)
+        except Exception as e:
+            return {"statusCode": 500, "body": str(e)}
+
+###########
+# Methods #
+###########
+
+async def _sleep_or_stop(stop: asyncio.Event, seconds: float) -> bool:
+    """Sleeps for `seconds`, returning True early if `stop` is set."""
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=seconds)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+def worst_case_poll_requests(top_k: int, policy: ResiliencePolicy = news_api_policy) -> int:
+    """
+    Returns the most NewsAPI requests of a poll: every page of `top_k`
+    articles, with every retry of the policy, each hedged if it hedges.
+    """
+    requests_per_attempt = 2 if policy.hedge_percentile else 1
+    return math.ceil(max(1, top_k) / MAX_PAGE_SIZE) * max(1, policy.max_attempts) * requests_per_attempt
+
+def count_news_requests(quota: DailyQuota) -> Callable:
+    """Returns a `requests` response hook that counts NewsAPI responses against the quota."""
+    news_url = CONFIG.get('NEWS_API_URL') or ""
+
+    def hook(response, *args, **kwargs):
+        # Hedged and retried requests count too, since NewsAPI bills them
+        if news_url and response.url.startswith(news_url):
+            quota.record()
+        return response
+
+    return hook
+
+def main(assets: List[str], quota_limit: int) -> None:
+    """Runs the worker until it is interrupted."""
+    quota = DailyQuota(quota_limit, path=CONFIG.get('WORKER_QUOTA_PATH') or None)
+    http_session.hooks['response'].append(count_news_requests(quota))
+    # Metrics accumulate until the worker is idle, see `Worker._emit_metrics`
+    start_invocation()
+    worker = Worker(
+        assets,
+        quota,
+        interval=CONFIG.get('WORKER_INTERVAL', 3600),
+        min_interval=CONFIG.get('WORKER_MIN_INTERVAL', 300),
+        max_interval=CONFIG.get('WORKER_MAX_INTERVAL', 6 * 3600),
+        max_concurrency=CONFIG.get('MAX_CONCURRENCY', 8),
+        requests_per_poll=worst_case_poll_requests(CONFIG.get('WORKER_TOP_K', 10), news_api_policy),
+    )
+
+    async def run() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        await worker.run(stop)
+
+    print(f"Polling {', '.join(assets)} within {quota_limit} NewsAPI requests per day "
+          f"(UTC day {datetime.now(timezone.utc):%Y-%m-%d}).")
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poll news for several assets on adaptive intervals.")
+    parser.add_argument("--assets", help="Comma-separated list of assets. Defaults to CRYPTO_NAMES or CRYPTO_NAME.")
+    parser.add_argument("--quota", type=int, help="NewsAPI requests per day. Defaults to WORKER_DAILY_QUOTA.")
+    args = parser.parse_args()
+
+    if args.assets:
+        assets = [asset.strip() for asset in args.assets.split(',') if asset.strip()]
+    else:
+        assets = CONFIG.get('CRYPTO_NAMES') or [CONFIG.get('CRYPTO_NAME')]
+    main([asset for asset in assets if asset], args.quota or CONFIG.get('WORKER_DAILY_QUOTA', 100))